@@ -1,15 +1,86 @@
 import os
 import subprocess
-import zipfile
 import shutil
 import json
 import requests
 import platform
+import re
 from pathlib import Path
 from datetime import datetime
 import pcbnew  # Import KiCad's PCB module
 import wx
 import traceback
+import threading
+import functools
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from .tracing import Tracer, path_size
+from .logsink import LogSink, FLUSH_INTERVAL_MS
+from .workspace import WorkspaceManager, publish_file, publish_stream
+from .lookup_cache import LookupCache
+from .bulk_upload import UploadBatch, parse_capabilities, request_file_objects, rewind_files
+from .compression import choose_encoding, compress_multipart
+from .archive import (Package, write_package, package_digest, default_workers,
+                      PROFILE_LEVELS, DEFAULT_PROFILE)
+from .multipart import stream_multipart
+from .step_metadata import insert_after_header, compress_step, STEPZ_EXTENSION
+from .model_profiles import PROFILES, DEFAULT_PROFILES, model_content_type
+from .model_mirror import ModelMirror, model_references
+from .jobset import Jobset, command_key, place_output
+from .placement import (Placement, PNP_FORMATS, parse_rotation_offsets,
+                        write_kicad_ascii, write_kicad_csv)
+from .manufacturing import PACKAGE_FORMATS, format_key
+from .settings import parse_names
+from .watcher import SaveWatcher, low_priority, DEBOUNCE_SECONDS
+from .component_table import ComponentTable, TABLE_FIELDS, TABLE_LABELS, DOKULY_COLUMNS, PRODUCTION_COLUMNS
+from .fingerprint import (ProjectInputScanner, FileFingerprinter, ArtifactStamps, board_key,
+                          ALL_ROLES, ROLE_BOARD, ROLE_SCHEMATIC, ROLE_PROJECT, ROLE_MODELS)
+
+# Statuses with which a server refuses a chunked (streamed) request body
+CHUNKED_REJECTED_STATUSES = (400, 411, 413)
+
+# The output area is rebuilt from the log history once it holds this many characters
+MAX_OUTPUT_CHARS = 200000
+
+# Inputs a 3D model export depends on
+MODEL_ROLES = (ROLE_BOARD, ROLE_PROJECT, ROLE_MODELS)
+# Inputs the component table depends on
+BOM_ROLES = (ROLE_SCHEMATIC, ROLE_PROJECT)
+# Inputs an IPC-2581 or ODB++ package depends on
+PACKAGE_ROLES = (ROLE_BOARD, ROLE_PROJECT)
+
+# Start of the comment carrying the version (PCBA, revision, timestamp) in STEP files
+VERSION_COMMENT_PREFIX = '/* VERSION_INFO:'
+
+# Board views kicad-cli can render for the thumbnail
+THUMBNAIL_VIEWS = ('top', 'bottom')
+THUMBNAIL_TIMEOUT = 180
+
+# Layers of the production package, one Gerber file each
+PRODUCTION_GERBER_LAYERS = [
+    'F.Cu', 'B.Cu',  # Copper layers
+    'F.SilkS', 'B.SilkS',  # Silkscreen
+    'F.Mask', 'B.Mask',  # Solder mask
+    'F.Paste', 'B.Paste',  # Solder paste
+    'Edge.Cuts',  # Board outline
+    'F.Fab', 'B.Fab',  # Fabrication layers
+]
+
+# One jobset run covers every export of a push, including the STEP models
+JOBSET_TIMEOUT = 600
+
+# Files whose saves start a pre-build in watch mode
+WATCH_ROLES = (ROLE_BOARD, ROLE_SCHEMATIC, ROLE_PROJECT)
+
+
+def exclusive_build(method):
+    """Run a UI action only while no background pre-build is using the exports"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.build_slot():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class KiCadTool(wx.Frame):
@@ -22,6 +93,7 @@ class KiCadTool(wx.Frame):
         self.drawing_sheet_path = None
         self.theme_path = None
         self.kicad_cli = self.locate_kicad_cli()
+        self.kicad_cli_help = {}
 
         # Dokuly settings
         self.dokuly_api_key = ""
@@ -33,6 +105,9 @@ class KiCadTool(wx.Frame):
         self.replace_files = True  # Add missing variable
 
         self.pcba_pk = -1
+        self.pcba_pk_from_cache = False
+        self.pcba_cache = None
+        self.pcba_cache_ttl_hours = 30 * 24
 
         # Fetching
         self.fetch_pcba_url = ""
@@ -41,9 +116,89 @@ class KiCadTool(wx.Frame):
         self.file_upload_pcba_url = ""
         self.bom_upload_url = ""
         self.thumbnail_upload_url = ""
+        self.bulk_upload_pcba_url = ""
+        self.capabilities_url = ""
+
+        # Bulk uploads, used when the server advertises them
+        self.bulk_upload = True
+        self.server_capabilities = None
+        self.upload_batch = None
+        self.compress_uploads = True
+
+        # Packages whose identical contents were already uploaded are skipped
+        self.skip_unchanged_uploads = True
+        self.upload_cache = None
+
+        # Threads deflating ZIP entries, 0 = one per core
+        self.zip_workers = 0
+        self.zip_profile = DEFAULT_PROFILE
+
+        # Stream the production ZIP into the upload request as it is built
+        self.stream_uploads = True
+        self.stream_rejected = False  # the server refused a chunked upload this session
+
+        # 'step' or 'stpz' (gzipped STEP)
+        self.step_format = 'step'
+        # 3D exports of a push, see model_profiles.PROFILES
+        self.model_profiles = list(DEFAULT_PROFILES)
+        # Local copies of the 3D models: 'auto' (models on another filesystem), 'true' or 'false'
+        self.mirror_models = 'auto'
+        self.model_mirror = None
+
+        # Run the exports of a push as one kicad-cli jobset (KiCad 9+)
+        self.use_jobset = True
+        self.jobset_outputs = {}
+
+        # Placement exported once per board state; position files are transcoded from it
+        self.placement = None  # ((board path, size, mtime), Placement)
+        # Assembly house pick-and-place files added to the production ZIP, see placement.PNP_FORMATS
+        self.pnp_formats = []
+        self.pnp_rotation_offsets = []
+
+        # Schematic symbols exported once per schematic state; every BOM is derived from them
+        self.component_table = None  # (input fingerprint, ComponentTable)
+
+        # IPC-2581 / ODB++ packages of a push, see manufacturing.PACKAGE_FORMATS
+        self.manufacturing_formats = []
+        self.manufacturing_in_zip = False
+
+        # PNG thumbnail: views rendered at render size, each downsized to fit the thumbnail size
+        self.thumbnail_views = list(THUMBNAIL_VIEWS)
+        self.thumbnail_render_size = (1600, 1200)
+        self.thumbnail_size = (480, 360)
+
+        # Watch mode: pre-build cached artifacts in the background when the board is saved
+        self.watch_mode = False
+        self.watch_debounce = DEBOUNCE_SECONDS
+        self.watcher = None
+        self.prebuild_pool = None
+        self.prebuild_pending = False
+        self.build_lock = threading.RLock()  # held by a push, or by a pre-build between its steps
+        self.foreground_waiting = threading.Event()
 
         self.temp_file_path = None
 
+        # Per-run workspaces below the plugin's temp folder
+        self.temp_root = None
+        self.workspaces = None
+        self.workspace = None
+        self.session_workspace = None
+        self.temp_max_mb = 500
+        self.temp_max_age_days = 7
+
+        # Input tracking for artifact freshness
+        self.project_inputs = None
+        self.input_fingerprinter = None
+        self.artifact_stamps = None
+
+        # Timing spans for the current run
+        self.tracer = Tracer()
+
+        # Output is buffered and shown in batches, see flush_log
+        self.log_sink = LogSink()
+        self.output_chars = 0
+        self.log_to_file = False
+
         self.initUI()
         self.Centre()
         self.Show()
@@ -53,7 +208,9 @@ class KiCadTool(wx.Frame):
         self.file_upload_pcba_url = f"{self.dokuly_base_api_url}/api/v1/pcbas/upload/{self.pcba_pk}/"
         self.bom_upload_url = f"{self.dokuly_base_api_url}/api/v1/pcbas/bom/{self.pcba_pk}/"
         self.thumbnail_upload_url = f"{self.dokuly_base_api_url}/api/v1/pcbas/thumbnail/{self.pcba_pk}/"
+        self.bulk_upload_pcba_url = f"{self.dokuly_base_api_url}/api/v1/pcbas/uploadBulk/{self.pcba_pk}/"
         self.fetch_pcba_url = f"{self.dokuly_base_api_url}/api/v1/pcbas/fetchByPartNumberRevision/"
+        self.capabilities_url = f"{self.dokuly_base_api_url}/api/v1/pcbas/capabilities/"
 
     def locate_kicad_cli(self):
         """Enhanced kicad-cli detection with better error handling"""
@@ -107,6 +264,27 @@ class KiCadTool(wx.Frame):
         except Exception as e:
             return False, f"kicad-cli test failed: {str(e)}"
 
+    def kicad_cli_commands(self, *path):
+        """Subcommands kicad-cli lists under `path` (e.g. 'pcb', 'export'), asked once per session"""
+        if path in self.kicad_cli_help:
+            return self.kicad_cli_help[path]
+        commands = set()
+        if self.kicad_cli:
+            try:
+                result = subprocess.run([self.kicad_cli, *path, '--help'],
+                                        capture_output=True, text=True, timeout=10)
+                for line in (result.stdout + result.stderr).splitlines():
+                    match = re.match(r'^\s{2,}([a-z0-9][\w-]*)(\s|$)', line)
+                    if match:
+                        commands.add(match.group(1))
+            except Exception as e:
+                self.debug_log(f"Could not list kicad-cli {' '.join(path)} commands: {str(e)}", "WARNING")
+        self.kicad_cli_help[path] = commands
+        return commands
+
+    def step_extension(self):
+        return STEPZ_EXTENSION if self.step_format == 'stpz' else '.step'
+
     def initUI(self):
         panel = wx.Panel(self)
 
@@ -168,6 +346,11 @@ class KiCadTool(wx.Frame):
 
         panel.SetSizer(vbox)
 
+        self.log_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.flush_log, self.log_timer)
+        self.log_timer.Start(FLUSH_INTERVAL_MS)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
         self.load_env_file()
 
         self.dokuly_base_api_url = self.get_dokuly_base_api_url()
@@ -183,6 +366,13 @@ class KiCadTool(wx.Frame):
 
         self.update_pcba_urls()
 
+        self.generate_temp_file_folder()
+        self.configure_log_file()
+        self.clean_temp_folder()
+
+        if self.watch_mode:
+            self.start_watch_mode()
+
         # Fetch PCBA item from dokuly (only if properly configured)
         if self.pcba_number and self.revision and self.dokuly_api_key:
             self.fetch_pcba_item()
@@ -193,10 +383,44 @@ class KiCadTool(wx.Frame):
             self.print_output("2. Set PCBA_NUMBER and PCBA_REVISION in your board variables\n")
             self.print_output("3. Click 'Push PCBA to Dokuly' to upload your files\n\n")
 
-        self.generate_temp_file_folder()
-
     def print_output(self, message):
-        self.output_text.AppendText(message)
+        self.log_sink.write(message)
+
+    def flush_log(self, event=None):
+        """Show buffered output in the text area; runs on a timer on the UI thread"""
+        text, replace = self.log_sink.drain()
+        if not text:
+            return
+
+        self.output_chars += len(text)
+        if replace or self.output_chars > MAX_OUTPUT_CHARS:
+            # Rebuild from the bounded history instead of letting the control grow
+            history = self.log_sink.tail_text()[-(MAX_OUTPUT_CHARS // 2):]
+            self.output_text.SetValue(history)
+            self.output_text.ShowPosition(len(history))
+            self.output_chars = len(history)
+        else:
+            self.output_text.AppendText(text)
+
+    def configure_log_file(self):
+        """Mirror the output to a rotating log file if LOG_TO_FILE is enabled"""
+        if self.log_to_file:
+            log_path = os.path.join(self.temp_root, 'logs', 'kicad_to_dokuly.log')
+            try:
+                self.log_sink.open_file(log_path)
+            except Exception as e:
+                self.debug_log(f"Could not open log file {log_path}: {str(e)}", "WARNING")
+        else:
+            self.log_sink.close_file()
+
+    def on_close(self, event):
+        self.stop_watch_mode()
+        self.log_timer.Stop()
+        self.flush_log()
+        self.log_sink.close_file()
+        if self.session_workspace is not None:
+            self.session_workspace.remove()
+        event.Skip()
 
     def debug_log(self, message, level="INFO"):
         """Add debug logging for troubleshooting"""
@@ -216,7 +440,123 @@ class KiCadTool(wx.Frame):
         
         # Simple direct request for all environments (no tenant subdomains)
         self.debug_log(f"Making {method} request to {url}")
-        return requests.request(method, url, **kwargs)
+        with self.tracer.span(f"{method} {url.split('/api/', 1)[-1]}", 'http',
+                              url=url, bytes_sent=self.request_body_size(kwargs)) as span:
+            response = requests.request(method, url, **kwargs)
+            span.set(status_code=response.status_code,
+                     bytes_received=len(response.content))
+        return response
+
+    def request_body_size(self, request_kwargs):
+        """Approximate size of the payload of a request, for the trace"""
+        size = 0
+        for file_obj in request_file_objects(request_kwargs.get('files')):
+            if hasattr(file_obj, 'fileno'):
+                try:
+                    size += os.fstat(file_obj.fileno()).st_size
+                except (OSError, ValueError):
+                    pass
+            elif isinstance(file_obj, (bytes, str)):
+                size += len(file_obj)
+        if request_kwargs.get('json') is not None:
+            size += len(json.dumps(request_kwargs['json']))
+        return size
+
+    def run_kicad_cli(self, command, background=False, **kwargs):
+        """Run a kicad-cli command, recording it as a trace span; below normal priority if `background`"""
+        name = ' '.join(['kicad-cli'] + [arg for arg in command[1:4] if not arg.startswith('-')])
+        output = command[command.index('--output') + 1] if '--output' in command else None
+
+        # Already produced by this push's jobset run
+        produced = self.jobset_outputs.get(command_key(command)) if self.jobset_outputs else None
+        if produced and output:
+            with self.tracer.span(name, 'jobset', output=output) as span:
+                place_output(produced, output)
+                span.set(bytes=path_size(output))
+            empty = '' if kwargs.get('text') or kwargs.get('errors') or kwargs.get('encoding') else b''
+            return subprocess.CompletedProcess(command, 0, empty, empty)
+
+        with self.tracer.span(name, 'kicad-cli', args=command[1:], output=output) as span:
+            try:
+                if background:
+                    command, kwargs = low_priority(command, kwargs)
+                result = subprocess.run(command, **kwargs)
+            except subprocess.CalledProcessError as e:
+                span.set(exit_code=e.returncode)
+                raise
+            span.set(exit_code=result.returncode, bytes=path_size(output))
+        return result
+
+    def zip_files(self, entries, zip_path):
+        """Write (file_path, arcname) entries to a reproducible ZIP package, returning its digest"""
+        with self.tracer.span(f"zip {os.path.basename(zip_path)}", 'zip',
+                              entries=len(entries)) as span:
+            digest, written, stats = write_package(
+                entries, zip_path, workers=self.zip_workers, profile=self.zip_profile)
+            span.set(bytes_in=sum(os.path.getsize(path) for path, _ in entries),
+                     bytes=os.path.getsize(zip_path), digest=digest, written=written,
+                     workers=self.zip_workers or default_workers(), profile=self.zip_profile)
+            if stats:
+                span.set(stored=stats.stored, deflated=stats.deflated)
+                self.debug_log(f"{os.path.basename(zip_path)}: {stats.deflated} deflated, "
+                               f"{stats.stored} stored, {stats.bytes_in} -> {stats.bytes_out} bytes "
+                               f"({self.zip_profile} profile)")
+        return digest
+
+    def directory_entries(self, source_dir):
+        """(file_path, arcname) entries for all files below source_dir, relative to it"""
+        entries = []
+        for root, dirs, files in os.walk(source_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                entries.append((file_path, os.path.relpath(file_path, source_dir)))
+        return entries
+
+    def zip_directory(self, source_dir, zip_path):
+        """Write all files below source_dir to a ZIP file, relative to source_dir"""
+        self.zip_files(self.directory_entries(source_dir), zip_path)
+
+    def make_package(self, entries):
+        """The production package; unlike the Gerber and position ZIPs it carries MANIFEST.sha256"""
+        return Package(entries, profile=self.zip_profile, workers=self.zip_workers, manifest=True)
+
+    def publish_package(self, package, destination):
+        """Build a package straight into its final location, unless it is already there"""
+        with self.tracer.span(f"zip {os.path.basename(destination)}", 'zip',
+                              entries=len(package.entries), profile=self.zip_profile,
+                              workers=package.workers) as span:
+            if package.matches(destination):
+                span.set(written=False)
+                return destination
+            for _ in publish_stream(package.chunks(), destination):
+                pass
+            span.set(written=True, bytes=path_size(destination),
+                     stored=package.stats.stored, deflated=package.stats.deflated)
+        return destination
+
+    def start_trace(self):
+        """Begin a fresh set of timing spans for a run"""
+        self.tracer = Tracer()
+        if self.input_fingerprinter is not None:
+            self.input_fingerprinter.tracer = self.tracer
+        return self.tracer
+
+    def write_trace(self, label):
+        """Save the spans of the current run as a Chrome trace / Perfetto JSON file"""
+        try:
+            trace_dir = os.path.join(self.temp_root, 'traces')
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            trace_path = os.path.join(trace_dir, f"{label}_{timestamp}.json")
+            self.tracer.write(trace_path)
+
+            self.print_output(f"\n⏱️ Total time: {self.tracer.elapsed():.1f} s\n")
+            for name, (total, count) in self.tracer.summary()[:5]:
+                self.print_output(f"   • {name}: {total:.2f} s ({count}x)\n")
+            self.print_output(f"📈 Trace saved to: {trace_path} (open in https://ui.perfetto.dev)\n")
+            return trace_path
+        except Exception as e:
+            self.debug_log(f"Could not write trace: {str(e)}", "WARNING")
+            return None
 
     def handle_request_error(self, response, operation_name):
         """Standardized error handling for HTTP requests"""
@@ -276,13 +616,123 @@ class KiCadTool(wx.Frame):
         
         return errors
 
-    def generate_temp_file_folder(self):
+    def get_temp_root(self):
         plugin_dir = os.path.dirname(__file__)
-        temp_folder = os.path.join(plugin_dir, 'temp')
-        if not os.path.exists(temp_folder):
-            os.makedirs(temp_folder)
+        return os.path.join(plugin_dir, 'temp')
 
-        self.temp_file_path = temp_folder
+    def generate_temp_file_folder(self):
+        """Create this window's private workspace below the plugin's temp folder"""
+        if self.workspaces is None:
+            self.temp_root = self.get_temp_root()
+            self.workspaces = WorkspaceManager(
+                self.temp_root,
+                max_total_bytes=self.temp_max_mb * 1024 * 1024,
+                max_age_seconds=self.temp_max_age_days * 24 * 60 * 60)
+
+        self.session_workspace = self.workspaces.create('session')
+        self.workspace = self.session_workspace
+        self.temp_file_path = self.workspace.path
+
+    def begin_run(self, label):
+        """Switch to a fresh workspace so concurrent runs never share files"""
+        if self.workspaces is None:
+            self.generate_temp_file_folder()
+        self.workspace = self.workspaces.create(label)
+        self.temp_file_path = self.workspace.path
+
+    def end_run(self):
+        """Drop the run's workspace and let the janitor enforce the temp folder caps"""
+        if self.workspace is not None and self.workspace is not self.session_workspace:
+            self.workspace.remove()
+        self.workspace = self.session_workspace
+        if self.workspace is not None:
+            self.workspace.touch()
+            self.temp_file_path = self.workspace.path
+        self.clean_temp_folder()
+
+    def clean_temp_folder(self):
+        """Evict old and excess files from the temp folder on a background thread"""
+        def report(result):
+            if isinstance(result, Exception):
+                self.debug_log(f"Temp folder cleanup failed: {str(result)}", "WARNING")
+            elif result[0]:
+                self.debug_log(f"Temp folder cleanup removed {result[0]} entries ({result[1] / (1024 * 1024):.1f} MB)")
+
+        if self.workspaces is not None:
+            self.workspaces.clean_in_background(on_done=report)
+
+    def publish_local_file(self, source, destination, move=False):
+        """Atomically place a finished artifact at its final location, without copying if possible
+
+        With `move`, source may be renamed away; otherwise it stays usable.
+        """
+        with self.tracer.span(f"publish {os.path.basename(destination)}", 'publish',
+                              bytes=path_size(source)) as span:
+            if source.endswith('.zip') and os.path.exists(destination):
+                digest = package_digest(source)
+                if digest is not None and package_digest(destination) == digest:
+                    # Same package contents: keep the existing file and its timestamp
+                    span.set(unchanged=True)
+                    return destination
+            if self.workspace is not None:
+                method = self.workspace.publish(source, destination, move=move)
+            else:
+                method = publish_file(source, destination, move=move)
+            span.set(method=method)
+            return destination
+
+    def get_cache_folder(self):
+        """Folder for state that outlives a single run (hashes, artifact stamps)"""
+        if not self.temp_root:
+            self.generate_temp_file_folder()
+        cache_folder = os.path.join(self.temp_root, 'cache')
+        os.makedirs(cache_folder, exist_ok=True)
+        return cache_folder
+
+    def board_cache_entry(self, kind, name, filename):
+        """(artifact name, cached file) of an export of the open board
+
+        Each board gets its own folder and stamp, so windows on different
+        boards never replace each other's cached exports.
+        """
+        key = board_key(self.pcb_file)
+        return f"{name}@{key}", os.path.join(self.get_cache_folder(), kind, key, filename)
+
+    def scan_project_inputs(self):
+        """Collect all files the project outputs depend on"""
+        scanner = ProjectInputScanner(
+            self.pcb_file, self.schematic_file,
+            drawing_sheet_path=self.drawing_sheet_path,
+            theme_path=self.theme_path)
+        self.project_inputs = scanner.scan()
+
+        if self.input_fingerprinter is None:
+            cache_folder = self.get_cache_folder()
+            self.input_fingerprinter = FileFingerprinter(
+                os.path.join(cache_folder, 'file_hashes.json'), tracer=self.tracer)
+            self.artifact_stamps = ArtifactStamps(
+                os.path.join(cache_folder, 'artifact_stamps.json'))
+
+        return self.project_inputs
+
+    def artifact_fingerprint(self, roles=ALL_ROLES, extra=None):
+        """Fingerprint of the inputs with the given roles, plus any export options"""
+        if self.project_inputs is None:
+            self.scan_project_inputs()
+        fingerprint = self.input_fingerprinter.fingerprint(
+            self.project_inputs, roles, extra)
+        self.input_fingerprinter.save()
+        return fingerprint
+
+    def is_artifact_fresh(self, name, roles=ALL_ROLES, extra=None):
+        """Check if an artifact is up to date with its inputs without re-exporting it"""
+        fingerprint = self.artifact_fingerprint(roles, extra)
+        return self.artifact_stamps.is_fresh(name, fingerprint)
+
+    def record_artifact(self, name, outputs, roles=ALL_ROLES, extra=None):
+        """Record the input fingerprint an artifact was built from"""
+        fingerprint = self.artifact_fingerprint(roles, extra)
+        self.artifact_stamps.record(name, fingerprint, outputs)
 
     def get_current_pcb_file(self):
         board = pcbnew.GetBoard()
@@ -438,6 +888,21 @@ class KiCadTool(wx.Frame):
             api_valid = self.validate_dokuly_connection()
             self.debug_log(f"API Connection: {'Valid' if api_valid else 'Failed'}", "INFO" if api_valid else "ERROR")
 
+        # Test 5: PCBA lookup, bypassing the cache
+        if self.pcba_number and self.revision and self.dokuly_api_key:
+            self.invalidate_pcba_cache()
+            self.fetch_pcba_item(use_cache=False)
+            self.debug_log(f"PCBA lookup: {'ID ' + str(self.pcba_pk) if self.pcba_pk else 'Failed'}",
+                           "INFO" if self.pcba_pk else "ERROR")
+
+        # Test 6: Project inputs
+        if self.pcb_file:
+            inputs = self.scan_project_inputs()
+            self.debug_log(f"Project inputs: {inputs.count()} files tracked", "INFO")
+            for path in inputs.missing_paths():
+                self.debug_log(f"Referenced input not found: {path}", "WARNING")
+
+    @exclusive_build
     def create_production_zip(self, event):
         """Create a production-ready ZIP file with all necessary files"""
         self.print_output("\n📦 Creating Production ZIP Package...\n")
@@ -452,6 +917,9 @@ class KiCadTool(wx.Frame):
             return
         
         try:
+            # Sub-sheets or 3D models may have been added since the last run
+            self.scan_project_inputs()
+
             # Create production directory
             production_dir = os.path.join(self.temp_file_path, 'production')
             if os.path.exists(production_dir):
@@ -501,22 +969,20 @@ class KiCadTool(wx.Frame):
             os.makedirs(pdf_dir)
             front_pdf, back_pdf = self.generate_pcb_pdf()
             if front_pdf and back_pdf:
-                shutil.copy2(front_pdf, os.path.join(pdf_dir, 'pcb_front.pdf'))
-                shutil.copy2(back_pdf, os.path.join(pdf_dir, 'pcb_back.pdf'))
+                self.publish_local_file(front_pdf, os.path.join(pdf_dir, 'pcb_front.pdf'), move=True)
+                self.publish_local_file(back_pdf, os.path.join(pdf_dir, 'pcb_back.pdf'), move=True)
                 self.print_output("✅ PDF files generated\n")
+
+            # 6. IPC-2581 / ODB++ packages, if configured for the ZIP
+            self.add_manufacturing_packages_to_production(production_dir)
             
-            # 6. Create ZIP file
+            # 7. Create ZIP file
             zip_filename = f"{self.pcba_number}_{self.revision}_PRODUCTION.zip"
             zip_path = os.path.join(os.path.dirname(self.pcb_file), zip_filename)
             
             self.print_output(f"📦 Creating ZIP file: {zip_filename}\n")
             
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(production_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, production_dir)
-                        zipf.write(file_path, arcname)
+            self.publish_package(self.make_package(self.directory_entries(production_dir)), zip_path)
             
             # Get file size
             file_size = os.path.getsize(zip_path)
@@ -531,6 +997,8 @@ class KiCadTool(wx.Frame):
             self.print_output(f"   • Position files (front and back)\n")
             self.print_output(f"   • BOM file (CSV format)\n")
             self.print_output(f"   • PDF files (front and back)\n")
+            if os.path.isdir(os.path.join(production_dir, 'manufacturing')):
+                self.print_output(f"   • Manufacturing packages (IPC-2581 / ODB++)\n")
             
             # Ask if user wants to open the file location
             result = wx.MessageBox(
@@ -552,6 +1020,14 @@ class KiCadTool(wx.Frame):
             self.print_output(f"❌ Error creating production ZIP: {str(e)}\n")
             self.debug_log(f"Production ZIP creation error: {str(e)}", "ERROR")
 
+    def gerber_layer_command(self, layer, output_file):
+        return [
+            self.kicad_cli, 'pcb', 'export', 'gerbers',
+            '--output', output_file,
+            '--layers', layer,
+            self.pcb_file
+        ]
+
     def generate_gerber_files(self, output_dir):
         """Generate Gerber files for all layers"""
         try:
@@ -560,27 +1036,12 @@ class KiCadTool(wx.Frame):
             if not board:
                 return False
             
-            # Common Gerber layers
-            layers = [
-                'F.Cu', 'B.Cu',  # Copper layers
-                'F.SilkS', 'B.SilkS',  # Silkscreen
-                'F.Mask', 'B.Mask',  # Solder mask
-                'F.Paste', 'B.Paste',  # Solder paste
-                'Edge.Cuts',  # Board outline
-                'F.Fab', 'B.Fab',  # Fabrication layers
-            ]
-            
-            for layer in layers:
+            for layer in PRODUCTION_GERBER_LAYERS:
                 try:
                     output_file = os.path.join(output_dir, f"{layer}.gbr")
-                    command = [
-                        self.kicad_cli, 'pcb', 'export', 'gerbers',
-                        '--output', output_file,
-                        '--layers', layer,
-                        self.pcb_file
-                    ]
+                    command = self.gerber_layer_command(layer, output_file)
                     
-                    result = subprocess.run(
+                    result = self.run_kicad_cli(
                         command,
                         capture_output=True,
                         text=True,
@@ -600,21 +1061,24 @@ class KiCadTool(wx.Frame):
             self.debug_log(f"Error in generate_gerber_files: {str(e)}", "ERROR")
             return False
 
+    def drill_command(self, output_dir):
+        # KiCad 9.0 uses --excellon-separate-th to generate separate PTH and NPTH files
+        return [
+            self.kicad_cli, 'pcb', 'export', 'drill',
+            '--output', output_dir,
+            '--format', 'excellon',
+            '--excellon-separate-th',
+            self.pcb_file
+        ]
+
     def generate_drill_files(self, output_dir):
         """Generate drill files (PTH and NPTH) using KiCad 9.0 syntax"""
         try:
             self.debug_log(f"Generating drill files in: {output_dir}", "INFO")
             
-            # KiCad 9.0 uses --excellon-separate-th to generate separate PTH and NPTH files
-            command = [
-                self.kicad_cli, 'pcb', 'export', 'drill',
-                '--output', output_dir,
-                '--format', 'excellon',
-                '--excellon-separate-th',
-                self.pcb_file
-            ]
+            command = self.drill_command(output_dir)
             
-            result = subprocess.run(
+            result = self.run_kicad_cli(
                 command,
                 capture_output=True,
                 text=True,
@@ -644,195 +1108,147 @@ class KiCadTool(wx.Frame):
             self.debug_log(f"Error in generate_drill_files: {str(e)}", "ERROR")
             return False
 
+    def placement_command(self, output_csv):
+        # Everything, both sides, in mm from the page origin: each position file is transcoded from it
+        return [
+            self.kicad_cli, 'pcb', 'export', 'pos',
+            '--output', output_csv,
+            '--format', 'csv',
+            '--side', 'both',
+            '--units', 'mm',
+            self.pcb_file
+        ]
+
+    def placement_key(self):
+        stat = os.stat(self.pcb_file)
+        return (os.path.abspath(self.pcb_file), stat.st_size, stat.st_mtime_ns)
+
+    def placement_is_cached(self):
+        return self.placement is not None and self.placement[0] == self.placement_key()
+
+    def get_placement(self, background=False):
+        """The board's placement, exported by kicad-cli once per saved board state"""
+        if self.placement_is_cached():
+            return self.placement[1]
+        if not self.temp_file_path:
+            self.generate_temp_file_folder()
+
+        key = self.placement_key()
+        output_csv = os.path.join(self.temp_file_path, 'placement.csv')
+        self.run_kicad_cli(
+            self.placement_command(output_csv),
+            background=background,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors='replace',
+            timeout=30
+        )
+        try:
+            placement = Placement.load(output_csv, self.pcb_file)
+        finally:
+            if os.path.exists(output_csv):
+                os.remove(output_csv)
+        self.placement = (key, placement)
+        return placement
+
     def generate_position_files(self, output_dir):
-        """Generate position files for front and back"""
+        """Generate position files for front and back, plus the configured pick-and-place layouts"""
         try:
-            # Generate front position file
-            front_file = os.path.join(output_dir, "position_front.csv")
-            command_front = [
-                self.kicad_cli, 'pcb', 'export', 'pos',
-                '--output', front_file,
-                '--format', 'csv',
-                '--side', 'front',
-                self.pcb_file
-            ]
-            
-            result_front = subprocess.run(
-                command_front,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            # Generate back position file
-            back_file = os.path.join(output_dir, "position_back.csv")
-            command_back = [
-                self.kicad_cli, 'pcb', 'export', 'pos',
-                '--output', back_file,
-                '--format', 'csv',
-                '--side', 'back',
-                self.pcb_file
+            placement = self.get_placement()
+            # Same contents as kicad-cli's CSV export with its default units (inches)
+            write_kicad_csv(os.path.join(output_dir, "position_front.csv"),
+                            placement.select('top'), units='in')
+            write_kicad_csv(os.path.join(output_dir, "position_back.csv"),
+                            placement.select('bottom'), units='in')
+
+            for name in self.pnp_formats:
+                paths = PNP_FORMATS[name].write(placement, output_dir, self.pnp_rotation_offsets)
+                self.debug_log(f"Pick-and-place layout {name}: "
+                               f"{', '.join(os.path.basename(path) for path in paths)}", "INFO")
+            return True
+
+        except subprocess.CalledProcessError as e:
+            self.debug_log(f"Position export failed: {e.stderr}", "ERROR")
+            return False
+        except Exception as e:
+            self.debug_log(f"Error in generate_position_files: {str(e)}", "ERROR")
+            return False
+
+    def component_table_commands(self, output_csv):
+        return [
+            # One row per symbol with every field a BOM is made of
+            [
+                self.kicad_cli, 'sch', 'export', 'bom',
+                '--output', output_csv,
+                '--fields', ','.join(TABLE_FIELDS),
+                '--labels', ','.join(TABLE_LABELS),
+                '--field-delimiter', ',',
+                '--string-delimiter', '"',
+                self.schematic_file
+            ],
+            # kicad-cli's default fields, for versions that reject the field list
+            [
+                self.kicad_cli, 'sch', 'export', 'bom',
+                '--output', output_csv,
+                '--field-delimiter', ',',
+                '--string-delimiter', '"',
+                self.schematic_file
             ]
-            
-            result_back = subprocess.run(
-                command_back,
+        ]
+
+    def get_component_table(self, background=False):
+        """The schematic's symbols, exported by kicad-cli once per schematic state; None on failure"""
+        if not self.schematic_file or not os.path.exists(self.schematic_file):
+            self.debug_log("Schematic file not found for BOM generation", "WARNING")
+            return None
+        fingerprint = self.artifact_fingerprint(BOM_ROLES)
+        if self.component_table is not None and self.component_table[0] == fingerprint:
+            return self.component_table[1]
+        if not self.temp_file_path:
+            self.generate_temp_file_folder()
+
+        output_csv = os.path.join(self.temp_file_path, 'components.csv')
+        for command in self.component_table_commands(output_csv):
+            result = self.run_kicad_cli(
+                command,
+                background=background,
                 capture_output=True,
                 text=True,
+                errors='replace',
                 timeout=30
             )
-            
-            return result_front.returncode == 0 and result_back.returncode == 0
-            
-        except Exception as e:
-            self.debug_log(f"Error in generate_position_files: {str(e)}", "ERROR")
-            return False
+            if result.returncode != 0 or not os.path.exists(output_csv):
+                self.debug_log(f"BOM export failed: {result.stderr.strip()[-500:]}", "WARNING")
+                continue
+            try:
+                table = ComponentTable.load(output_csv)
+            except ValueError as e:
+                self.debug_log(f"Unusable BOM export: {str(e)}", "WARNING")
+                continue
+            finally:
+                os.remove(output_csv)
+            self.debug_log(f"Component table: {len(table)} symbols", "INFO")
+            self.component_table = (fingerprint, table)
+            return table
+
+        self.debug_log("All BOM export commands failed", "ERROR")
+        return None
 
     def generate_bom_file(self, output_file):
-        """Generate BOM file from schematic"""
+        """Generate the production BOM, a row per placed reference"""
         try:
             self.debug_log(f"Generating BOM file: {output_file}", "INFO")
-            
-            if not self.schematic_file or not os.path.exists(self.schematic_file):
-                self.debug_log("Schematic file not found for BOM generation", "WARNING")
+            table = self.get_component_table()
+            if table is None:
                 return False
-            
-            # Try multiple BOM command variations for KiCad 9.0 with Dokuly-compatible format
-            commands_to_try = [
-                # Command 1: Custom fields for Dokuly API format
-                [
-                    self.kicad_cli, 'sch', 'export', 'bom',
-                    '--output', output_file,
-                    '--fields', 'Reference,Value,Footprint,${QUANTITY},${DNP}',
-                    '--labels', 'Reference,MPN,Footprint,QUANTITY,DNP',
-                    '--field-delimiter', ',',
-                    '--string-delimiter', '"',
-                    '--exclude-dnp',
-                    self.schematic_file
-                ],
-                # Command 2: Alternative field mapping
-                [
-                    self.kicad_cli, 'sch', 'export', 'bom',
-                    '--output', output_file,
-                    '--fields', 'Reference,Value,${QUANTITY},${DNP}',
-                    '--labels', 'Reference,MPN,QUANTITY,DNP',
-                    '--field-delimiter', ',',
-                    '--string-delimiter', '"',
-                    self.schematic_file
-                ],
-                # Command 3: Basic command with default fields
-                [
-                    self.kicad_cli, 'sch', 'export', 'bom',
-                    '--output', output_file,
-                    '--field-delimiter', ',',
-                    '--string-delimiter', '"',
-                    self.schematic_file
-                ]
-            ]
-            
-            for i, command in enumerate(commands_to_try):
-                result = subprocess.run(
-                    command,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                
-                if result.returncode == 0 and os.path.exists(output_file):
-                    # Post-process the BOM file to ensure Dokuly-compatible format
-                    if self.post_process_bom_file(output_file):
-                        self.debug_log("BOM file generated successfully", "INFO")
-                        return True
-                    else:
-                        self.debug_log("BOM file post-processing failed", "WARNING")
-                        continue
-                else:
-                    continue
-            
-            self.debug_log("All BOM generation commands failed", "ERROR")
-            return False
-            
-        except Exception as e:
-            self.debug_log(f"Error in generate_bom_file: {str(e)}", "ERROR")
-            return False
-
-    def post_process_bom_file(self, bom_file_path):
-        """Post-process BOM file to ensure Dokuly-compatible format"""
-        try:
-            
-            # Read the generated BOM file
-            with open(bom_file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            if not lines:
-                self.debug_log("BOM file is empty", "ERROR")
-                return False
-            
-            # Process the header and data
-            processed_lines = []
-            header_processed = False
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                if not header_processed:
-                    # Process header to ensure correct column names
-                    header = line.split(',')
-                    processed_header = []
-                    
-                    for col in header:
-                        col = col.strip().strip('"')
-                        # Map common column names to Dokuly format
-                        if col.lower() in ['ref', 'reference', 'designator', 'find', 'f/n', 'find no', 'parts']:
-                            processed_header.append('Reference')
-                        elif col.lower() in ['value', 'part number', 'p/n', 'part no', 'pn', 'mpn']:
-                            processed_header.append('MPN')
-                        elif col.lower() in ['quantity', 'qty', 'amount']:
-                            processed_header.append('QUANTITY')
-                        elif col.lower() in ['dnp', 'dn', 'do not mount', 'dnm']:
-                            processed_header.append('DNP')
-                        else:
-                            processed_header.append(col)
-                    
-                    # Ensure we have the required columns
-                    required_columns = ['Reference', 'MPN', 'QUANTITY']
-                    for req_col in required_columns:
-                        if req_col not in processed_header:
-                            processed_header.append(req_col)
-                    
-                    processed_lines.append(','.join(f'"{col}"' for col in processed_header))
-                    header_processed = True
-                    
-                else:
-                    # Process data rows
-                    parts = line.split(',')
-                    processed_parts = []
-                    
-                    for i, part in enumerate(parts):
-                        part = part.strip().strip('"')
-                        
-                        # Ensure QUANTITY is a valid integer
-                        if i == processed_lines[0].count(',') - 2:  # QUANTITY column (second to last)
-                            try:
-                                quantity = int(part) if part else 1
-                                processed_parts.append(f'"{quantity}"')
-                            except ValueError:
-                                processed_parts.append('"1"')
-                        else:
-                            processed_parts.append(f'"{part}"')
-                    
-                    processed_lines.append(','.join(processed_parts))
-            
-            # Write the processed BOM file
-            with open(bom_file_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(processed_lines))
-            
-            self.debug_log("BOM file post-processed successfully", "INFO")
+            table.write_csv(output_file, PRODUCTION_COLUMNS, exclude_dnp=True)
+            self.debug_log("BOM file generated successfully", "INFO")
             return True
-            
+
         except Exception as e:
-            self.debug_log(f"Error post-processing BOM file: {str(e)}", "ERROR")
+            self.debug_log(f"Error in generate_bom_file: {str(e)}", "ERROR")
             return False
 
     def get_step_version_info(self):
@@ -852,34 +1268,27 @@ class KiCadTool(wx.Frame):
             self.debug_log(f"Error generating version info: {str(e)}", "ERROR")
             return f"{self.pcba_number}_{self.revision}_{datetime.now().strftime('%y%m%d%H%M')}"
 
-    def add_version_metadata_to_step(self, step_file_path):
-        """Add version metadata to STEP file for mechanical integration tracking"""
+    def add_version_metadata_to_step(self, step_file_path, output_path=None):
+        """Add version metadata to STEP file for mechanical integration tracking
+
+        With output_path the patched copy is written there and step_file_path is left as it is.
+        A version comment from an earlier export is replaced.
+        """
         try:
             if not os.path.exists(step_file_path):
                 return False
                 
-            # Read the STEP file
-            with open(step_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
             # Add version information as a comment in the STEP file
             version_info = self.get_step_version_info()
-            version_comment = f"\n/* VERSION_INFO: {version_info} */\n"
+            version_comment = f"\n{VERSION_COMMENT_PREFIX} {version_info} */\n"
             
-            # Insert version comment after the header
-            if "ISO-10303-21" in content:
-                # Find the end of the header section
-                header_end = content.find("ENDSEC;")
-                if header_end != -1:
-                    # Insert version comment after header
-                    new_content = content[:header_end + 7] + version_comment + content[header_end + 7:]
-                    
-                    # Write back to file
-                    with open(step_file_path, 'w', encoding='utf-8') as f:
-                        f.write(new_content)
-                    
-                    self.debug_log("Added version metadata to STEP file", "INFO")
-                    return True
+            # Insert version comment after the header, streaming the rest of the file
+            with self.tracer.span('step version metadata', 'step', bytes=path_size(step_file_path)):
+                inserted = insert_after_header(step_file_path, version_comment, output_path,
+                                               replace=VERSION_COMMENT_PREFIX.encode('utf-8'))
+            if inserted:
+                self.debug_log("Added version metadata to STEP file", "INFO")
+                return True
             
             self.debug_log("Could not add version metadata - STEP file format not recognized", "WARNING")
             return False
@@ -888,66 +1297,60 @@ class KiCadTool(wx.Frame):
             self.debug_log(f"Error adding version metadata: {str(e)}", "ERROR")
             return False
 
-    def generate_step_file(self, output_file):
+    def step_export_target(self, profile, output_file):
+        """(kicad-cli export, file it writes) for a 3D model destined for output_file"""
+        # A .stpZ comes straight from kicad-cli where it can write one, otherwise
+        # the plain STEP is gzipped once the version metadata is in
+        compress = output_file.lower().endswith(STEPZ_EXTENSION.lower())
+        native = compress and 'stpz' in self.kicad_cli_commands('pcb', 'export')
+        if compress and not native:
+            return profile.export, os.path.splitext(output_file)[0] + '.step'
+        return ('stpz' if native else profile.export), output_file
+
+    def step_export_commands(self, profile, export_kind, export_file, model_paths):
+        # Try the profile's option sets from most to least specific, for different KiCad versions
+        export_command = [self.kicad_cli, 'pcb', 'export', export_kind, '--output', export_file]
+        for variable, path in model_paths.items():
+            export_command += ['--define-var', f'{variable}={path}']
+        version_var = ['--define-var', f'STEP_VERSION={self.get_step_version_info()}']
+        commands = [export_command + options + version_var + [self.pcb_file]
+                    for options in profile.option_sets]
+        # Without version info (fallback)
+        commands.append(export_command + profile.option_sets[-1] + [self.pcb_file])
+        if not profile.option_sets[-1]:
+            # Alternative syntax
+            commands.append([self.kicad_cli, 'pcb', 'export', export_kind, export_file, self.pcb_file])
+        return commands
+
+    def generate_step_file(self, output_file, profile=None, background=False):
         """Generate STEP file for 3D visualization and mechanical integration"""
         try:
-            self.debug_log(f"Generating STEP file: {output_file}", "INFO")
-            
-            # Try different command variations for different KiCad versions
-            commands_to_try = [
-                # KiCad 9.0+ with all options and version info
-                [
-                    self.kicad_cli, 'pcb', 'export', 'step',
-                    '--output', output_file,
-                    '--subst-models',
-                    '--min-distance', '0.1',
-                    '--max-distance', '2.0',
-                    '--define-var', f'STEP_VERSION={self.get_step_version_info()}',
-                    self.pcb_file
-                ],
-                # KiCad 9.0+ simplified with version info
-                [
-                    self.kicad_cli, 'pcb', 'export', 'step',
-                    '--output', output_file,
-                    '--subst-models',
-                    '--define-var', f'STEP_VERSION={self.get_step_version_info()}',
-                    self.pcb_file
-                ],
-                # KiCad 9.0+ basic with version info
-                [
-                    self.kicad_cli, 'pcb', 'export', 'step',
-                    '--output', output_file,
-                    '--define-var', f'STEP_VERSION={self.get_step_version_info()}',
-                    self.pcb_file
-                ],
-                # KiCad 9.0+ basic without version info (fallback)
-                [
-                    self.kicad_cli, 'pcb', 'export', 'step',
-                    '--output', output_file,
-                    self.pcb_file
-                ],
-                # Alternative syntax
-                [
-                    self.kicad_cli, 'pcb', 'export', 'step',
-                    output_file,
-                    self.pcb_file
-                ]
-            ]
+            profile = profile or PROFILES['full']
+            self.debug_log(f"Generating {profile.label}: {output_file}", "INFO")
+
+            export_kind, export_file = self.step_export_target(profile, output_file)
+            model_paths = self.model_path_overrides()
+            commands_to_try = self.step_export_commands(profile, export_kind, export_file, model_paths)
             
             for i, command in enumerate(commands_to_try):
                 try:
-                    result = subprocess.run(
+                    result = self.run_kicad_cli(
                         command,
+                        background=background,
                         capture_output=True,
                         text=True,
-                        timeout=120  # STEP generation can take longer
+                        timeout=profile.timeout,  # STEP generation can take longer
+                        env=dict(os.environ, **model_paths) if model_paths else None
                     )
                     
                     # Check if file was actually created and has content (regardless of return code)
-                    if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+                    if os.path.exists(export_file) and os.path.getsize(export_file) > 0:
                         # Add version metadata to the STEP file
-                        self.add_version_metadata_to_step(output_file)
-                        self.debug_log("STEP file generated successfully", "INFO")
+                        if profile.is_step:
+                            self.add_version_metadata_to_step(export_file)
+                        if export_file != output_file:
+                            self.compress_step_file(export_file, output_file)
+                        self.debug_log(f"{profile.label} generated successfully", "INFO")
                         return True
                     else:
                         continue
@@ -957,23 +1360,103 @@ class KiCadTool(wx.Frame):
                     continue
             
             # If we get here, all commands failed
-            self.debug_log("All STEP generation commands failed", "ERROR")
+            self.debug_log(f"All {profile.label} generation commands failed", "ERROR")
             return False
                 
         except Exception as e:
             self.debug_log(f"Error in generate_step_file: {str(e)}", "ERROR")
             return False
 
-    def generate_step_file_for_upload(self):
+    def model_path_overrides(self):
+        """Point the 3D model path variables at the local model mirror, refreshing it first"""
+        if self.mirror_models == 'false' or not self.pcb_file:
+            return {}
+        try:
+            if self.model_mirror is None:
+                self.model_mirror = ModelMirror(os.path.join(self.get_cache_folder(), 'model_mirror'),
+                                                max_bytes=self.temp_max_mb * 1024 * 1024)
+            with self.tracer.span('mirror 3D models', 'step') as span:
+                overrides, stats = self.model_mirror.sync(
+                    model_references(self.pcb_file), only_remote=self.mirror_models == 'auto')
+                span.set(files=stats.files, copied=stats.copied, bytes_copied=stats.bytes_copied,
+                         pruned=stats.pruned, variables=sorted(overrides))
+            if stats.copied:
+                self.debug_log(f"Model mirror: copied {stats.copied} of {stats.files} 3D models "
+                               f"({stats.bytes_copied / (1024 * 1024):.1f} MB)", "INFO")
+            if stats.pruned:
+                self.debug_log(f"Model mirror: removed {stats.pruned} unused 3D models "
+                               f"({stats.bytes_pruned / (1024 * 1024):.1f} MB)", "INFO")
+            if overrides:
+                self.debug_log(f"Reading 3D models from the local mirror for {', '.join(sorted(overrides))}", "INFO")
+            return overrides
+        except Exception as e:
+            self.debug_log(f"Could not update the 3D model mirror: {str(e)}", "WARNING")
+            return {}
+
+    def compress_step_file(self, step_path, output_path):
+        """Gzip a STEP file into a .stpZ, removing the plain file"""
+        size = os.path.getsize(step_path)
+        with self.tracer.span('compress step', 'step', bytes_in=size) as span:
+            compressed_size = compress_step(step_path, output_path)
+            span.set(bytes=compressed_size)
+        os.remove(step_path)
+        ratio = compressed_size / size if size else 1.0
+        self.debug_log(f"Compressed STEP file: {size} -> {compressed_size} bytes ({ratio:.0%})", "INFO")
+
+    def model_cache_entry(self, profile, output_file):
+        """(artifact name, export settings, cached file) of a 3D profile"""
+        extension = os.path.splitext(output_file)[1]
+        extra = dict(profile.cache_key(extension), kicad_cli=self.kicad_cli)
+        name, cached_path = self.board_cache_entry('models', f"model_{profile.name}", f"{profile.name}{extension}")
+        return name, extra, cached_path
+
+    def model_is_cached(self, profile, output_file):
+        name, extra, cached_path = self.model_cache_entry(profile, output_file)
+        return os.path.exists(cached_path) and self.is_artifact_fresh(name, MODEL_ROLES, extra)
+
+    def generate_3d_model(self, profile, output_file, background=False):
+        """Export one 3D profile, reusing its cached export if the board and models are unchanged"""
+        name, extra, cached_path = self.model_cache_entry(profile, output_file)
+        try:
+            if self.model_is_cached(profile, output_file):
+                with self.tracer.span(f"cached {profile.name} model", 'step') as span:
+                    # The cached header carries the timestamp of the export that made it
+                    if profile.is_step and self.add_version_metadata_to_step(cached_path, output_file):
+                        span.set(method='patched')
+                    else:
+                        span.set(method=publish_file(cached_path, output_file, link=False))
+                self.print_output(f"♻️ {profile.label} unchanged, reusing the previous export\n")
+                return True
+        except Exception as e:
+            self.debug_log(f"Could not reuse cached {profile.label}: {str(e)}", "WARNING")
+
+        if profile.export != 'step' and profile.export not in self.kicad_cli_commands('pcb', 'export'):
+            self.print_output(f"⚠️ This kicad-cli cannot export {profile.label}, skipping it\n")
+            return False
+
+        if not self.generate_step_file(output_file, profile, background):
+            return False
+
+        try:
+            os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+            publish_file(output_file, cached_path, link=False)
+            self.record_artifact(name, [cached_path], MODEL_ROLES, extra)
+        except Exception as e:
+            self.debug_log(f"Could not cache {profile.label}: {str(e)}", "WARNING")
+        return True
+
+    def generate_step_file_for_upload(self, profile=None):
         """Generate STEP file for upload to Dokuly"""
         try:
+            profile = profile or PROFILES['full']
             # Include datetime in filename for version tracking
             from datetime import datetime
             timestamp = datetime.now().strftime("%y%m%d%H%M")
-            step_filename = f"{self.pcba_number}_{self.revision}_{timestamp}.step"
+            step_filename = profile.filename(f"{self.pcba_number}_{self.revision}_{timestamp}",
+                                             self.step_extension())
             step_path = os.path.join(self.temp_file_path, step_filename)
             
-            if self.generate_step_file(step_path):
+            if self.generate_3d_model(profile, step_path):
                 return step_path
             else:
                 return None
@@ -982,40 +1465,117 @@ class KiCadTool(wx.Frame):
             self.debug_log(f"Error generating STEP file for upload: {str(e)}", "ERROR")
             return None
 
-    def upload_step_file(self, step_file_path):
+    def upload_step_file(self, step_file_path, label='STEP file'):
         """Upload STEP file to Dokuly"""
         try:
-            self.print_output('\nUploading STEP file to Dokuly...\n')
+            content_type = model_content_type(step_file_path)
+            if self.queue_upload(step_file_path, os.path.basename(step_file_path),
+                                 lambda: self.upload_step_file(step_file_path, label),
+                                 content_type=content_type):
+                return True
+
+            self.print_output(f'\nUploading {label} to Dokuly...\n')
             
             with open(step_file_path, 'rb') as f:
                 files = {
-                    'file': (os.path.basename(step_file_path), f, 'application/step'),
+                    'file': (os.path.basename(step_file_path), f, content_type),
                     'display_name': (None, os.path.basename(step_file_path))
                 }
                 headers = {
                     "Authorization": f"Api-Key {self.dokuly_api_key}",
                 }
                 
-                response = self.make_request('POST', self.file_upload_pcba_url, 
-                                           files=files, headers=headers, timeout=60)
+                response = self.post_to_pcba('file_upload_pcba_url', 
+                                             files=files, headers=headers, timeout=60)
                 
                 if response.status_code in [200, 201]:
-                    self.print_output('✅ STEP file uploaded successfully.\n')
+                    self.print_output(f'✅ {label} uploaded successfully.\n')
                     return True
                 else:
-                    self.print_output(f'❌ Failed to upload STEP file. Status code: {response.status_code}\n')
+                    self.print_output(f'❌ Failed to upload {label}. Status code: {response.status_code}\n')
                     self.print_output(f'Response: {response.text}\n')
                     return False
                     
         except Exception as e:
-            self.print_output(f'❌ Error uploading STEP file: {str(e)}\n')
+            self.print_output(f'❌ Error uploading {label}: {str(e)}\n')
             self.debug_log(f"Error uploading STEP file: {str(e)}", "ERROR")
             return False
 
-    def generate_production_zip_for_upload(self):
-        """Generate production ZIP for upload to Dokuly"""
+    def manufacturing_command(self, package_format, output_file):
+        return [
+            self.kicad_cli, 'pcb', 'export', package_format.export,
+            '--output', output_file
+        ] + package_format.options + [self.pcb_file]
+
+    def package_cache_entry(self, package_format):
+        """(artifact name, export settings, cached file) of a manufacturing package"""
+        extra = dict(package_format.cache_key(), kicad_cli=self.kicad_cli)
+        name, cached_path = self.board_cache_entry(
+            'packages', f"package_{package_format.name}", f"{package_format.name}{package_format.extension}")
+        return name, extra, cached_path
+
+    def generate_manufacturing_package(self, package_format, output_file, background=False):
+        """Export an IPC-2581 or ODB++ package, reusing the cached one while the board is unchanged"""
+        name, extra, cached_path = self.package_cache_entry(package_format)
+        try:
+            if os.path.exists(cached_path) and self.is_artifact_fresh(name, PACKAGE_ROLES, extra):
+                publish_file(cached_path, output_file, link=False)
+                self.debug_log(f"{package_format.label} unchanged, reusing the previous export", "INFO")
+                return True
+        except Exception as e:
+            self.debug_log(f"Could not reuse cached {package_format.label}: {str(e)}", "WARNING")
+
+        if package_format.export not in self.kicad_cli_commands('pcb', 'export'):
+            self.print_output(f"⚠️ This kicad-cli cannot export an {package_format.label} (KiCad 9+), skipping it\n")
+            return False
+
+        self.print_output(f'\nGenerating {package_format.label}...\n')
+        if not background:
+            wx.Yield()
+        result = self.run_kicad_cli(
+            self.manufacturing_command(package_format, output_file),
+            background=background,
+            capture_output=True,
+            text=True,
+            errors='replace',
+            timeout=120
+        )
+        if result.returncode != 0 or not os.path.exists(output_file):
+            self.print_output(f"❌ {package_format.label} export failed\n")
+            self.debug_log(f"{package_format.label} export failed: {result.stderr.strip()[-500:]}", "ERROR")
+            return False
+
+        try:
+            os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+            publish_file(output_file, cached_path, link=False)
+            self.record_artifact(name, [cached_path], PACKAGE_ROLES, extra)
+        except Exception as e:
+            self.debug_log(f"Could not cache {package_format.label}: {str(e)}", "WARNING")
+        return True
+
+    def generate_manufacturing_packages(self, output_dir):
+        """Export the configured manufacturing packages into output_dir; returns their paths"""
+        paths = []
+        for package_format in [PACKAGE_FORMATS[name] for name in self.manufacturing_formats]:
+            output_file = os.path.join(
+                output_dir, package_format.filename(f"{self.pcba_number}_{self.revision}"))
+            if self.generate_manufacturing_package(package_format, output_file):
+                paths.append(output_file)
+        return paths
+
+    def add_manufacturing_packages_to_production(self, production_dir):
+        """Put the manufacturing packages in the production folder, if they belong in the ZIP"""
+        if not (self.manufacturing_formats and self.manufacturing_in_zip):
+            return
+        package_dir = os.path.join(production_dir, 'manufacturing')
+        os.makedirs(package_dir)
+        if not self.generate_manufacturing_packages(package_dir):
+            os.rmdir(package_dir)
+
+    def generate_production_files_for_upload(self):
+        """Generate the production package contents for upload to Dokuly, returning their folder"""
         try:
-            self.debug_log("Starting production ZIP generation for upload", "INFO")
+            self.debug_log("Starting production file generation for upload", "INFO")
             
             # Create production directory
             production_dir = os.path.join(self.temp_file_path, 'production_upload')
@@ -1056,35 +1616,84 @@ class KiCadTool(wx.Frame):
             os.makedirs(pdf_dir)
             front_pdf, back_pdf = self.generate_pcb_pdf()
             if front_pdf and back_pdf:
-                shutil.copy2(front_pdf, os.path.join(pdf_dir, 'pcb_front.pdf'))
-                shutil.copy2(back_pdf, os.path.join(pdf_dir, 'pcb_back.pdf'))
-            
-            # Create ZIP file
-            zip_filename = f"{self.pcba_number}_{self.revision}_PRODUCTION.zip"
-            zip_path = os.path.join(self.temp_file_path, zip_filename)
-            
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(production_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, production_dir)
-                        zipf.write(file_path, arcname)
-            
-            # Verify ZIP was created
-            if os.path.exists(zip_path) and os.path.getsize(zip_path) > 0:
-                self.debug_log("Production ZIP created successfully", "INFO")
-                return zip_path
-            else:
-                self.debug_log("Production ZIP was not created or is empty", "ERROR")
-                return None
+                # Copies: the PDFs may still be queued for upload
+                self.publish_local_file(front_pdf, os.path.join(pdf_dir, 'pcb_front.pdf'))
+                self.publish_local_file(back_pdf, os.path.join(pdf_dir, 'pcb_back.pdf'))
+
+            # 6. IPC-2581 / ODB++ packages, if configured for the ZIP
+            self.add_manufacturing_packages_to_production(production_dir)
+
+            return production_dir
             
         except Exception as e:
-            self.debug_log(f"Error generating production ZIP for upload: {str(e)}", "ERROR")
+            self.debug_log(f"Error generating production files for upload: {str(e)}", "ERROR")
             return None
 
+    def push_production_zip(self, local_zip_path):
+        """Build the production ZIP, uploading it and saving it to local_zip_path in one pass"""
+        production_dir = self.generate_production_files_for_upload()
+        if not production_dir:
+            return False
+
+        package = self.make_package(self.directory_entries(production_dir))
+        display_name = os.path.basename(local_zip_path)
+        if (not self.stream_uploads or self.stream_rejected or self.upload_batch is not None or not self.pcba_pk
+                or package.matches(local_zip_path)
+                or self.upload_is_unchanged(local_zip_path, display_name, digest=package.digest, quiet=True)):
+            # Nothing to stream: write the local file and upload (or skip, or queue) from it
+            self.publish_package(package, local_zip_path)
+            self.upload_production_zip(local_zip_path)
+            return True
+
+        self.print_output('\nUploading Production ZIP to Dokuly...\n')
+        tee = publish_stream(package.chunks(), local_zip_path)
+        body, content_type = stream_multipart(
+            [('display_name', display_name)], 'file', display_name, tee, 'application/zip')
+        headers = {
+            "Authorization": f"Api-Key {self.dokuly_api_key}",
+            "Content-Type": content_type,
+        }
+
+        response = None
+        with self.tracer.span(f"stream {display_name}", 'zip', entries=len(package.entries),
+                              profile=self.zip_profile, workers=package.workers) as span:
+            try:
+                response = self.make_request('POST', self.file_upload_pcba_url,
+                                             data=body, headers=headers, timeout=120)
+            except requests.exceptions.RequestException as e:
+                self.debug_log(f"Error streaming Production ZIP: {str(e)}", "ERROR")
+            finally:
+                # Finish the local copy even if the upload stopped part-way
+                for _ in tee:
+                    pass
+            span.set(bytes=path_size(local_zip_path), stored=package.stats.stored,
+                     deflated=package.stats.deflated)
+
+        if response is not None and response.status_code in [200, 201]:
+            self.print_output('✅ Production ZIP uploaded successfully.\n')
+            self.record_upload(local_zip_path, display_name)
+            return True
+
+        if response is not None and response.status_code in CHUNKED_REJECTED_STATUSES:
+            # Servers without a buffering proxy may refuse chunked request bodies
+            self.debug_log(f"Streamed upload rejected with status {response.status_code}, "
+                           f"not streaming uploads for the rest of the session", "WARNING")
+            self.stream_rejected = True
+        # The local file is complete either way; upload it as usual, with its retries
+        # (and a PCBA refetch if a 404 came from a stale cached PCBA ID)
+        self.upload_production_zip(local_zip_path)
+        return True
+
     def upload_production_zip(self, zip_file_path):
         """Upload production ZIP to Dokuly"""
         try:
+            if self.upload_is_unchanged(zip_file_path, os.path.basename(zip_file_path)):
+                return True
+            if self.queue_upload(zip_file_path, os.path.basename(zip_file_path),
+                                 lambda: self.upload_production_zip(zip_file_path),
+                                 content_type='application/zip'):
+                return True
+
             self.print_output('\nUploading Production ZIP to Dokuly...\n')
             
             with open(zip_file_path, 'rb') as f:
@@ -1096,11 +1705,12 @@ class KiCadTool(wx.Frame):
                     "Authorization": f"Api-Key {self.dokuly_api_key}",
                 }
                 
-                response = self.make_request('POST', self.file_upload_pcba_url, 
-                                           files=files, headers=headers, timeout=120)
+                response = self.post_to_pcba('file_upload_pcba_url', 
+                                             files=files, headers=headers, timeout=120)
                 
                 if response.status_code in [200, 201]:
                     self.print_output('✅ Production ZIP uploaded successfully.\n')
+                    self.record_upload(zip_file_path, os.path.basename(zip_file_path))
                     return True
                 else:
                     self.print_output(f'❌ Failed to upload Production ZIP. Status code: {response.status_code}\n')
@@ -1112,6 +1722,7 @@ class KiCadTool(wx.Frame):
             self.debug_log(f"Error uploading Production ZIP: {str(e)}", "ERROR")
             return False
 
+    @exclusive_build
     def generate_step_file_only(self, event):
         """Generate only a STEP file for 3D visualization"""
         self.print_output("\n🎯 Generating STEP File...\n")
@@ -1130,12 +1741,14 @@ class KiCadTool(wx.Frame):
             # Include datetime in filename for version tracking
             from datetime import datetime
             timestamp = datetime.now().strftime("%y%m%d%H%M")
-            step_filename = f"{self.pcba_number}_{self.revision}_{timestamp}.step"
+            step_filename = f"{self.pcba_number}_{self.revision}_{timestamp}{self.step_extension()}"
             step_path = os.path.join(os.path.dirname(self.pcb_file), step_filename)
+            workspace_step_path = os.path.join(self.temp_file_path, step_filename)
             
             self.print_output(f"🔧 Generating STEP file: {step_filename}\n")
             
-            if self.generate_step_file(step_path):
+            if self.generate_step_file(workspace_step_path):
+                self.publish_local_file(workspace_step_path, step_path, move=True)
                 # Get file size
                 file_size = os.path.getsize(step_path)
                 size_mb = file_size / (1024 * 1024)
@@ -1170,6 +1783,7 @@ class KiCadTool(wx.Frame):
             self.print_output(f"❌ Error generating STEP file: {str(e)}\n")
             self.debug_log(f"STEP file generation error: {str(e)}", "ERROR")
 
+    @exclusive_build
     def push_pcba_to_dokuly(self, event):
         # Generate timestamp for version tracking (used throughout the method)
         from datetime import datetime
@@ -1197,114 +1811,179 @@ class KiCadTool(wx.Frame):
             self.print_output('\n💡 Click the "Configure Plugin" button to set up missing items.\n')
             return
 
+        self.begin_run('push')
+        self.start_trace()
+        if self.pcb_file:
+            # Sub-sheets or 3D models may have been added since the last run
+            self.scan_project_inputs()
         self.print_output(
             '\n\nPushing PCBA to dokuly... PLEASE WAIT UNTIL UPLOAD IS COMPLETED; DO NOT CLOSE OR RETRY.\n\n')
+        self.begin_upload_batch()
 
+        # Rendered in the background while the jobset and the other exports run
         try:
-            pcb_front_pdf_file_path, pcb_back_pdf_file_path = self.generate_pcb_pdf()
-            if pcb_front_pdf_file_path and pcb_back_pdf_file_path:
-                self.upload_pcb_pdf(pcb_front_pdf_file_path,
-                                    pcb_back_pdf_file_path)
-            else:
-                self.print_output(
-                    '\nFailed to generate PCB PDF. No path found.\n')
+            thumbnail = self.start_thumbnail()
         except Exception as e:
-            self.print_output(
-                '\nAn error occurred during PCB PDF generation.\n')
-            self.print_output(f"\nError: {str(e)}\n")
+            self.debug_log(f"Could not start the thumbnail render: {str(e)}", "WARNING")
+            thumbnail = None
 
-        try:
-            gerber_and_drill_file_path = self.generate_gerber_and_drill_file()
-            if gerber_and_drill_file_path:
-                self.upload_gerber_and_drill_files(gerber_and_drill_file_path)
-            else:
+        with self.tracer.span('jobset', 'stage'):
+            try:
+                self.run_export_jobset()
+            except Exception as e:
+                self.debug_log(f"Could not prepare the export jobset: {str(e)}", "WARNING")
+
+        with self.tracer.span('pcb_pdf', 'stage'):
+            try:
+                pcb_front_pdf_file_path, pcb_back_pdf_file_path = self.generate_pcb_pdf()
+                if pcb_front_pdf_file_path and pcb_back_pdf_file_path:
+                    self.upload_pcb_pdf(pcb_front_pdf_file_path,
+                                        pcb_back_pdf_file_path)
+                else:
+                    self.print_output(
+                        '\nFailed to generate PCB PDF. No path found.\n')
+            except Exception as e:
                 self.print_output(
-                    '\nFailed to generate Gerber and drill files. No path found.\n')
-        except Exception as e:
-            self.print_output(
-                '\nAn error occurred during Gerber and drill file generation.\n')
-            self.print_output(f"\nError: {str(e)}\n")
+                    '\nAn error occurred during PCB PDF generation.\n')
+                self.print_output(f"\nError: {str(e)}\n")
 
-        try:
-            schematic_file_path = self.generate_schematic_pdf()
-            if schematic_file_path:
-                self.upload_schematic_pdf(schematic_file_path)
-            else:
+        with self.tracer.span('gerber_and_drill', 'stage'):
+            try:
+                gerber_and_drill_file_path = self.generate_gerber_and_drill_file()
+                if gerber_and_drill_file_path:
+                    self.upload_gerber_and_drill_files(gerber_and_drill_file_path)
+                else:
+                    self.print_output(
+                        '\nFailed to generate Gerber and drill files. No path found.\n')
+            except Exception as e:
                 self.print_output(
-                    '\nFailed to generate schematic PDF. No path found.\n')
-        except Exception as e:
-            self.print_output(
-                '\nAn error occurred during schematic PDF generation.\n')
-            self.print_output(f"\nError: {str(e)}\n")
+                    '\nAn error occurred during Gerber and drill file generation.\n')
+                self.print_output(f"\nError: {str(e)}\n")
 
-        try:
-            bom_path = self.generate_bom_csv()
-            if bom_path:
-                self.upload_bom_csv(bom_path)
-            else:
+        with self.tracer.span('schematic_pdf', 'stage'):
+            try:
+                schematic_file_path = self.generate_schematic_pdf()
+                if schematic_file_path:
+                    self.upload_schematic_pdf(schematic_file_path)
+                else:
+                    self.print_output(
+                        '\nFailed to generate schematic PDF. No path found.\n')
+            except Exception as e:
                 self.print_output(
-                    '\nFailed to generate BOM CSV. No path found.\n')
-        except Exception as e:
-            self.print_output(
-                '\nAn error occurred during BOM CSV generation.\n')
-            self.print_output(f"\nError: {str(e)}\n")
+                    '\nAn error occurred during schematic PDF generation.\n')
+                self.print_output(f"\nError: {str(e)}\n")
 
-        try:
-            zipped_position_files = self.generate_position_file()
-            if zipped_position_files:
-                self.upload_position_file(zipped_position_files)
-            else:
+        with self.tracer.span('bom_csv', 'stage'):
+            try:
+                bom_path = self.generate_bom_csv()
+                if bom_path:
+                    self.upload_bom_csv(bom_path)
+                else:
+                    self.print_output(
+                        '\nFailed to generate BOM CSV. No path found.\n')
+            except Exception as e:
                 self.print_output(
-                    '\nFailed to generate position file. No path found.\n')
-        except Exception as e:
-            self.print_output(
-                '\nAn error occurred during position file generation.\n')
-            self.print_output(f"\nError: {str(e)}\n")
+                    '\nAn error occurred during BOM CSV generation.\n')
+                self.print_output(f"\nError: {str(e)}\n")
 
-        # Generate and upload STEP file
-        try:
-            step_file_path = self.generate_step_file_for_upload()
-            if step_file_path:
-                # Upload to Dokuly
-                self.upload_step_file(step_file_path)
-                # Also save locally
-                local_step_path = os.path.join(os.path.dirname(self.pcb_file), 
-                                             f"{self.pcba_number}_{self.revision}_{timestamp}.step")
-                shutil.copy2(step_file_path, local_step_path)
-                self.print_output(f'✅ STEP file saved locally: {os.path.basename(local_step_path)}\n')
-            else:
+        with self.tracer.span('position_files', 'stage'):
+            try:
+                zipped_position_files = self.generate_position_file()
+                if zipped_position_files:
+                    self.upload_position_file(zipped_position_files)
+                else:
+                    self.print_output(
+                        '\nFailed to generate position file. No path found.\n')
+            except Exception as e:
                 self.print_output(
-                    '\nFailed to generate STEP file. No path found.\n')
-        except Exception as e:
-            self.print_output(
-                '\nAn error occurred during STEP file generation.\n')
-            self.print_output(f"\nError: {str(e)}\n")
+                    '\nAn error occurred during position file generation.\n')
+                self.print_output(f"\nError: {str(e)}\n")
+
+        # Generate and upload the 3D models of each configured profile
+        with self.tracer.span('step_file', 'stage'):
+            for profile in [PROFILES[name] for name in self.model_profiles]:
+                try:
+                    step_file_path = self.generate_step_file_for_upload(profile)
+                    if step_file_path:
+                        # Upload to Dokuly
+                        self.upload_step_file(step_file_path, profile.label)
+                        # Also save locally
+                        local_step_path = os.path.join(os.path.dirname(self.pcb_file), 
+                                                     os.path.basename(step_file_path))
+                        self.publish_local_file(step_file_path, local_step_path)
+                        self.print_output(f'✅ {profile.label} saved locally: {os.path.basename(local_step_path)}\n')
+                    else:
+                        self.print_output(
+                            f'\nFailed to generate {profile.label}. No path found.\n')
+                except Exception as e:
+                    self.print_output(
+                        f'\nAn error occurred during {profile.label} generation.\n')
+                    self.print_output(f"\nError: {str(e)}\n")
+
+        # Generate and upload the IPC-2581 / ODB++ packages
+        if self.manufacturing_formats:
+            with self.tracer.span('manufacturing_packages', 'stage'):
+                try:
+                    for package_format in [PACKAGE_FORMATS[name] for name in self.manufacturing_formats]:
+                        package_path = os.path.join(
+                            self.temp_file_path,
+                            package_format.filename(f"{self.pcba_number}_{self.revision}"))
+                        if self.generate_manufacturing_package(package_format, package_path):
+                            self.upload_file_to_pcba(
+                                package_path, os.path.splitext(os.path.basename(package_path))[0],
+                                package_format.name, False)
+                except Exception as e:
+                    self.print_output(
+                        '\nAn error occurred during manufacturing package generation.\n')
+                    self.print_output(f"\nError: {str(e)}\n")
 
         # Generate and upload Production ZIP
-        try:
-            production_zip_path = self.generate_production_zip_for_upload()
-            if production_zip_path:
-                # Upload to Dokuly
-                self.upload_production_zip(production_zip_path)
-                # Also save locally
+        with self.tracer.span('production_zip', 'stage'):
+            try:
                 local_zip_path = os.path.join(os.path.dirname(self.pcb_file), 
                                             f"{self.pcba_number}_{self.revision}_PRODUCTION.zip")
-                shutil.copy2(production_zip_path, local_zip_path)
-                self.print_output(f'✅ Production ZIP saved locally: {os.path.basename(local_zip_path)}\n')
-            else:
+                # Uploaded to Dokuly and saved locally in the same pass
+                if self.push_production_zip(local_zip_path):
+                    self.print_output(f'✅ Production ZIP saved locally: {os.path.basename(local_zip_path)}\n')
+                else:
+                    self.print_output(
+                        '\nFailed to generate Production ZIP. No path found.\n')
+            except Exception as e:
                 self.print_output(
-                    '\nFailed to generate Production ZIP. No path found.\n')
-        except Exception as e:
-            self.print_output(
-                '\nAn error occurred during Production ZIP generation.\n')
-            self.print_output(f"\nError: {str(e)}\n")
+                    '\nAn error occurred during Production ZIP generation.\n')
+                self.print_output(f"\nError: {str(e)}\n")
 
-        self.print_output(
-            '\n\n\n🎉 Upload completed! All files have been uploaded to Dokuly and saved locally.\n')
+        with self.tracer.span('thumbnail', 'stage'):
+            try:
+                thumbnail_path = self.finish_thumbnail(thumbnail)
+                if thumbnail_path:
+                    self.upload_thumbnail(thumbnail_path)
+            except Exception as e:
+                self.print_output(
+                    '\nAn error occurred during thumbnail generation.\n')
+                self.print_output(f"\nError: {str(e)}\n")
+
+        not_uploaded = []
+        with self.tracer.span('bulk_upload', 'stage'):
+            try:
+                not_uploaded = self.flush_upload_batch()
+            except Exception as e:
+                self.print_output('\nAn error occurred during the bulk upload.\n')
+                self.print_output(f"\nError: {str(e)}\n")
+
+        if not_uploaded:
+            self.print_output('\n\n\n⚠️ Upload finished, but these files could not be uploaded to Dokuly:\n')
+            for display_name in not_uploaded:
+                self.print_output(f'   • {display_name}\n')
+        else:
+            self.print_output(
+                '\n\n\n🎉 Upload completed! All files have been uploaded to Dokuly and saved locally.\n')
         self.print_output(
             '📁 Local files created:\n')
-        self.print_output(
-            f'   • {self.pcba_number}_{self.revision}_{timestamp}.step (3D model)\n')
+        for profile in [PROFILES[name] for name in self.model_profiles]:
+            model_filename = profile.filename(f"{self.pcba_number}_{self.revision}_{timestamp}",
+                                              self.step_extension())
+            self.print_output(f'   • {model_filename} ({profile.label})\n')
         self.print_output(
             f'   • {self.pcba_number}_{self.revision}_PRODUCTION.zip (manufacturing files)\n')
         self.print_output(
@@ -1319,17 +1998,17 @@ class KiCadTool(wx.Frame):
             '   • BOM CSV\n')
         self.print_output(
             '   • Position files\n')
-        self.print_output(
-            '   • STEP file (3D model)\n')
+        for profile in [PROFILES[name] for name in self.model_profiles]:
+            self.print_output(f'   • {profile.label[0].upper()}{profile.label[1:]} (3D model)\n')
+        for package_format in [PACKAGE_FORMATS[name] for name in self.manufacturing_formats]:
+            self.print_output(f'   • {package_format.label}\n')
         self.print_output(
             '   • Production ZIP (complete manufacturing package)\n\n')
 
-        # Currently not used, waiting for KiCad to add support for 3D model export jpg/png
-        # svg_file_path = self.generate_svg_thumbnail()
-        # if svg_file_path:
-        #     self.upload_svg_thumbnail(svg_file_path)
-        # else:
-        #     self.print_output('\nFailed to generate SVG thumbnail. No path found.\n')
+        self.jobset_outputs = {}
+        self.write_trace(f"push_{self.pcba_number}_{self.revision}")
+        self.end_run()
+        self.flush_log()
 
     def generate_position_file(self):
         if not self.pcb_file:
@@ -1348,54 +2027,19 @@ class KiCadTool(wx.Frame):
             output_pos_back = os.path.join(
                 self.temp_file_path, 'position_back.pos')
 
-            command_front = [
-                self.kicad_cli, 'pcb', 'export', 'pos',
-                '--output', output_pos_front,
-                '--side', 'front',  # Front side components
-                '--use-drill-file-origin',
-                '--exclude-dnp',  # Exclude Do Not Populate components
-                '--smd-only',  # Only include SMD components
-                '--units', 'mm',
-                # Default format is ascii
-                self.pcb_file
-            ]
-
-            command_back = [
-                self.kicad_cli, 'pcb', 'export', 'pos',
-                '--output', output_pos_back,
-                '--side', 'back',  # Back side components
-                '--use-drill-file-origin',
-                '--exclude-dnp',  # Exclude Do Not Populate components
-                '--smd-only',  # Only include SMD components
-                '--units', 'mm',
-                # Default format is ascii
-                self.pcb_file
-            ]
-
-            result = subprocess.run(
-                command_front,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                errors='replace'
-            )
-
-            result = subprocess.run(
-                command_back,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                errors='replace'
-            )
+            # ASCII .pos files of the SMD parts to place, from the drill/place file origin
+            placement = self.get_placement()
+            for side, output_pos in (('top', output_pos_front), ('bottom', output_pos_back)):
+                components = placement.select(side, smd_only=True, exclude_dnp=True, drill_origin=True)
+                write_kicad_ascii(output_pos, components, side, units='mm', created=placement.created,
+                                  kicad_version=pcbnew.GetBuildVersion())
 
             zip_file_name = os.path.join(
                 self.temp_file_path, 'position_files.zip')
-            with zipfile.ZipFile(zip_file_name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                zipf.write(output_pos_front,
-                           os.path.basename(output_pos_front))
-                zipf.write(output_pos_back, os.path.basename(output_pos_back))
+            self.zip_files([
+                (output_pos_front, os.path.basename(output_pos_front)),
+                (output_pos_back, os.path.basename(output_pos_back)),
+            ], zip_file_name)
 
             os.remove(output_pos_front)
             os.remove(output_pos_back)
@@ -1428,6 +2072,15 @@ class KiCadTool(wx.Frame):
         self.upload_file_to_pcba(
             position_file_path, display_name, file_type, gerber_files)
 
+    def schematic_pdf_command(self, output_pdf):
+        return [
+            self.kicad_cli, 'sch', 'export', 'pdf',
+            '--output', output_pdf,
+            '--drawing-sheet', self.drawing_sheet_path,
+            '--theme', self.theme_path,
+            self.schematic_file
+        ]
+
     def generate_schematic_pdf(self):
         if not self.schematic_file:
             self.print_output('\n\nSchematic file not specified.\n\n')
@@ -1444,15 +2097,9 @@ class KiCadTool(wx.Frame):
             self.print_output(f"\nOutput PDF: {output_pdf}\n")
             self.print_output(f"\nSchematic file: {self.pcb_file}\n")
 
-            command = [
-                self.kicad_cli, 'sch', 'export', 'pdf',
-                '--output', output_pdf,
-                '--drawing-sheet', self.drawing_sheet_path,
-                '--theme', self.theme_path,
-                self.schematic_file
-            ]
+            command = self.schematic_pdf_command(output_pdf)
 
-            result = subprocess.run(
+            result = self.run_kicad_cli(
                 command,
                 check=True,
                 stdout=subprocess.PIPE,
@@ -1486,6 +2133,31 @@ class KiCadTool(wx.Frame):
         self.upload_file_to_pcba(
             schematic_pdf_file_path, display_name, file_type, gerber_files)
 
+    def pcb_pdf_commands(self, output_pdf_front, output_pdf_back):
+        return [
+            # First PDF: Edge.Cuts and F.Fab
+            [
+                self.kicad_cli, 'pcb', 'export', 'pdf',
+                '--output', output_pdf_front,
+                '--layers', 'Edge.Cuts,F.Fab',
+                '--drawing-sheet', self.drawing_sheet_path,
+                '--theme', self.theme_path,
+                '--include-border-title',
+                self.pcb_file
+            ],
+            # Second PDF: Edge.Cuts and B.Fab, mirrored
+            [
+                self.kicad_cli, 'pcb', 'export', 'pdf',
+                '--output', output_pdf_back,
+                '--layers', 'Edge.Cuts,B.Fab',
+                '--drawing-sheet', self.drawing_sheet_path,
+                '--theme', self.theme_path,
+                '--mirror',
+                '--include-border-title',
+                self.pcb_file
+            ],
+        ]
+
     def generate_pcb_pdf(self):
         if not self.pcb_file:
             self.print_output('\nSchematic file not specified.\n')
@@ -1509,51 +2181,39 @@ class KiCadTool(wx.Frame):
                 self.print_output(f'\nTheme file not found at {theme_path}\n')
                 return None
 
-            # First PDF: Edge.Cuts and F.Fab
             output_pdf_front = os.path.join(
                 self.temp_file_path, 'pcb_front.pdf')
-
-            command_front = [
-                self.kicad_cli, 'pcb', 'export', 'pdf',
-                '--output', output_pdf_front,
-                '--layers', 'Edge.Cuts,F.Fab',
-                '--drawing-sheet', drawing_sheet_path,
-                '--theme', theme_path,
-                '--include-border-title',
-                self.pcb_file
-            ]
-
-            # Second PDF: Edge.Cuts and B.Fab, mirrored
             output_pdf_back = os.path.join(self.temp_file_path, 'pcb_back.pdf')
+            command_front, command_back = self.pcb_pdf_commands(output_pdf_front, output_pdf_back)
 
-            command_back = [
-                self.kicad_cli, 'pcb', 'export', 'pdf',
-                '--output', output_pdf_back,
-                '--layers', 'Edge.Cuts,B.Fab',
-                '--drawing-sheet', drawing_sheet_path,
-                '--theme', theme_path,
-                '--mirror',
-                '--include-border-title',
-                self.pcb_file
-            ]
+            # Only the back view is mirrored, so a single 'pcb export pdf' can't produce both.
+            # Where kicad-cli has jobsets, both come from one process loading the board once.
+            added = []
+            if (self.jobsets_supported() and not all(
+                    command_key(command) in self.jobset_outputs for command in (command_front, command_back))):
+                added = self.run_jobset([command_front, command_back], 'pcb_pdf')
 
-            result_front = subprocess.run(
-                command_front,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                errors='replace'
-            )
+            try:
+                result_front = self.run_kicad_cli(
+                    command_front,
+                    check=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    errors='replace'
+                )
 
-            result_back = subprocess.run(
-                command_back,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                errors='replace'
-            )
+                result_back = self.run_kicad_cli(
+                    command_back,
+                    check=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    errors='replace'
+                )
+            finally:
+                for key in added:
+                    self.jobset_outputs.pop(key, None)
 
             return output_pdf_front, output_pdf_back
 
@@ -1598,30 +2258,16 @@ class KiCadTool(wx.Frame):
             if not self.temp_file_path:
                 self.generate_temp_file_folder()
 
-            output_csv = os.path.join(self.temp_file_path, 'bom.csv')
-            command = [
-                self.kicad_cli, 'sch', 'export', 'bom',
-                "--output", output_csv, "--fields", "Reference,MPN,${QUANTITY},${DNP}",
-                "--string-delimiter", "\"",
-                "--group-by", "MPN,${DNP}",
-                self.schematic_file
-            ]
-
-            result = subprocess.run(
-                command,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                errors='replace'
-            )
+            table = self.get_component_table()
+            if table is None:
+                self.print_output('\nBOM generation failed.')
+                return None
 
+            # Grouped by MPN and DNP, like kicad-cli's --group-by MPN,${DNP}
+            output_csv = os.path.join(self.temp_file_path, 'bom.csv')
+            table.write_csv(output_csv, DOKULY_COLUMNS, group_by=('mpn', 'dnp'))
             return output_csv
 
-        except subprocess.CalledProcessError as e:
-            self.print_output('\nSVG generation failed.')
-            self.print_output(f"\nError output:\n{str(e.stderr)}")
-            return None
         except Exception as e:
             self.print_output(
                 '\nAn unexpected error occurred during BOM generation.')
@@ -1646,8 +2292,8 @@ class KiCadTool(wx.Frame):
             data = {'app': "pcbas", "display_name": self.pcba_number +
                     "_bom", "item_id": self.pcba_pk}
             try:
-                response = self.make_request(
-                    'POST', self.bom_upload_url, headers=headers, files=files, data=data)
+                response = self.post_to_pcba(
+                    'bom_upload_url', headers=headers, files=files, data=data)
 
                 self.handle_request_error(response, "BOM CSV upload")
             except requests.exceptions.RequestException as e:
@@ -1658,52 +2304,122 @@ class KiCadTool(wx.Frame):
         except Exception as e:
             self.print_output(f"\nFailed to delete {bom_csv_file_path}: {e}\n")
 
-    def generate_svg_thumbnail(self):
-        if not self.pcb_file:
-            self.print_output('\nPlease open a PCB file first.\n')
+    def thumbnail_command(self, view, output_png):
+        width, height = self.thumbnail_render_size
+        return [
+            self.kicad_cli, 'pcb', 'render',
+            '--output', output_png,
+            '--side', view,
+            '--width', str(width),
+            '--height', str(height),
+            '--background', 'opaque',
+            '--quality', 'basic',
+            self.pcb_file
+        ]
+
+    def thumbnail_cache_entry(self):
+        """(artifact name, render settings, cached file) of the thumbnail"""
+        extra = {'views': self.thumbnail_views, 'render_size': self.thumbnail_render_size,
+                 'size': self.thumbnail_size, 'kicad_cli': self.kicad_cli}
+        name, cached_path = self.board_cache_entry('thumbnails', 'thumbnail', 'thumbnail.png')
+        return name, extra, cached_path
+
+    def start_thumbnail(self, background=False):
+        """Start rendering the PNG thumbnail on a background thread; returns a future, or None"""
+        if not self.thumbnail_views or not self.pcb_file:
+            return None
+        output_png = os.path.join(self.temp_file_path, f"{self.pcba_number}_thumbnail.png")
+        name, extra, cached_path = self.thumbnail_cache_entry()
+        if os.path.exists(cached_path) and self.is_artifact_fresh(name, MODEL_ROLES, extra):
+            publish_file(cached_path, output_png, link=False)
+            self.debug_log("Board unchanged, reusing the previous thumbnail", "INFO")
+            return output_png
+        if 'render' not in self.kicad_cli_commands('pcb'):
+            self.debug_log("This kicad-cli cannot render PNG images (KiCad 9+), no thumbnail", "INFO")
             return None
 
-        self.print_output('\nGenerating SVG thumbnail...\n')
-        wx.Yield()  # Update GUI
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnail')
+        future = executor.submit(self.render_thumbnail, output_png, background)
+        executor.shutdown(wait=False)
+        return future
+
+    def finish_thumbnail(self, thumbnail):
+        """Wait for the thumbnail started by start_thumbnail; returns its path, or None"""
+        if thumbnail is None or isinstance(thumbnail, str):
+            return thumbnail
+        output_png, failure = thumbnail.result(timeout=THUMBNAIL_TIMEOUT)
+        if failure:
+            self.debug_log(f"Thumbnail render failed: {failure}", "WARNING")
+            return None
 
+        name, extra, cached_path = self.thumbnail_cache_entry()
         try:
-            if not self.temp_file_path:
-                self.generate_temp_file_folder()
-
-            output_svg = os.path.join(self.temp_file_path, 'thumbnail.svg')
-            self.print_output(f"Output SVG: {output_svg}")
-
-            command = [
-                self.kicad_cli, 'pcb', 'export', 'svg', self.pcb_file,
-                '--output', output_svg,
-                '--layers', 'F.Cu,F.SilkS',
-                '--page-size-mode', '2',
-                '--exclude-drawing-sheet'
-            ]
-
-            result = subprocess.run(
-                command,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            publish_file(output_png, cached_path, link=False)
+            self.record_artifact(name, [cached_path], MODEL_ROLES, extra)
+        except Exception as e:
+            self.debug_log(f"Could not cache the thumbnail: {str(e)}", "WARNING")
+        return output_png
 
-            self.print_output('\nSVG thumbnail generated successfully.')
-            return output_svg
+    def render_thumbnail(self, output_png, background=False):
+        """Render each view and downsize them into one PNG; returns (path, failure message)
 
-        except subprocess.CalledProcessError as e:
-            self.print_output('\nSVG generation failed.')
-            self.print_output(f"Error output:\n{str(e.stderr)}")
-            return None
+        Runs on a worker thread, so it only logs through its return value.
+        """
+        view_paths = []
+        try:
+            for view in self.thumbnail_views:
+                view_png = os.path.join(self.temp_file_path, f"render_{view}.png")
+                result = self.run_kicad_cli(
+                    self.thumbnail_command(view, view_png),
+                    background=background,
+                    capture_output=True,
+                    text=True,
+                    errors='replace',
+                    timeout=THUMBNAIL_TIMEOUT
+                )
+                if result.returncode != 0 or not os.path.exists(view_png):
+                    return output_png, f"{view} view: {result.stderr.strip()[-500:]}"
+                view_paths.append(view_png)
+
+            with self.tracer.span('downsize thumbnail', 'thumbnail', views=len(view_paths)) as span:
+                self.downsize_views(view_paths, output_png)
+                span.set(bytes=path_size(output_png))
+            return output_png, None
         except Exception as e:
-            self.print_output(
-                '\nAn unexpected error occurred during SVG generation.')
-            self.print_output(f"Error: {str(e)}")
-            self.print_output(f"Traceback:\n{traceback.format_exc()}")
-            return None
-
-    def upload_svg_thumbnail(self, svg_file_path):
+            return output_png, str(e)
+        finally:
+            for view_png in view_paths:
+                if os.path.exists(view_png):
+                    os.remove(view_png)
+
+    def downsize_views(self, view_paths, output_png):
+        """Scale each rendered view to fit the thumbnail size and place them side by side"""
+        max_width, max_height = self.thumbnail_size
+        images = []
+        for path in view_paths:
+            image = wx.Image(path, wx.BITMAP_TYPE_PNG)
+            if not image.IsOk():
+                raise ValueError(f"Could not read the rendered {os.path.basename(path)}")
+            scale = min(max_width / image.GetWidth(), max_height / image.GetHeight(), 1.0)
+            images.append(image.Scale(max(1, round(image.GetWidth() * scale)),
+                                      max(1, round(image.GetHeight() * scale)), wx.IMAGE_QUALITY_HIGH))
+
+        if len(images) == 1:
+            thumbnail = images[0]
+        else:
+            width = sum(image.GetWidth() for image in images)
+            height = max(image.GetHeight() for image in images)
+            thumbnail = wx.Image(width, height)
+            thumbnail.SetRGB(wx.Rect(0, 0, width, height), 255, 255, 255)
+            x = 0
+            for image in images:
+                thumbnail.Paste(image, x, (height - image.GetHeight()) // 2)
+                x += image.GetWidth()
+
+        if not thumbnail.SaveFile(output_png, wx.BITMAP_TYPE_PNG):
+            raise ValueError(f"Could not write {os.path.basename(output_png)}")
+
+    def upload_thumbnail(self, thumbnail_path):
         if not self.pcba_pk:
             self.print_output('\nPCBA item ID is not available.\n')
             return
@@ -1712,27 +2428,215 @@ class KiCadTool(wx.Frame):
             "Authorization": f"Api-Key {self.dokuly_api_key}",
         }
 
-        self.print_output('\nUploading SVG thumbnail to Dokuly...\n')
+        self.print_output('\nUploading thumbnail to Dokuly...\n')
         wx.Yield()  # Update GUI
 
-        with open(svg_file_path, 'rb') as svg_file:
-            files = {'file': svg_file}
+        with open(thumbnail_path, 'rb') as thumbnail_file:
+            files = {'file': (os.path.basename(thumbnail_path), thumbnail_file, 'image/png')}
             data = {'app': "pcbas", "display_name": self.pcba_number +
                     "_thumbnail", "item_id": self.pcba_pk}
             try:
-                response = self.make_request(
-                    'POST', self.thumbnail_upload_url, headers=headers, files=files, data=data)
+                response = self.post_to_pcba(
+                    'thumbnail_upload_url', headers=headers, files=files, data=data)
 
-                self.handle_request_error(response, "SVG thumbnail upload")
+                self.handle_request_error(response, "Thumbnail upload")
             except requests.exceptions.RequestException as e:
-                self.debug_log(f"Error uploading SVG thumbnail: {str(e)}", "ERROR")
+                self.debug_log(f"Error uploading thumbnail: {str(e)}", "ERROR")
 
         try:
-            os.remove(svg_file_path)  # Remove the file after upload
+            os.remove(thumbnail_path)  # Remove the file after upload
         except Exception as e:
-            self.print_output(f"Failed to delete {svg_file_path}: {e}\n")
+            self.print_output(f"Failed to delete {thumbnail_path}: {e}\n")
 
-    def fetch_pcba_item(self):
+    def start_watch_mode(self):
+        """Watch the board and schematic for saves and pre-build stale artifacts after each"""
+        if self.watcher is not None or not self.pcb_file:
+            return
+        self.prebuild_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prebuild')
+        self.watcher = SaveWatcher(
+            self.watched_paths, self.schedule_prebuild, debounce=self.watch_debounce,
+            on_error=lambda message: self.debug_log(message, "WARNING"))
+        self.watcher.start()
+        self.print_output('👀 Watch mode: exports are pre-built in the background when the board or schematic is saved\n')
+
+    def stop_watch_mode(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        if self.prebuild_pool is not None:
+            self.prebuild_pool.shutdown(wait=False)
+            self.prebuild_pool = None
+
+    def watched_paths(self):
+        """The board, schematic sheets and project file, as of the last input scan"""
+        if self.project_inputs is not None:
+            return self.project_inputs.paths(WATCH_ROLES)
+        return [path for path in (self.pcb_file, self.schematic_file) if path]
+
+    def schedule_prebuild(self, changed_paths):
+        """Queue a pre-build after a save; saves before it starts are covered by the same one"""
+        if self.prebuild_pending or self.prebuild_pool is None:
+            return
+        self.prebuild_pending = True
+        self.debug_log(f"Saved: {', '.join(os.path.basename(path) for path in changed_paths)}", "INFO")
+        self.prebuild_pool.submit(self.prebuild_artifacts)
+
+    @contextmanager
+    def build_slot(self):
+        """Hold the exports for the UI thread, letting a running pre-build finish its current step"""
+        if not self.build_lock.acquire(blocking=False):
+            self.foreground_waiting.set()
+            self.print_output('\n⏳ Waiting for the background pre-build to finish its current export...\n')
+            while not self.build_lock.acquire(timeout=0.1):
+                wx.Yield()
+        self.foreground_waiting.clear()
+        try:
+            yield
+        finally:
+            self.build_lock.release()
+
+    def prebuild_steps(self):
+        """(name, build) of the cached artifacts, cheapest first"""
+        def remove(path):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+        steps = [('placement', lambda: self.get_placement(background=True))]
+        if self.schematic_file:
+            steps.append(('component table', lambda: self.get_component_table(background=True)))
+        steps.append(('thumbnail', lambda: remove(self.finish_thumbnail(self.start_thumbnail(background=True)))))
+        for profile in [PROFILES[name] for name in self.model_profiles]:
+            output_file = os.path.join(self.temp_file_path,
+                                       profile.filename('prebuild', self.step_extension()))
+            if not self.model_is_cached(profile, output_file):
+                steps.append((profile.label, lambda profile=profile, output_file=output_file: (
+                    self.generate_3d_model(profile, output_file, background=True), remove(output_file))))
+        for package_format in [PACKAGE_FORMATS[name] for name in self.manufacturing_formats]:
+            output_file = os.path.join(self.temp_file_path, package_format.filename('prebuild'))
+            steps.append((package_format.label, lambda package_format=package_format, output_file=output_file: (
+                self.generate_manufacturing_package(package_format, output_file, background=True),
+                remove(output_file))))
+        return steps
+
+    def prebuild_artifacts(self):
+        """Bring the cached artifacts up to date; runs on the pre-build worker at low priority"""
+        self.prebuild_pending = False
+        if self.foreground_waiting.is_set():
+            return  # a push is starting and builds whatever is stale itself
+        started = datetime.now()
+        built = []
+        with self.build_lock:
+            try:
+                self.start_trace()
+                self.scan_project_inputs()  # sheets may have been added or removed
+                for name, build in self.prebuild_steps():
+                    if self.foreground_waiting.is_set() or self.watcher is None:
+                        self.debug_log(f"Background pre-build stopped before {name}", "INFO")
+                        break
+                    try:
+                        build()
+                        built.append(name)
+                    except Exception as e:
+                        self.debug_log(f"Background pre-build of {name} failed: {str(e)}", "WARNING")
+            except Exception as e:
+                self.debug_log(f"Background pre-build failed: {str(e)}", "WARNING")
+        if built:
+            self.print_output(f"🔄 Pre-built in the background ({(datetime.now() - started).total_seconds():.1f} s): "
+                              f"{', '.join(built)}\n")
+
+    def get_pcba_cache(self):
+        """Persistent (part number, revision) -> PCBA ID lookups"""
+        if self.pcba_cache is None:
+            self.pcba_cache = LookupCache(
+                os.path.join(self.get_cache_folder(), 'pcba_lookup.json'),
+                ttl_seconds=self.pcba_cache_ttl_hours * 60 * 60)
+        return self.pcba_cache
+
+    def pcba_cache_key(self):
+        return f"{self.dokuly_base_api_url}|{self.pcba_number}|{self.revision}"
+
+    def invalidate_pcba_cache(self):
+        """Forget the cached PCBA ID so the next fetch asks Dokuly again"""
+        self.get_pcba_cache().invalidate(self.pcba_cache_key())
+        self.pcba_pk_from_cache = False
+
+    def post_to_pcba(self, url_attribute, **kwargs):
+        """POST to one of the PCBA upload URLs, refreshing a stale cached PCBA ID on 404
+
+        The URL is passed by attribute name since it changes if the PCBA ID does.
+        """
+        response = self.send_upload(getattr(self, url_attribute), **kwargs)
+        if response.status_code != 404 or not self.pcba_pk_from_cache:
+            return response
+
+        # The cached ID is only checked when the server rejects it
+        self.debug_log(f"PCBA ID {self.pcba_pk} from cache was not found, fetching it again", "WARNING")
+        cached_pk = self.pcba_pk
+        self.invalidate_pcba_cache()
+        self.fetch_pcba_item(use_cache=False)
+        if not self.pcba_pk or self.pcba_pk == cached_pk:
+            return response
+
+        rewind_files(kwargs.get('files'))
+        if isinstance(kwargs.get('data'), dict) and 'item_id' in kwargs['data']:
+            kwargs['data']['item_id'] = self.pcba_pk
+        return self.send_upload(getattr(self, url_attribute), **kwargs)
+
+    def get_upload_cache(self):
+        """Digests of the packages last uploaded to each PCBA, by display name"""
+        if self.upload_cache is None:
+            self.upload_cache = LookupCache(
+                os.path.join(self.get_cache_folder(), 'uploaded_packages.json'),
+                ttl_seconds=0)  # an entry holds until another upload under its name replaces it
+        return self.upload_cache
+
+    def upload_cache_key(self, display_name):
+        return f"{self.dokuly_base_api_url}|{self.pcba_pk}|{display_name}"
+
+    def upload_is_unchanged(self, file_path, display_name, digest=None, quiet=False):
+        """True if this exact package was the last one uploaded under display_name"""
+        if not self.skip_unchanged_uploads or not file_path.endswith('.zip'):
+            return False
+        digest = digest or package_digest(file_path)
+        if digest is None or self.get_upload_cache().get(self.upload_cache_key(display_name)) != digest:
+            return False
+        if not quiet:
+            self.print_output(f'⏭️ {display_name} is unchanged since the last upload, skipped.\n')
+        return True
+
+    def record_upload(self, file_path, display_name):
+        digest = package_digest(file_path) if file_path.endswith('.zip') else None
+        if digest is not None:
+            self.get_upload_cache().put(self.upload_cache_key(display_name), digest)
+
+    def send_upload(self, url, **kwargs):
+        """POST a multipart upload, compressed if the server accepts a request encoding"""
+        encoding = None
+        if self.compress_uploads and kwargs.get('files'):
+            encoding = choose_encoding(self.get_server_capabilities().get('request_encodings'))
+        compressed = compress_multipart(kwargs.get('data'), kwargs['files'], encoding) if encoding else None
+        if compressed is None:
+            if encoding:
+                self.debug_log("Upload sent uncompressed: payload is small or already compressed")
+            rewind_files(kwargs.get('files'))
+            return self.make_request('POST', url, **kwargs)
+
+        chunks, encoding_headers, stats = compressed
+        request_kwargs = dict(kwargs, data=chunks,
+                              headers=dict(kwargs.get('headers') or {}, **encoding_headers))
+        request_kwargs.pop('files')
+        response = self.make_request('POST', url, **request_kwargs)
+        self.debug_log(f"Upload compressed with {stats.encoding}: {stats.raw_bytes} -> "
+                       f"{stats.compressed_bytes} bytes ({stats.ratio:.1%})")
+
+        if response.status_code == 415:
+            self.debug_log(f"Server rejected {stats.encoding} request bodies, sending uncompressed", "WARNING")
+            self.server_capabilities['request_encodings'] = []
+            rewind_files(kwargs.get('files'))
+            return self.make_request('POST', url, **kwargs)
+        return response
+
+    def fetch_pcba_item(self, use_cache=True):
         # Validate inputs before proceeding
         if not self.pcba_number or not self.revision or not self.dokuly_api_key:
             self.print_output("\n❌ Cannot fetch PCBA: Missing required configuration (PCBA_NUMBER, REVISION, or API_KEY)\n")
@@ -1749,6 +2653,18 @@ class KiCadTool(wx.Frame):
             self.print_output(f"\n❌ Invalid PCBA_NUMBER format: '{self.pcba_number}'. The part after 'PCBA' must be a number (e.g., 'PCBA1234')\n")
             return
 
+        # PCBA_CACHE_TTL_HOURS=0 turns the cache off
+        use_cache = use_cache and self.pcba_cache_ttl_hours > 0
+        if use_cache:
+            cached_pk = self.get_pcba_cache().get(self.pcba_cache_key())
+            if cached_pk:
+                self.pcba_pk = cached_pk
+                self.pcba_pk_from_cache = True
+                self.update_pcba_urls()
+                self.print_output(
+                    f"\nUsing cached PCBA item ID: {self.pcba_pk} for P/N {self.pcba_number}{self.revision}\n")
+                return
+
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Api-Key {self.dokuly_api_key}",
@@ -1767,6 +2683,9 @@ class KiCadTool(wx.Frame):
             if response.status_code == 200:
                 pcba_item = response.json()
                 self.pcba_pk = pcba_item['id']
+                self.pcba_pk_from_cache = False
+                if self.pcba_cache_ttl_hours > 0:
+                    self.get_pcba_cache().put(self.pcba_cache_key(), self.pcba_pk)
                 self.update_pcba_urls()  # Update URLs now that pcba_pk is known
                 self.print_output(
                     f"\nFetched PCBA item with ID: {self.pcba_pk} and P/N {pcba_item.get('part_number')}{pcba_item.get('revision')}\n")
@@ -1780,6 +2699,85 @@ class KiCadTool(wx.Frame):
             self.print_output(
                 "\n\nCOULD NOT FETCH PCBA FROM DOKULY; Please check your connection and relaunch the plugin!\n\n")
 
+    def gerber_zip_commands(self, gerber_dir):
+        return [
+            [self.kicad_cli, 'pcb', 'export', 'gerbers',
+                self.pcb_file, '--output', gerber_dir, '--no-x2', '--no-protel-ext'],
+            [self.kicad_cli, 'pcb', 'export', 'drill',
+                self.pcb_file, '--output', gerber_dir],
+        ]
+
+    def export_plan(self):
+        """The kicad-cli commands of a push, in the order the push runs them"""
+        commands = self.pcb_pdf_commands('pcb_front.pdf', 'pcb_back.pdf')
+        commands += self.gerber_zip_commands('gerbers')
+        if self.schematic_file:
+            commands.append(self.schematic_pdf_command('schematic.pdf'))
+            if self.component_table is None or self.component_table[0] != self.artifact_fingerprint(BOM_ROLES):
+                commands.append(self.component_table_commands('components.csv')[0])
+        if not self.placement_is_cached():
+            commands.append(self.placement_command('placement.csv'))
+
+        for profile in [PROFILES[name] for name in self.model_profiles]:
+            output_file = profile.filename('model', self.step_extension())
+            if self.model_is_cached(profile, output_file):
+                continue
+            if profile.export != 'step' and profile.export not in self.kicad_cli_commands('pcb', 'export'):
+                continue
+            export_kind, export_file = self.step_export_target(profile, output_file)
+            commands.append(self.step_export_commands(
+                profile, export_kind, export_file, self.model_path_overrides())[0])
+
+        # Production package
+        commands += [self.gerber_layer_command(layer, f"{layer}.gbr") for layer in PRODUCTION_GERBER_LAYERS]
+        commands.append(self.drill_command('drill'))
+        return commands
+
+    def jobsets_supported(self):
+        return self.use_jobset and 'jobset' in self.kicad_cli_commands()
+
+    def run_jobset(self, commands, name):
+        """Run the job equivalents of `commands` in one kicad-cli process; returns the keys produced"""
+        project_file = os.path.splitext(self.pcb_file)[0] + '.kicad_pro'
+        if not os.path.exists(project_file):
+            self.debug_log("No project file next to the board, exporting file by file", "INFO")
+            return []
+
+        jobset = Jobset(os.path.join(self.temp_file_path, f"jobset_{name}"), name)
+        for command in commands:
+            jobset.add(command)
+        if not jobset:
+            return []
+        jobset_path, output_id = jobset.write()
+        command = [self.kicad_cli, 'jobset', 'run', '--file', jobset_path,
+                   '--output', output_id, project_file]
+
+        self.print_output(f'\nExporting {len(jobset)} files with one kicad-cli jobset run...\n')
+        wx.Yield()
+        try:
+            with self.tracer.span('kicad-cli jobset run', 'kicad-cli', jobset=name, jobs=len(jobset)) as span:
+                result = subprocess.run(command, capture_output=True, text=True, errors='replace',
+                                        timeout=JOBSET_TIMEOUT, env=dict(os.environ, **jobset.variables))
+                produced = jobset.collect()
+                span.set(exit_code=result.returncode, produced=len(produced))
+        except Exception as e:
+            self.debug_log(f"Jobset run failed, exporting file by file: {str(e)}", "WARNING")
+            return []
+
+        self.jobset_outputs.update(produced)
+        if len(produced) < len(jobset):
+            self.debug_log(f"Jobset produced {len(produced)} of {len(jobset)} exports, "
+                           f"the rest are exported file by file: {result.stderr.strip()[-500:]}", "WARNING")
+        else:
+            self.debug_log(f"Jobset produced all {len(jobset)} exports", "INFO")
+        return list(produced)
+
+    def run_export_jobset(self):
+        """Produce the exports of a push in one kicad-cli jobset run, where kicad-cli has jobsets"""
+        self.jobset_outputs = {}
+        if self.jobsets_supported():
+            self.run_jobset(self.export_plan(), 'push')
+
     def generate_gerber_and_drill_file(self):
         if not self.pcb_file:
             self.print_output('\nPlease open a PCB file first.\n')
@@ -1802,10 +2800,11 @@ class KiCadTool(wx.Frame):
             gerber_dir = os.path.join(output_dir, f"{project_name}_Gerber")
             os.makedirs(gerber_dir, exist_ok=True)
 
+            gerber_command, drill_command = self.gerber_zip_commands(gerber_dir)
+
             # Generate Gerber files
-            subprocess.run(
-                [self.kicad_cli, 'pcb', 'export', 'gerbers',
-                    self.pcb_file, '--output', gerber_dir, '--no-x2', '--no-protel-ext'],
+            self.run_kicad_cli(
+                gerber_command,
                 check=True,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -1813,9 +2812,8 @@ class KiCadTool(wx.Frame):
             )
 
             # Generate Drill files
-            subprocess.run(
-                [self.kicad_cli, 'pcb', 'export', 'drill',
-                    self.pcb_file, '--output', gerber_dir],
+            self.run_kicad_cli(
+                drill_command,
                 check=True,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -1824,12 +2822,7 @@ class KiCadTool(wx.Frame):
 
             zip_file_name = os.path.join(
                 output_dir, f"{project_name}_Gerber.zip")
-            with zipfile.ZipFile(zip_file_name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(gerber_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, gerber_dir)
-                        zipf.write(file_path, arcname)
+            self.zip_directory(gerber_dir, zip_file_name)
             self.print_output(
                 '\nGerber and drill files generated and zipped successfully.\n')
             self.print_output(f'\nZIP file saved to: {zip_file_name}\n')
@@ -1859,6 +2852,16 @@ class KiCadTool(wx.Frame):
             gerber_and_drill_file_path, display_name, file_type, gerber_files)
 
     def upload_file_to_pcba(self, file_path, display_name, file_type, gerber_files):
+        """Upload a file to the PCBA; returns False if Dokuly didn't accept it"""
+        if self.upload_is_unchanged(file_path, display_name):
+            return True
+        if self.queue_upload(
+                file_path, display_name,
+                lambda: self.upload_file_to_pcba(file_path, display_name, file_type, gerber_files),
+                file_type=file_type, gerber=gerber_files,
+                replace_files=self.replace_files, remove_after=True):
+            return True
+
         headers = {
             "Authorization": f"Api-Key {self.dokuly_api_key}",
         }
@@ -1866,6 +2869,7 @@ class KiCadTool(wx.Frame):
         self.print_output(f'Uploading {display_name} to Dokuly...\n')
         wx.Yield()  # Update GUI
 
+        uploaded = False
         with open(file_path, 'rb') as file_to_upload:
             files = {'file': file_to_upload}
             data = {'app': "pcbas", "display_name": display_name,
@@ -1875,22 +2879,146 @@ class KiCadTool(wx.Frame):
                 f"\nGerber files: {gerber_files} for file {display_name}\n")
 
             try:
-                response = self.make_request(
-                    'POST', self.file_upload_pcba_url, headers=headers, files=files, data=data, timeout=60)
+                response = self.post_to_pcba(
+                    'file_upload_pcba_url', headers=headers, files=files, data=data, timeout=60)
 
-                self.handle_request_error(response, f'{display_name} upload')
+                uploaded = self.handle_request_error(response, f'{display_name} upload')
+                if uploaded:
+                    self.record_upload(file_path, display_name)
             except requests.exceptions.RequestException as e:
                 self.debug_log(f"Error uploading {display_name}: {str(e)}", "ERROR")
         try:
             os.remove(file_path)  # Remove the file after upload
         except Exception as e:
             self.print_output(f"Failed to delete {file_path}: {e}\n")
+        return uploaded
+
+    def get_server_capabilities(self):
+        """Ask Dokuly once per session which optional upload features it supports"""
+        if self.server_capabilities is not None:
+            return self.server_capabilities
+
+        self.server_capabilities = {}
+        headers = {
+            "Authorization": f"Api-Key {self.dokuly_api_key}",
+        }
+        try:
+            response = self.make_request('GET', self.capabilities_url, headers=headers, timeout=10)
+            if response.status_code == 200:
+                self.server_capabilities = parse_capabilities(response.json())
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.debug_log(f"Could not fetch server capabilities: {str(e)}", "WARNING")
+        return self.server_capabilities
+
+    def begin_upload_batch(self):
+        """Queue the uploads that follow for one bulk request, if the server supports it"""
+        self.upload_batch = None
+        if self.bulk_upload and self.get_server_capabilities().get('bulk_upload'):
+            self.upload_batch = UploadBatch()
+
+    def queue_upload(self, file_path, display_name, fallback, file_type=None, gerber=False,
+                     replace_files=None, content_type=None, remove_after=False):
+        """Add a file to the open upload batch; returns False if no batch is open"""
+        if self.upload_batch is None:
+            return False
+
+        metadata = {"display_name": display_name, "file_type": file_type, "gerber": gerber}
+        if replace_files is not None:
+            metadata["replace_files"] = replace_files
+        self.upload_batch.add(file_path, metadata, fallback, content_type, remove_after)
+        self.print_output(f'Queued {display_name} for upload\n')
+        return True
+
+    def flush_upload_batch(self):
+        """Send the queued files in one request, uploading any the server rejects one by one
+
+        Returns the display names of the files that could not be uploaded either way.
+        """
+        batch, self.upload_batch = self.upload_batch, None
+        if not batch:
+            return []
+
+        headers = {
+            "Authorization": f"Api-Key {self.dokuly_api_key}",
+        }
+        max_files = self.get_server_capabilities().get('max_bulk_files', 0)
+        failed = []
+        for entries in batch.chunks(max_files):
+            self.print_output(f'\nUploading {len(entries)} files to Dokuly in one request...\n')
+            wx.Yield()
+            try:
+                with UploadBatch.open_request(entries, self.pcba_pk) as (files, data):
+                    # Not post_to_pcba: a 404 here means no bulk endpoint, not a stale PCBA ID
+                    response = self.send_upload(
+                        self.bulk_upload_pcba_url, headers=headers, files=files, data=data,
+                        timeout=60 * len(entries))
+            except (requests.exceptions.RequestException, OSError) as e:
+                self.debug_log(f"Bulk upload failed: {str(e)}", "WARNING")
+                failed.extend(entries)
+                continue
+
+            if response.status_code not in (200, 201):
+                self.debug_log(f"Bulk upload rejected with status {response.status_code}, "
+                               f"uploading files one by one", "WARNING")
+                if response.status_code in (404, 405, 501):
+                    self.server_capabilities['bulk_upload'] = False
+                failed.extend(entries)
+                continue
+
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = {}
+            rejected = UploadBatch.failed_entries(entries, payload)
+            for entry in entries:
+                if entry in rejected:
+                    continue
+                self.print_output(f'✅ {entry.display_name} uploaded\n')
+                self.record_upload(entry.path, entry.display_name)
+                if entry.remove_after:
+                    try:
+                        os.remove(entry.path)
+                    except OSError as e:
+                        self.print_output(f"Failed to delete {entry.path}: {e}\n")
+            failed.extend(rejected)
+
+        not_uploaded = []
+        for entry in failed:
+            # Each fallback returns whether Dokuly accepted the file
+            try:
+                uploaded = entry.fallback()
+            except Exception as e:
+                self.debug_log(f"Upload of {entry.display_name} failed: {str(e)}", "ERROR")
+                uploaded = False
+            if not uploaded:
+                not_uploaded.append(entry.display_name)
+        return not_uploaded
 
     def get_dokuly_base_api_url(self):
         if "localhost" in self.dokuly_url or "127.0.0.1" in self.dokuly_url:
             return f"http://{self.dokuly_url}"
         return f"{self.url_protocol}://{self.dokuly_url}"
 
+    def env_names(self, key, value, choices, normalize=None):
+        """The known names of a comma-separated .env list, warning about the others"""
+        names, unknown = parse_names(value, choices, normalize)
+        if unknown:
+            self.debug_log(f"Unknown {key} {', '.join(unknown)}, "
+                           f"choose from {', '.join(choices)}", "WARNING")
+        return names
+
+    def env_number(self, key, value, current, convert=float, minimum=0):
+        """A numeric .env value, or the current setting (with a warning) if it isn't valid"""
+        try:
+            number = convert(value)
+        except ValueError:
+            self.debug_log(f"Invalid {key} '{value}', using {current}", "WARNING")
+            return current
+        if number < minimum:
+            self.debug_log(f"{key} '{value}' is below {minimum}, using {minimum}", "WARNING")
+            return minimum
+        return number
+
     def load_env_file(self, env_path=".env"):
         """Load environment variables with better error handling"""
         plugin_dir = os.path.dirname(__file__)
@@ -1929,6 +3057,76 @@ class KiCadTool(wx.Frame):
                         self.replace_files = value.lower() == 'true'
                     elif key == 'URL_PROTOCOL':
                         self.url_protocol = value
+                    elif key == 'LOG_TO_FILE':
+                        self.log_to_file = value.lower() == 'true'
+                    elif key == 'TEMP_MAX_MB':
+                        self.temp_max_mb = self.env_number(key, value, self.temp_max_mb)
+                    elif key == 'TEMP_MAX_AGE_DAYS':
+                        self.temp_max_age_days = self.env_number(key, value, self.temp_max_age_days)
+                    elif key == 'PCBA_CACHE_TTL_HOURS':
+                        self.pcba_cache_ttl_hours = self.env_number(key, value, self.pcba_cache_ttl_hours)
+                    elif key == 'BULK_UPLOAD':
+                        self.bulk_upload = value.lower() == 'true'
+                    elif key == 'COMPRESS_UPLOADS':
+                        self.compress_uploads = value.lower() == 'true'
+                    elif key == 'SKIP_UNCHANGED_UPLOADS':
+                        self.skip_unchanged_uploads = value.lower() == 'true'
+                    elif key == 'STREAM_UPLOADS':
+                        self.stream_uploads = value.lower() == 'true'
+                    elif key == 'STEP_FORMAT':
+                        if value.lower() in ('step', 'stpz'):
+                            self.step_format = value.lower()
+                        else:
+                            self.debug_log(f"Unknown STEP_FORMAT '{value}', using 'step'", "WARNING")
+                    elif key == 'MODEL_PROFILES':
+                        self.model_profiles = self.env_names(key, value, PROFILES)
+                    elif key == 'MIRROR_MODELS':
+                        if value.lower() in ('auto', 'true', 'false'):
+                            self.mirror_models = value.lower()
+                        else:
+                            self.debug_log(f"Unknown MIRROR_MODELS '{value}', using 'auto'", "WARNING")
+                    elif key == 'USE_JOBSET':
+                        self.use_jobset = value.lower() == 'true'
+                    elif key == 'PNP_FORMATS':
+                        self.pnp_formats = self.env_names(key, value, PNP_FORMATS)
+                    elif key == 'PNP_ROTATION_OFFSETS':
+                        offsets, invalid = parse_rotation_offsets(value)
+                        if invalid:
+                            self.debug_log(f"Ignoring PNP_ROTATION_OFFSETS entries {', '.join(invalid)}, "
+                                           "expected package=degrees", "WARNING")
+                        self.pnp_rotation_offsets = offsets
+                    elif key == 'MANUFACTURING_FORMATS':
+                        self.manufacturing_formats = self.env_names(key, value, PACKAGE_FORMATS, format_key)
+                    elif key == 'MANUFACTURING_IN_ZIP':
+                        self.manufacturing_in_zip = value.lower() == 'true'
+                    elif key == 'THUMBNAIL_VIEWS':
+                        views = []
+                        if value.strip().lower() not in ('none', 'false'):
+                            views = self.env_names(key, value, THUMBNAIL_VIEWS)
+                        self.thumbnail_views = [view for view in THUMBNAIL_VIEWS if view in views]
+                    elif key in ('THUMBNAIL_SIZE', 'THUMBNAIL_RENDER_SIZE'):
+                        match = re.match(r'^(\d+)x(\d+)$', value.strip().lower())
+                        if match and int(match.group(1)) > 0 and int(match.group(2)) > 0:
+                            size = (int(match.group(1)), int(match.group(2)))
+                            if key == 'THUMBNAIL_SIZE':
+                                self.thumbnail_size = size
+                            else:
+                                self.thumbnail_render_size = size
+                        else:
+                            self.debug_log(f"Unknown {key} '{value}', expected WIDTHxHEIGHT", "WARNING")
+                    elif key == 'WATCH_MODE':
+                        self.watch_mode = value.lower() == 'true'
+                    elif key == 'WATCH_DEBOUNCE':
+                        self.watch_debounce = self.env_number(key, value, self.watch_debounce)
+                    elif key == 'ZIP_WORKERS':
+                        # 0 picks a count from the CPU cores; anything else runs at least one worker
+                        self.zip_workers = 0 if value == '0' else self.env_number(
+                            key, value, self.zip_workers, int, minimum=1)
+                    elif key == 'ZIP_PROFILE':
+                        if value.lower() in PROFILE_LEVELS:
+                            self.zip_profile = value.lower()
+                        else:
+                            self.debug_log(f"Unknown ZIP_PROFILE '{value}', using '{DEFAULT_PROFILE}'", "WARNING")
                         
         except Exception as e:
             self.debug_log(f"Error loading .env file: {str(e)}", "ERROR")
@@ -1975,6 +3173,8 @@ class KiCadTool(wx.Frame):
         print("DEBUG: Reloading configuration after wizard...")
         self.load_env_file()
         self.dokuly_base_api_url = self.get_dokuly_base_api_url()
+        self.server_capabilities = None
+        self.configure_log_file()
         self.check_configuration_status()
         
         # Debug: Show what was loaded
@@ -1990,6 +3190,11 @@ class KiCadTool(wx.Frame):
             self.print_output("\n✅ Configuration updated. Please set PCBA_NUMBER and PCBA_REVISION in your board variables.\n")
 
 
+# Settings written by the configuration wizard; any others in .env are kept as-is
+WIZARD_ENV_KEYS = ('DOKULY_API_KEY', 'DOKULY_URL', 'URL_PROTOCOL', 'THEME_PATH',
+                   'DRAWING_SHEET_PATH', 'REPLACE_FILES')
+
+
 class ConfigWizard(wx.Dialog):
     def __init__(self, parent):
         super(ConfigWizard, self).__init__(parent, title="KiCad to Dokuly Configuration", size=(500, 600))
@@ -2238,6 +3443,15 @@ class ConfigWizard(wx.Dialog):
         try:
             # Ensure the directory exists
             os.makedirs(plugin_dir, exist_ok=True)
+
+            # Keep advanced settings that the wizard does not edit
+            preserved_lines = []
+            if os.path.exists(env_path):
+                with open(env_path, 'r') as f:
+                    for line in f:
+                        key = line.split('=', 1)[0].strip()
+                        if '=' in line and not key.startswith('#') and key not in WIZARD_ENV_KEYS:
+                            preserved_lines.append(line if line.endswith('\n') else line + '\n')
             
             with open(env_path, 'w') as f:
                 f.write(f"DOKULY_API_KEY={self.api_key_ctrl.GetValue()}\n")
@@ -2246,6 +3460,7 @@ class ConfigWizard(wx.Dialog):
                 f.write(f"THEME_PATH={self.theme_path_ctrl.GetValue()}\n")
                 f.write(f"DRAWING_SHEET_PATH={self.sheet_path_ctrl.GetValue()}\n")
                 f.write(f"REPLACE_FILES={str(self.replace_files_cb.GetValue()).lower()}\n")
+                f.writelines(preserved_lines)
             
             # Verify the file was created
             if os.path.exists(env_path):
@@ -0,0 +1,373 @@
+"""
+Deterministic ZIP packages
+
+Gerber, position and production packages are written with sorted entries,
+fixed timestamps and permissions and a fixed compression level, so building
+the same design twice gives byte-identical archives. A manifest (in
+`sha256sum` format) lists the hash of every file, and its hash identifies the
+package contents, which lets unchanged packages be recognized up front. The
+production package stores it as a MANIFEST.sha256 entry; Gerber and position
+packages, read by fab houses' CAM tools, carry only their own files, and their
+manifest is recomputed from the archive when needed.
+
+Entries are deflated concurrently in a thread pool (zlib releases the GIL
+while compressing) and then written in order by a small ZIP writer, so the
+result is the same whatever the number of workers. How each entry is stored
+is decided by a CompressionPolicy from its type and a quick compressibility
+test of its first bytes.
+"""
+
+import os
+import zlib
+import struct
+import zipfile
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .compression import is_precompressed
+
+
+MANIFEST_NAME = 'MANIFEST.sha256'
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)  # earliest time a ZIP can store
+FILE_MODE = 0o644
+COMPRESS_LEVEL = 6
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# ZIP record layouts (APPNOTE 4.3.7, 4.3.12, 4.3.14-16)
+LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+CENTRAL_HEADER = struct.Struct('<4s4B4HL2L5H2L')
+END_RECORD = struct.Struct('<4s4H2LH')
+ZIP64_END_RECORD = struct.Struct('<4sQ2H2L4Q')
+ZIP64_END_LOCATOR = struct.Struct('<4sLQL')
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_ENTRY_LIMIT = 0xFFFF
+
+# Deflate level for compressible entries in each profile
+PROFILE_LEVELS = {
+    'speed': 1,
+    'balanced': COMPRESS_LEVEL,
+    'size': 9,
+}
+DEFAULT_PROFILE = 'balanced'
+
+# Formats that are compressed already; stored as they are except when optimizing for size
+PRECOMPRESSED_EXTENSIONS = {
+    '.zip', '.pdf', '.png', '.jpg', '.jpeg', '.gz', '.zst', '.xz', '.7z', '.bz2',
+    '.glb', '.stpz',
+}
+# Plain text CAD output that always shrinks a lot
+TEXT_EXTENSIONS = {
+    '.gbr', '.gbrjob', '.drl', '.pos', '.csv', '.txt', '.json', '.step', '.stp',
+    '.svg', '.wrl', '.ipc', '.xml', '.rpt', '.gko', '.gm1',
+}
+SAMPLE_SIZE = 64 * 1024
+INCOMPRESSIBLE_RATIO = 0.9  # a sample that shrinks less than 10% is stored
+
+VERSION_DEFLATE = 20
+VERSION_ZIP64 = 45
+UTF8_FLAG = 0x800
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_arcname(arcname):
+    """Forward slashes and no leading './' or '/', as every unzip tool expects"""
+    arcname = arcname.replace('\\', '/')
+    while arcname.startswith('./'):
+        arcname = arcname[2:]
+    return arcname.lstrip('/')
+
+
+def sorted_entries(entries):
+    """(file_path, arcname) entries sorted by normalized arcname, rejecting duplicates"""
+    normalized = {}
+    for file_path, arcname in entries:
+        arcname = normalize_arcname(arcname)
+        if arcname == MANIFEST_NAME:
+            raise ValueError(f"{MANIFEST_NAME} is reserved for the package manifest")
+        if arcname in normalized:
+            raise ValueError(f"Duplicate archive entry: {arcname}")
+        normalized[arcname] = file_path
+    return [(normalized[arcname], arcname) for arcname in sorted(normalized)]
+
+
+def build_manifest(entries):
+    """Manifest text for sorted (file_path, arcname) entries"""
+    return ''.join(f"{file_sha256(file_path)}  {arcname}\n" for file_path, arcname in entries)
+
+
+def manifest_digest(manifest):
+    return hashlib.sha256(manifest.encode('utf-8')).hexdigest()
+
+
+def read_manifest(zip_path):
+    """The manifest of a package, stored or computed from its files; None if it can't be read"""
+    try:
+        with zipfile.ZipFile(zip_path) as zipf:
+            names = zipf.namelist()
+            if MANIFEST_NAME in names:
+                return zipf.read(MANIFEST_NAME).decode('utf-8')
+            manifest = []
+            for name in sorted(name for name in names if not name.endswith('/')):
+                digest = hashlib.sha256()
+                with zipf.open(name) as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(block)
+                manifest.append(f"{digest.hexdigest()}  {name}\n")
+            return ''.join(manifest)
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+def package_digest(zip_path):
+    """Content digest of a package written by this module, or None"""
+    manifest = read_manifest(zip_path)
+    return manifest_digest(manifest) if manifest is not None else None
+
+
+def dos_date_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    return ((year - 1980) << 9 | month << 5 | day), (hour << 11 | minute << 5 | second // 2)
+
+
+class CompressionPolicy:
+    """Picks STORED or a deflate level for each entry
+
+    Profiles: 'speed' deflates text at level 1 and stores compressed
+    formats, 'balanced' uses level 6, 'size' uses level 9 and also tries
+    compressed formats, keeping them deflated if the sample shrinks.
+    """
+
+    def __init__(self, profile=DEFAULT_PROFILE):
+        if profile not in PROFILE_LEVELS:
+            raise ValueError(f"Unknown ZIP profile '{profile}', expected one of {', '.join(PROFILE_LEVELS)}")
+        self.profile = profile
+        self.level = PROFILE_LEVELS[profile]
+
+    def sample_shrinks(self, data):
+        sample = data[:SAMPLE_SIZE]
+        if not sample:
+            return False
+        return len(zlib.compress(sample, 1)) < len(sample) * INCOMPRESSIBLE_RATIO
+
+    def level_for(self, arcname, data):
+        """Deflate level for an entry, or None to store it uncompressed"""
+        extension = os.path.splitext(arcname)[1].lower()
+        precompressed = extension in PRECOMPRESSED_EXTENSIONS or is_precompressed(data[:16])
+        if precompressed and self.profile != 'size':
+            return None
+        if extension in TEXT_EXTENSIONS and not precompressed:
+            return self.level
+        return self.level if self.sample_shrinks(data) else None
+
+
+class CompressedEntry:
+    """An archive member, compressed and ready to be written"""
+
+    def __init__(self, arcname, data, level=COMPRESS_LEVEL):
+        self.arcname = arcname
+        self.crc = zlib.crc32(data)
+        self.size = len(data)
+        self.level = level
+        if level is None:
+            self.data = data
+            self.compress_type = zipfile.ZIP_STORED
+        else:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self.data = compressor.compress(data) + compressor.flush()
+            self.compress_type = zipfile.ZIP_DEFLATED
+
+    @property
+    def zip64(self):
+        return max(self.size, len(self.data)) >= ZIP64_LIMIT
+
+
+def compress_file(file_path, arcname, policy):
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return CompressedEntry(arcname, data, policy.level_for(arcname, data))
+
+
+class PackageStats:
+    """What the policy did with the entries of one package"""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.stored = 0
+        self.deflated = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def add(self, entry):
+        if entry.compress_type == zipfile.ZIP_STORED:
+            self.stored += 1
+        else:
+            self.deflated += 1
+        self.bytes_in += entry.size
+        self.bytes_out += len(entry.data)
+
+    def as_dict(self):
+        return {'profile': self.profile, 'stored': self.stored, 'deflated': self.deflated,
+                'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out}
+
+
+class ZipWriter:
+    """Writes precompressed entries as a ZIP, with fixed metadata for every entry"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offset = 0
+        self.central = []
+
+    def write(self, data):
+        self.stream.write(data)
+        self.offset += len(data)
+
+    def add(self, entry):
+        name = entry.arcname.encode('utf-8')
+        flags = UTF8_FLAG if not entry.arcname.isascii() else 0
+        date, time = dos_date_time(FIXED_DATE_TIME)
+        if entry.zip64:
+            version = VERSION_ZIP64
+            sizes = (ZIP64_LIMIT, ZIP64_LIMIT)
+            extra = struct.pack('<2H2Q', 1, 16, entry.size, len(entry.data))
+        else:
+            version = VERSION_DEFLATE
+            sizes = (len(entry.data), entry.size)
+            extra = b''
+
+        header_offset = self.offset
+        self.write(LOCAL_HEADER.pack(
+            b'PK\x03\x04', version, 0, flags, entry.compress_type, time, date,
+            entry.crc, sizes[0], sizes[1], len(name), len(extra)))
+        self.write(name + extra)
+        self.write(entry.data)
+        self.central.append((entry, name, flags, header_offset))
+
+    def close(self):
+        """Write the central directory and end records"""
+        directory_offset = self.offset
+        date, time = dos_date_time(FIXED_DATE_TIME)
+        for entry, name, flags, header_offset in self.central:
+            # ZIP64 extra fields only carry the values that don't fit their 32 bit slot
+            zip64_fields = [entry.size, len(entry.data)] if entry.zip64 else []
+            if header_offset >= ZIP64_LIMIT:
+                zip64_fields.append(header_offset)
+            version = VERSION_ZIP64 if zip64_fields else VERSION_DEFLATE
+            extra = (struct.pack(f'<2H{len(zip64_fields)}Q', 1, 8 * len(zip64_fields), *zip64_fields)
+                     if zip64_fields else b'')
+            sizes = (ZIP64_LIMIT, ZIP64_LIMIT) if entry.zip64 else (len(entry.data), entry.size)
+
+            self.write(CENTRAL_HEADER.pack(
+                b'PK\x01\x02', version, 3, version, 0, flags, entry.compress_type, time, date,
+                entry.crc, sizes[0], sizes[1], len(name), len(extra), 0, 0, 0,
+                (0o100000 | FILE_MODE) << 16,  # unix regular file, rw-r--r--
+                min(header_offset, ZIP64_LIMIT)))
+            self.write(name + extra)
+
+        count = len(self.central)
+        directory_size = self.offset - directory_offset
+        if count > ZIP64_ENTRY_LIMIT or directory_offset >= ZIP64_LIMIT or directory_size >= ZIP64_LIMIT:
+            zip64_end_offset = self.offset
+            self.write(ZIP64_END_RECORD.pack(
+                b'PK\x06\x06', ZIP64_END_RECORD.size - 12, VERSION_ZIP64, VERSION_ZIP64, 0, 0,
+                count, count, directory_size, directory_offset))
+            self.write(ZIP64_END_LOCATOR.pack(b'PK\x06\x07', 0, zip64_end_offset, 1))
+        self.write(END_RECORD.pack(
+            b'PK\x05\x06', 0, 0, min(count, ZIP64_ENTRY_LIMIT), min(count, ZIP64_ENTRY_LIMIT),
+            min(directory_size, ZIP64_LIMIT), min(directory_offset, ZIP64_LIMIT), 0))
+
+
+def default_workers():
+    return min(8, os.cpu_count() or 1)
+
+
+class ChunkSink:
+    """File-like target that collects written bytes until they are taken"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def take(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+class Package:
+    """A deterministic ZIP package of (file_path, arcname) entries, with their manifest if `manifest`
+
+    The manifest and digest are known before anything is compressed, so an
+    unchanged package can be recognized up front. Entries are compressed by
+    `workers` threads (0 = one per core, up to 8; 1 = serially); the bytes
+    are the same either way.
+    """
+
+    def __init__(self, entries, profile=DEFAULT_PROFILE, workers=0, manifest=False):
+        self.entries = sorted_entries(entries)
+        self.include_manifest = manifest
+        self.manifest = build_manifest(self.entries)
+        self.digest = manifest_digest(self.manifest)
+        self.policy = CompressionPolicy(profile)
+        self.workers = workers or default_workers()
+        self.stats = PackageStats(profile)
+
+    def matches(self, zip_path):
+        """True if zip_path already holds a package with the same contents"""
+        return os.path.exists(zip_path) and read_manifest(zip_path) == self.manifest
+
+    def compressed_entries(self):
+        if self.workers == 1 or len(self.entries) < 2:
+            for file_path, arcname in self.entries:
+                yield compress_file(file_path, arcname, self.policy)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='deflate') as pool:
+                # A bounded window of entries in flight, taken in submission order
+                pending = deque()
+                for file_path, arcname in self.entries:
+                    pending.append(pool.submit(compress_file, file_path, arcname, self.policy))
+                    if len(pending) >= 2 * self.workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+        if self.include_manifest:
+            yield CompressedEntry(MANIFEST_NAME, self.manifest.encode('utf-8'), self.policy.level)
+
+    def chunks(self):
+        """Yield the bytes of the ZIP as it is built, one entry at a time"""
+        self.stats = PackageStats(self.policy.profile)
+        sink = ChunkSink()
+        writer = ZipWriter(sink)
+        for entry in self.compressed_entries():
+            self.stats.add(entry)
+            writer.add(entry)
+            yield from sink.take()
+        writer.close()
+        yield from sink.take()
+
+    def write(self, zip_path):
+        with open(zip_path, 'wb') as f:
+            for chunk in self.chunks():
+                f.write(chunk)
+
+
+def write_package(entries, zip_path, workers=0, profile=DEFAULT_PROFILE, manifest=False):
+    """Write (file_path, arcname) entries, and their manifest if `manifest`, to a deterministic ZIP
+
+    An existing archive at zip_path with the same contents is left untouched.
+    Returns (package digest, True if the archive was written, PackageStats or None).
+    """
+    package = Package(entries, profile, workers, manifest)
+    if package.matches(zip_path):
+        return package.digest, False, None
+    package.write(zip_path)
+    return package.digest, True, package.stats
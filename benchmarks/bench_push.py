@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+End-to-end push benchmark
+
+Runs `KiCadTool.push_pcba_to_dokuly` headless against the scripted kicad-cli
+stand-in (fake_kicad_cli.py) and a local Dokuly simulator, and reports push
+latency percentiles and upload throughput. Exits non-zero when a latency gate
+is exceeded, so it can be used to gate changes:
+
+    python benchmarks/bench_push.py --iterations 10 --max-p50 5.0 --check-bulk-upload
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_host  # noqa: E402
+from dokuly_simulator import (  # noqa: E402
+    DokulySimulator, FaultPlan, add_capability_arguments, capabilities_from_args)
+
+
+FAKE_KICAD_CLI = os.path.join(BENCH_DIR, 'fake_kicad_cli.py')
+
+BOARD_TEMPLATE = """(kicad_pcb (version 20240108) (generator "pcbnew")
+  (footprint "Resistor_SMD:R_0402_1005Metric" (layer "F.Cu")
+    (model "${KIPRJMOD}/models/R_0402.step"))
+  (footprint "Capacitor_SMD:C_0402_1005Metric" (layer "B.Cu")
+    (model "${KIPRJMOD}/models/C_0402.step"))
+)
+"""
+
+SCHEMATIC_TEMPLATE = """(kicad_sch (version 20231120) (generator "eeschema")
+  (sheet (at 0 0) (size 10 10)
+    (property "Sheetname" "power")
+    (property "Sheetfile" "power.kicad_sch"))
+)
+"""
+
+# Uploads a complete push makes: two PCB PDFs, Gerbers, schematic, BOM,
+# position files, STEP, the thumbnail and the production ZIP
+EXPECTED_UPLOADS = 9
+
+
+def percentile(values, fraction):
+    """Linear-interpolated percentile of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def create_project(project_dir):
+    """Write a minimal KiCad project with a sub-sheet, theme and drawing sheet"""
+    os.makedirs(os.path.join(project_dir, 'models'), exist_ok=True)
+    files = {
+        'bench.kicad_pcb': BOARD_TEMPLATE,
+        'bench.kicad_sch': SCHEMATIC_TEMPLATE,
+        'power.kicad_sch': '(kicad_sch (version 20231120))\n',
+        'bench.kicad_pro': '{}\n',
+        'theme.json': '{"meta": {"name": "bench"}}\n',
+        'sheet.kicad_wks': '(kicad_wks (version 20231118))\n',
+        os.path.join('models', 'R_0402.step'): 'ISO-10303-21;\n',
+        os.path.join('models', 'C_0402.step'): 'ISO-10303-21;\n',
+    }
+    for name, content in files.items():
+        with open(os.path.join(project_dir, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+    return os.path.join(project_dir, 'bench.kicad_pcb')
+
+
+def make_tool_class(plugin, settings):
+    """KiCadTool configured from the benchmark instead of the plugin's .env"""
+
+    class BenchTool(plugin.KiCadTool):
+        def locate_kicad_cli(self):
+            return settings['kicad_cli']
+
+        def load_env_file(self, env_path=".env"):
+            # An absolute path makes the plugin read the benchmark's .env
+            super().load_env_file(settings['env_file'])
+
+        def get_temp_root(self):
+            return settings['temp_dir']
+
+    return BenchTool
+
+
+def run_benchmark(args):
+    work_dir = tempfile.mkdtemp(prefix='dokuly-bench-')
+    try:
+        project_dir = os.path.join(work_dir, 'project')
+        pcb_file = create_project(project_dir)
+
+        os.environ['FAKE_KICAD_CLI_CONFIG'] = json.dumps({
+            'latency': {'default': args.cli_latency, 'step': args.step_latency},
+            'sizes': {'step': args.step_size, 'gerber': args.gerber_size,
+                      'pdf': args.pdf_size},
+        })
+        if args.verbose:
+            os.environ['FAKE_HOST_ECHO'] = '1'
+
+        fake_host.install(pcb_file, {'PCBA_NUMBER': 'PCBA1', 'PCBA_REVISION': 'A'})
+        plugin = fake_host.load_plugin()
+
+        with DokulySimulator(latency=args.server_latency, bandwidth=args.bandwidth,
+                             capabilities=capabilities_from_args(args),
+                             faults=FaultPlan(reject_chunked=args.reject_chunked)) as simulator:
+            env = {
+                'DOKULY_API_KEY': 'benchmark',
+                'DOKULY_URL': simulator.address,
+                'URL_PROTOCOL': 'http',
+                'REPLACE_FILES': 'true',
+                # Every iteration builds the same packages; upload them all anyway
+                'SKIP_UNCHANGED_UPLOADS': 'false',
+                'THEME_PATH': os.path.join(project_dir, 'theme.json'),
+                'DRAWING_SHEET_PATH': os.path.join(project_dir, 'sheet.kicad_wks'),
+            }
+            for setting in args.env:
+                key, value = setting.split('=', 1)
+                env[key] = value
+            env_file = os.path.join(work_dir, 'bench.env')
+            with open(env_file, 'w', encoding='utf-8') as f:
+                f.writelines(f"{key}={value}\n" for key, value in env.items())
+
+            settings = {
+                'kicad_cli': FAKE_KICAD_CLI,
+                'env_file': env_file,
+                'temp_dir': os.path.join(work_dir, 'plugin_temp'),
+            }
+            tool = make_tool_class(plugin, settings)(None, 'benchmark')
+
+            durations = []
+            stage_totals = {}
+            uploaded_bytes = 0
+            requests_made = 0
+            failures = 0
+
+            for iteration in range(args.warmup + args.iterations):
+                simulator.reset()
+                started = time.perf_counter()
+                tool.push_pcba_to_dokuly(None)
+                duration = time.perf_counter() - started
+
+                if iteration < args.warmup:
+                    continue
+
+                durations.append(duration)
+                uploaded_bytes += simulator.bytes_received()
+                requests_made += len(simulator.received)
+                complete_push = env['SKIP_UNCHANGED_UPLOADS'].lower() != 'true'
+                if complete_push and simulator.uploaded_file_count() < EXPECTED_UPLOADS:
+                    failures += 1
+                for name, (total, count) in tool.tracer.summary('stage'):
+                    stage_totals.setdefault(name, []).append(total)
+
+        total_time = sum(durations)
+        return {
+            'iterations': len(durations),
+            'failures': failures,
+            'latency': {
+                'min': min(durations),
+                'mean': total_time / len(durations),
+                'p50': percentile(durations, 0.50),
+                'p90': percentile(durations, 0.90),
+                'p99': percentile(durations, 0.99),
+                'max': max(durations),
+            },
+            'throughput': {
+                'pushes_per_minute': 60.0 * len(durations) / total_time,
+                'upload_mb_per_second': uploaded_bytes / total_time / (1024 * 1024),
+                'requests_per_push': requests_made / len(durations),
+            },
+            'stages_p50': {name: percentile(values, 0.50)
+                           for name, values in stage_totals.items()},
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            print(f"Benchmark files kept in {work_dir}")
+
+
+def print_report(result):
+    latency = result['latency']
+    throughput = result['throughput']
+    print(f"Push benchmark: {result['iterations']} iterations, {result['failures']} incomplete")
+    print("Latency (s):  " + '  '.join(f"{key}={value:.3f}" for key, value in latency.items()))
+    print(f"Throughput:   {throughput['pushes_per_minute']:.1f} pushes/min, "
+          f"{throughput['upload_mb_per_second']:.2f} MB/s uploaded, "
+          f"{throughput['requests_per_push']:.1f} requests/push")
+    print("Stages (p50, s):")
+    for name, value in sorted(result['stages_p50'].items(), key=lambda item: -item[1]):
+        print(f"   {name:<20} {value:.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--cli-latency', type=float, default=0.02,
+                        help='seconds per fake kicad-cli invocation')
+    parser.add_argument('--step-latency', type=float, default=0.5,
+                        help='seconds per fake STEP export')
+    parser.add_argument('--step-size', type=int, default=2000000)
+    parser.add_argument('--gerber-size', type=int, default=50000)
+    parser.add_argument('--pdf-size', type=int, default=200000)
+    parser.add_argument('--server-latency', type=float, default=0.0,
+                        help='seconds added to every Dokuly response')
+    parser.add_argument('--bandwidth', type=float, default=0,
+                        help='upload bandwidth in bytes per second (0 = unlimited)')
+    add_capability_arguments(parser)
+    parser.add_argument('--reject-chunked', action='store_true',
+                        help='the simulator refuses chunked (streamed) uploads')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra .env setting for the plugin (repeatable)')
+    parser.add_argument('--json', help='write the results to this JSON file')
+    parser.add_argument('--max-p50', type=float, help='fail if p50 latency exceeds this')
+    parser.add_argument('--max-p90', type=float, help='fail if p90 latency exceeds this')
+    parser.add_argument('--check-bulk-upload', action='store_true',
+                        help='also run against a server advertising bulk uploads; gates apply to both runs')
+    parser.add_argument('--keep', action='store_true', help='keep the benchmark work folder')
+    parser.add_argument('--verbose', action='store_true', help='echo the plugin output')
+    args = parser.parse_args(argv)
+
+    runs = [('', args)]
+    if args.check_bulk_upload and not args.bulk_upload:
+        runs.append(('bulk upload', argparse.Namespace(**dict(vars(args), bulk_upload=True))))
+
+    results = {}
+    exit_code = 0
+    for label, run_args in runs:
+        if label:
+            print(f"\n[{label}]")
+        result = run_benchmark(run_args)
+        print_report(result)
+        results[label or 'default'] = result
+        exit_code |= check_gates(result, args)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results['default'] if len(runs) == 1 else results, f, indent=2)
+    return exit_code
+
+
+def check_gates(result, args):
+    """1 if the run misses a gate, else 0"""
+    exit_code = 0
+    if result['failures']:
+        print(f"FAIL: {result['failures']} pushes did not upload every artifact")
+        exit_code = 1
+    if args.max_p50 is not None and result['latency']['p50'] > args.max_p50:
+        print(f"FAIL: p50 {result['latency']['p50']:.3f}s exceeds {args.max_p50:.3f}s")
+        exit_code = 1
+    if args.max_p90 is not None and result['latency']['p90'] > args.max_p90:
+        print(f"FAIL: p90 {result['latency']['p90']:.3f}s exceeds {args.max_p90:.3f}s")
+        exit_code = 1
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
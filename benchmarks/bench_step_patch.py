@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+STEP version-metadata benchmark
+
+Generates a large STEP file and inserts the version comment with the
+streaming header patcher and with the previous read-everything approach,
+reporting time and peak Python memory of each and checking that both
+produce the same file:
+
+    python benchmarks/bench_step_patch.py --size-mb 500
+"""
+
+import os
+import sys
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_host  # noqa: E402
+
+STEP_HEADER = """ISO-10303-21;
+HEADER;
+FILE_DESCRIPTION(('KiCad electronic assembly'),'2;1');
+FILE_NAME('bench.step','2025-01-01T00:00:00',('Pcbnew'),('Kicad'),'Open CASCADE STEP processor 7.8','KiCad to STEP converter','Unknown');
+FILE_SCHEMA(('AUTOMOTIVE_DESIGN { 1 0 10303 214 1 1 1 1 }'));
+ENDSEC;
+DATA;
+"""
+VERSION_COMMENT = "\n/* VERSION_INFO: BENCH_A_2501010000 */\n"
+
+
+def create_step(path, size):
+    line_count = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(STEP_HEADER)
+        block = ''.join(
+            f"#{n}=CARTESIAN_POINT('',({n * 0.001:.6f},{n * 0.002:.6f},{n * 0.003:.6f}));\n"
+            for n in range(10000, 20000))
+        written = len(STEP_HEADER)
+        while written < size:
+            f.write(block)
+            written += len(block)
+            line_count += 10000
+        f.write("ENDSEC;\nEND-ISO-10303-21;\n")
+
+
+def legacy_insert(step_file_path, version_comment):
+    """The previous implementation: whole file in memory, rewritten as text"""
+    with open(step_file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        content = f.read()
+    if "ISO-10303-21" in content:
+        header_end = content.find("ENDSEC;")
+        if header_end != -1:
+            new_content = content[:header_end + 7] + version_comment + content[header_end + 7:]
+            with open(step_file_path, 'w', encoding='utf-8') as f:
+                f.write(new_content)
+            return True
+    return False
+
+
+def sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def measure(function, path):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = function(path, VERSION_COMMENT)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=500)
+    parser.add_argument('--skip-legacy', action='store_true',
+                        help='only run the streaming patcher')
+    args = parser.parse_args(argv)
+
+    fake_host.install()
+    fake_host.load_plugin()
+    step_metadata = sys.modules[f"{fake_host.PLUGIN_MODULE_NAME}.step_metadata"]
+
+    work_dir = tempfile.mkdtemp(prefix='dokuly-step-')
+    try:
+        source = os.path.join(work_dir, 'source.step')
+        create_step(source, int(args.size_mb * 1024 * 1024))
+        size = os.path.getsize(source)
+        print(f"STEP file: {size / (1024 * 1024):.0f} MB")
+
+        runs = [('streaming', step_metadata.insert_after_header)]
+        if not args.skip_legacy:
+            runs.append(('legacy', legacy_insert))
+
+        digests = {}
+        for name, function in runs:
+            path = os.path.join(work_dir, f"{name}.step")
+            shutil.copyfile(source, path)
+            result, elapsed, peak = measure(function, path)
+            digests[name] = sha256(path)
+            print(f"   {name:<10} {elapsed:7.3f} s  {size / elapsed / (1024 * 1024):8.1f} MB/s  "
+                  f"peak {peak / (1024 * 1024):8.1f} MB  {'ok' if result else 'NOT PATCHED'}")
+            os.remove(path)
+
+        if len(set(digests.values())) > 1:
+            print("FAIL: the patched files differ")
+            return 1
+        return 0
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
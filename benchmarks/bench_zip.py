@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Package (ZIP) writing benchmark
+
+Builds a production-sized package from generated Gerber-like layers and
+PDF-like files with `archive.write_package` for each compression profile at
+several worker counts, reporting time and package size, and checks that
+every run of a profile produces the same bytes as its serial run:
+
+    python benchmarks/bench_zip.py --layers 32 --layer-size 5000000 --workers 1,2,4,8
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_host  # noqa: E402
+
+
+def create_inputs(folder, layers, layer_size, pdfs, pdf_size):
+    rng = random.Random(0)
+    entries = []
+    for index in range(layers):
+        path = os.path.join(folder, f"layer_{index:02d}.gbr")
+        with open(path, 'w', encoding='utf-8') as f:
+            written = 0
+            while written < layer_size:
+                line = f"X{rng.randint(0, 999999)}Y{rng.randint(0, 999999)}D01*\n"
+                f.write(line)
+                written += len(line)
+        entries.append((path, f"gerbers/{os.path.basename(path)}"))
+    for index in range(pdfs):
+        path = os.path.join(folder, f"page_{index}.pdf")
+        with open(path, 'wb') as f:
+            f.write(b"%PDF-1.5\n" + rng.randbytes(pdf_size))
+        entries.append((path, f"pdfs/{os.path.basename(path)}"))
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--layers', type=int, default=16)
+    parser.add_argument('--layer-size', type=int, default=2000000)
+    parser.add_argument('--pdfs', type=int, default=2)
+    parser.add_argument('--pdf-size', type=int, default=5000000)
+    parser.add_argument('--workers', default='1,2,4,8',
+                        help='comma-separated worker counts to compare')
+    parser.add_argument('--profiles', default='speed,balanced,size',
+                        help='comma-separated compression profiles to compare')
+    args = parser.parse_args(argv)
+
+    fake_host.install()
+    fake_host.load_plugin()
+    archive = sys.modules[f"{fake_host.PLUGIN_MODULE_NAME}.archive"]
+
+    work_dir = tempfile.mkdtemp(prefix='dokuly-zip-')
+    try:
+        entries = create_inputs(work_dir, args.layers, args.layer_size, args.pdfs, args.pdf_size)
+        input_bytes = sum(os.path.getsize(path) for path, _ in entries)
+        print(f"{len(entries)} entries, {input_bytes / (1024 * 1024):.1f} MB, "
+              f"{os.cpu_count()} cores")
+
+        mismatches = 0
+        for profile in args.profiles.split(','):
+            reference = None
+            serial_time = None
+            for workers in [int(w) for w in args.workers.split(',')]:
+                zip_path = os.path.join(work_dir, f"package_{profile}_{workers}.zip")
+                started = time.perf_counter()
+                _, _, stats = archive.write_package(entries, zip_path, workers=workers, profile=profile)
+                elapsed = time.perf_counter() - started
+                with open(zip_path, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                reference = reference or digest
+                serial_time = serial_time or elapsed
+                same = digest == reference
+                mismatches += not same
+                print(f"   {profile:<9} workers={workers:<3} {elapsed:7.3f} s  "
+                      f"x{serial_time / elapsed:4.2f}  "
+                      f"{os.path.getsize(zip_path) / (1024 * 1024):6.1f} MB  "
+                      f"{stats.stored} stored/{stats.deflated} deflated  "
+                      f"{'identical' if same else 'DIFFERENT'}")
+        return 1 if mismatches else 0
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
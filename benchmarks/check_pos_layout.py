@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Position file layout check
+
+Exports a board's position files with a real kicad-cli and compares them
+with the ones the plugin transcodes from its single placement export: the
+ASCII .pos files line by line (only the 'created on' stamp may differ) and
+the CSVs field by field, numbers to the precision the plugin writes.
+Exits non-zero on any difference:
+
+    python benchmarks/check_pos_layout.py path/to/board.kicad_pcb --kicad-cli /usr/bin/kicad-cli
+"""
+
+import os
+import sys
+import csv
+import shutil
+import difflib
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_host  # noqa: E402
+
+
+CLI_SIDES = {'top': 'front', 'bottom': 'back', None: 'both'}
+
+
+def export_pos(kicad_cli, pcb_file, output, fmt, side, units, filtered):
+    command = [kicad_cli, 'pcb', 'export', 'pos', '--output', output, '--format', fmt,
+               '--side', CLI_SIDES[side], '--units', units]
+    if filtered:
+        command += ['--smd-only', '--exclude-dnp', '--use-drill-file-origin']
+    subprocess.run(command + [pcb_file], check=True, capture_output=True, text=True)
+
+
+def read_lines(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read().splitlines(keepends=True)
+
+
+def printed_version(lines):
+    """The KiCad version named in a kicad-cli .pos header"""
+    prefix = '### Printed by KiCad version '
+    for line in lines:
+        if line.startswith(prefix):
+            return line[len(prefix):].rstrip('\n')
+    return ''
+
+
+def without_stamp(lines):
+    return [line for line in lines if not line.startswith('### Footprint positions - created on ')]
+
+
+def csv_differences(expected_path, actual_path):
+    """Rows of two CSV position files that differ beyond the plugin's 4 decimals"""
+    with open(expected_path, 'r', encoding='utf-8', newline='') as f:
+        expected = list(csv.reader(f))
+    with open(actual_path, 'r', encoding='utf-8', newline='') as f:
+        actual = list(csv.reader(f))
+    if len(expected) != len(actual):
+        return [f"{len(expected)} rows from kicad-cli, {len(actual)} transcoded"]
+
+    differences = []
+    for number, (want, got) in enumerate(zip(expected, actual), 1):
+        same = len(want) == len(got)
+        for index, (a, b) in enumerate(zip(want, got)):
+            if number > 1 and 3 <= index <= 5:
+                same = same and abs(float(a) - float(b)) <= 0.00005 + 1e-9
+            else:
+                same = same and a == b
+        if not same:
+            differences.append(f"row {number}: kicad-cli {want}, transcoded {got}")
+    return differences
+
+
+def check(args, placement_module):
+    work_dir = tempfile.mkdtemp(prefix='dokuly-pos-check-')
+    try:
+        # The plugin's placement export, same command as KiCadTool.placement_command
+        placement_csv = os.path.join(work_dir, 'placement.csv')
+        export_pos(args.kicad_cli, args.pcb_file, placement_csv, 'csv', None, 'mm', False)
+        placement = placement_module.Placement.load(placement_csv, args.pcb_file)
+
+        failures = 0
+        cases = [(side, units, filtered) for side in ('top', 'bottom')
+                 for units in ('mm', 'in') for filtered in (True, False)]
+        cases.append((None, 'mm', False))
+        for side, units, filtered in cases:
+            label = f"{CLI_SIDES[side]}, {units}{', filtered' if filtered else ''}"
+            if filtered:
+                components = placement.select(side, smd_only=True, exclude_dnp=True, drill_origin=True)
+            else:
+                components = placement.select(side)
+
+            expected = os.path.join(work_dir, 'expected.pos')
+            actual = os.path.join(work_dir, 'actual.pos')
+            export_pos(args.kicad_cli, args.pcb_file, expected, 'ascii', side, units, filtered)
+            expected_lines = read_lines(expected)
+            placement_module.write_kicad_ascii(actual, components, side, units=units,
+                                               kicad_version=printed_version(expected_lines))
+            diff = list(difflib.unified_diff(without_stamp(expected_lines), without_stamp(read_lines(actual)),
+                                             'kicad-cli', 'transcoded'))
+            print(f"{'OK  ' if not diff else 'FAIL'} ascii ({label})")
+            if diff:
+                failures += 1
+                sys.stdout.writelines(diff)
+
+            if side is None:
+                continue
+            expected = os.path.join(work_dir, 'expected.csv')
+            actual = os.path.join(work_dir, 'actual.csv')
+            export_pos(args.kicad_cli, args.pcb_file, expected, 'csv', side, units, filtered)
+            placement_module.write_kicad_csv(actual, components, units=units)
+            differences = csv_differences(expected, actual)
+            print(f"{'OK  ' if not differences else 'FAIL'} csv ({label})")
+            if differences:
+                failures += 1
+                for difference in differences:
+                    print(f"   {difference}")
+        return failures
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('pcb_file', help='a .kicad_pcb board to export')
+    parser.add_argument('--kicad-cli', default='kicad-cli', help='the real kicad-cli to compare with')
+    args = parser.parse_args(argv)
+
+    fake_host.install()
+    fake_host.load_plugin()
+    failures = check(args, sys.modules[f"{fake_host.PLUGIN_MODULE_NAME}.placement"])
+    if failures:
+        print(f"FAIL: {failures} position files differ from kicad-cli's")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Local Dokuly stand-in
+
+Implements the endpoints the plugin talks to:
+
+    GET  /api/v1/pcbas/ (and the other listing endpoints used for validation)
+    PUT  /api/v1/pcbas/fetchByPartNumberRevision/
+    POST /api/v1/pcbas/upload/{pk}/
+    POST /api/v1/pcbas/bom/{pk}/
+    POST /api/v1/pcbas/thumbnail/{pk}/
+
+and, when started with --bulk-upload or --request-encodings, the negotiated
+bulk upload and compressed (Content-Encoding: gzip/zstd) request bodies:
+
+    GET  /api/v1/pcbas/capabilities/
+    POST /api/v1/pcbas/uploadBulk/{pk}/
+
+with configurable response latency and upload bandwidth, and records every
+request it receives. A FaultPlan injects failure modes: 5xx errors (random or
+in bursts), connection resets part-way through an upload, and slow-loris
+responses that drip out over several seconds. Run it standalone for manual
+testing:
+
+    python benchmarks/dokuly_simulator.py --port 8000 --latency 0.05 --burst-every 10 --burst-length 3
+
+and point the plugin at DOKULY_URL=localhost:8000.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import socket
+import struct
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+READ_CHUNK_SIZE = 64 * 1024
+
+LISTING_PATHS = {
+    '/api/v1/pcbas/', '/api/v1/parts/', '/api/v1/assemblies/',
+    '/api/v1/documents/', '/api/v1/customers/',
+}
+UPLOAD_PATH_RE = re.compile(r'^/api/v1/pcbas/(upload|bom|thumbnail)/(\d+)/$')
+BULK_UPLOAD_PATH_RE = re.compile(r'^/api/v1/pcbas/uploadBulk/(\d+)/$')
+CAPABILITIES_PATH = '/api/v1/pcbas/capabilities/'
+
+
+def parse_multipart(content_type, body):
+    """Return {field name: {'filename', 'size', 'value'}} for a multipart body"""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('latin-1') + body)
+    fields = {}
+    if not message.is_multipart():
+        return fields
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        payload = part.get_payload(decode=True) or b''
+        filename = part.get_filename()
+        fields[name] = {
+            'filename': filename,
+            'size': len(payload),
+            'value': None if filename else payload.decode('utf-8', errors='replace'),
+        }
+    return fields
+
+
+class FaultPlan:
+    """Which failures the simulator injects, and how often"""
+
+    def __init__(self, error_rate=0.0, burst_every=0, burst_length=0, error_status=503,
+                 reset_rate=0.0, slow_loris=0.0, slow_loris_rate=0.0,
+                 path_pattern=None, seed=0, reject_chunked=False):
+        self.error_rate = error_rate  # probability of a 5xx response
+        self.burst_every = burst_every  # start a burst of errors every N requests
+        self.burst_length = burst_length  # consecutive errors per burst
+        self.error_status = error_status
+        self.reset_rate = reset_rate  # probability of resetting the connection mid-upload
+        self.slow_loris = slow_loris  # seconds a slow response takes to drip out
+        self.slow_loris_rate = slow_loris_rate  # probability of a slow response
+        self.path_pattern = re.compile(path_pattern) if path_pattern else None
+        self.reject_chunked = reject_chunked  # answer chunked request bodies with 411
+        self.random = random.Random(seed)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def pick(self, path):
+        """Return the fault for the next request: None, 'error', 'reset' or 'slow_loris'"""
+        if self.path_pattern and not self.path_pattern.search(path):
+            return None
+
+        with self.lock:
+            index = self.count
+            self.count += 1
+            roll = self.random.random()
+
+        if self.burst_every and index % self.burst_every < self.burst_length:
+            return 'error'
+        if roll < self.reset_rate:
+            return 'reset'
+        roll -= self.reset_rate
+        if roll < self.error_rate:
+            return 'error'
+        roll -= self.error_rate
+        if self.slow_loris and roll < self.slow_loris_rate:
+            return 'slow_loris'
+        return None
+
+
+class DokulyRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'DokulySimulator/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.simulator.verbose:
+            super().log_message(format, *args)
+
+    # Request body handling
+
+    def read_body(self):
+        """Read the request body, throttled to the configured bandwidth"""
+        simulator = self.server.simulator
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            return self.read_chunked_body()
+
+        remaining = int(self.headers.get('Content-Length') or 0)
+        chunks = []
+        while remaining > 0:
+            chunk = self.rfile.read(min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+            simulator.throttle(len(chunk))
+        return b''.join(chunks)
+
+    def read_chunked_body(self):
+        simulator = self.server.simulator
+        chunks = []
+        while True:
+            size_line = self.rfile.readline().strip()
+            size = int(size_line.split(b';')[0], 16)
+            if size == 0:
+                # Skip trailers up to the terminating blank line
+                while self.rfile.readline().strip():
+                    pass
+                break
+            chunk = self.rfile.read(size)
+            self.rfile.readline()
+            chunks.append(chunk)
+            simulator.throttle(len(chunk))
+        return b''.join(chunks)
+
+    def send_json(self, status, payload, drip_seconds=0.0):
+        body = json.dumps(payload).encode('utf-8')
+        if drip_seconds:
+            self.send_slowly(status, body, drip_seconds)
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_slowly(self, status, body, seconds):
+        """Slow-loris response: drip the response out a few bytes at a time"""
+        response = (
+            f"{self.protocol_version} {status} {self.responses.get(status, ('',))[0]}\r\n"
+            f"Server: {self.version_string()}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode('latin-1') + body
+        step = max(1, len(response) // 50)
+        pause = seconds / max(1, len(response) // step)
+        for offset in range(0, len(response), step):
+            self.wfile.write(response[offset:offset + step])
+            self.wfile.flush()
+            time.sleep(pause)
+
+    def reset_connection(self):
+        """Abort the connection with a TCP reset instead of a response"""
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        self.close_connection = True
+        self.connection.close()
+
+    def finish(self):
+        try:
+            super().finish()
+        except (OSError, ValueError):
+            pass  # the connection was reset on purpose
+
+    def authorized(self):
+        return self.headers.get('Authorization', '').startswith('Api-Key ')
+
+    # Dispatch
+
+    def handle_request(self, method):
+        simulator = self.server.simulator
+        started = time.perf_counter()
+        fault = simulator.faults.pick(self.path)
+        record = {
+            'method': method,
+            'path': self.path,
+            'headers': dict(self.headers.items()),
+            'bytes': 0,
+            'fields': {},
+            'fault': fault,
+            'received_at': time.time(),
+        }
+
+        if fault == 'reset':
+            # Take part of the upload, then drop the connection
+            length = int(self.headers.get('Content-Length') or 0)
+            record['bytes'] = len(self.rfile.read(length // 2)) if length else 0
+            record['status'] = None
+            record['duration'] = time.perf_counter() - started
+            simulator.record(record)
+            self.reset_connection()
+            return
+
+        body = self.read_body() if method in ('POST', 'PUT') else b''
+        record['bytes'] = len(body)
+        encoding = self.headers.get('Content-Encoding', '').lower()
+        if encoding and body:
+            record['encoding'] = encoding
+            body = simulator.decode_body(body, encoding)
+            record['decoded_bytes'] = len(body) if body is not None else None
+
+        simulator.delay()
+        if fault == 'error':
+            status, payload = simulator.faults.error_status, {'detail': 'Simulated server error'}
+        elif (simulator.faults.reject_chunked
+              and 'chunked' in self.headers.get('Transfer-Encoding', '').lower()):
+            status, payload = 411, {'detail': 'Length Required'}
+        elif body is None:
+            status, payload = 415, {'detail': f'Unsupported Content-Encoding "{encoding}"'}
+        else:
+            status, payload = self.route(method, body, record)
+            if status in (200, 201) and record.get('kind'):
+                simulator.store(record, body)
+
+        record['status'] = status
+        record['duration'] = time.perf_counter() - started
+        simulator.record(record)
+        self.send_json(status, payload,
+                       drip_seconds=simulator.faults.slow_loris if fault == 'slow_loris' else 0.0)
+
+    def route(self, method, body, record):
+        simulator = self.server.simulator
+        path = self.path.split('?', 1)[0]
+
+        if not self.authorized():
+            return 401, {'detail': 'Authentication credentials were not provided.'}
+
+        if method == 'GET' and path in LISTING_PATHS:
+            return 200, []
+
+        if method == 'PUT' and path == '/api/v1/pcbas/fetchByPartNumberRevision/':
+            try:
+                data = json.loads(body or b'{}')
+            except ValueError:
+                return 400, {'detail': 'Invalid JSON'}
+            record['fields'] = data
+            return 200, {
+                'id': simulator.pcba_pk,
+                'part_number': data.get('part_number'),
+                'revision': data.get('revision'),
+            }
+
+        if method == 'GET' and path == CAPABILITIES_PATH and simulator.capabilities:
+            return 200, simulator.capabilities
+
+        match = BULK_UPLOAD_PATH_RE.match(path)
+        if method == 'POST' and match and simulator.capabilities.get('bulk_upload'):
+            if int(match.group(1)) != simulator.pcba_pk:
+                return 404, {'detail': 'Not found.'}
+            fields = parse_multipart(self.headers.get('Content-Type', ''), body)
+            try:
+                metadata = json.loads(fields.get('metadata', {}).get('value') or '[]')
+            except ValueError:
+                return 400, {'detail': 'Invalid metadata'}
+            max_files = simulator.capabilities.get('max_bulk_files') or 0
+            if max_files and len(metadata) > max_files:
+                return 400, {'detail': f'At most {max_files} files per request'}
+            results = []
+            for entry in metadata:
+                stored = (fields.get(entry.get('field')) or {}).get('filename') is not None
+                results.append({'field': entry.get('field'),
+                                'display_name': entry.get('display_name'),
+                                'status': 201 if stored else 400})
+            record['kind'] = 'bulk'
+            record['fields'] = fields
+            record['files'] = [e for e, r in zip(metadata, results) if r['status'] == 201]
+            return 201, {'results': results}
+
+        match = UPLOAD_PATH_RE.match(path)
+        if method == 'POST' and match:
+            if int(match.group(2)) != simulator.pcba_pk:
+                return 404, {'detail': 'Not found.'}
+            record['kind'] = match.group(1)
+            record['fields'] = parse_multipart(self.headers.get('Content-Type', ''), body)
+            return 201, {'status': 'ok'}
+
+        return 404, {'detail': 'Not found.'}
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+
+class DokulySimulator:
+    """A Dokuly stand-in served from a background thread"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, bandwidth=0,
+                 pcba_pk=1, faults=None, store_dir=None, verbose=False, capabilities=None):
+        self.latency = latency  # seconds added to every response
+        self.bandwidth = bandwidth  # upload bytes per second, 0 for unlimited
+        self.pcba_pk = pcba_pk
+        self.faults = faults or FaultPlan()
+        self.store_dir = store_dir  # keep accepted uploads here, if set
+        self.verbose = verbose
+        self.capabilities = capabilities or {}  # empty: behave like a server without bulk uploads
+        self.received = []
+        self.lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer((host, port), DokulyRequestHandler)
+        self.server.daemon_threads = True
+        self.server.simulator = self
+        self.thread = None
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    @property
+    def base_url(self):
+        return f"http://{self.address}"
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name='dokuly-simulator', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def throttle(self, nbytes):
+        if self.bandwidth:
+            time.sleep(nbytes / self.bandwidth)
+
+    def decode_body(self, body, encoding):
+        """Decompress a request body, or None if the encoding is not accepted"""
+        if encoding not in self.capabilities.get('request_encodings', []):
+            return None
+        try:
+            if encoding == 'gzip':
+                return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+            if encoding == 'zstd' and zstandard is not None:
+                return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        except (zlib.error, ValueError):
+            pass
+        return None
+
+    def record(self, record):
+        with self.lock:
+            self.received.append(record)
+
+    def store(self, record, body):
+        """Save an accepted upload's multipart body for later inspection"""
+        if not self.store_dir:
+            return
+        os.makedirs(self.store_dir, exist_ok=True)
+        with self.lock:
+            index = len(self.received)
+        path = os.path.join(self.store_dir, f"{index:05d}_{record['kind']}.multipart")
+        with open(path, 'wb') as f:
+            f.write(body)
+        record['stored_as'] = path
+
+    def reset(self):
+        with self.lock:
+            self.received = []
+
+    def accepted_uploads(self):
+        """Upload requests the server answered with success"""
+        return [r for r in self.uploads() if r.get('status') in (200, 201)]
+
+    def uploaded_file_count(self):
+        """Files stored by accepted uploads, counting each file of a bulk request"""
+        return sum(len(r['files']) if r['kind'] == 'bulk' else 1
+                   for r in self.accepted_uploads())
+
+    def fault_counts(self):
+        counts = {}
+        with self.lock:
+            for record in self.received:
+                if record.get('fault'):
+                    counts[record['fault']] = counts.get(record['fault'], 0) + 1
+        return counts
+
+    def uploads(self):
+        """Recorded upload requests, in arrival order"""
+        with self.lock:
+            return [r for r in self.received if r.get('kind')]
+
+    def bytes_received(self):
+        with self.lock:
+            return sum(r['bytes'] for r in self.received)
+
+
+def add_capability_arguments(parser):
+    parser.add_argument('--bulk-upload', action='store_true',
+                        help='advertise and accept bulk multi-file uploads')
+    parser.add_argument('--max-bulk-files', type=int, default=0,
+                        help='most files accepted per bulk request (0 = no limit)')
+    parser.add_argument('--request-encodings', default='',
+                        help='comma-separated Content-Encodings accepted on uploads, e.g. gzip,zstd')
+
+
+def capabilities_from_args(args):
+    capabilities = {}
+    if args.bulk_upload:
+        capabilities['bulk_upload'] = True
+        capabilities['max_bulk_files'] = args.max_bulk_files
+    encodings = [e.strip() for e in args.request_encodings.split(',') if e.strip()]
+    if encodings:
+        capabilities['request_encodings'] = encodings
+    return capabilities
+
+
+def add_fault_arguments(parser):
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='probability of a 5xx response')
+    parser.add_argument('--burst-every', type=int, default=0,
+                        help='start a burst of 5xx responses every N requests')
+    parser.add_argument('--burst-length', type=int, default=0,
+                        help='number of consecutive 5xx responses per burst')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--reset-rate', type=float, default=0.0,
+                        help='probability of resetting the connection mid-upload')
+    parser.add_argument('--slow-loris', type=float, default=0.0,
+                        help='seconds a slow response takes to drip out')
+    parser.add_argument('--slow-loris-rate', type=float, default=0.0,
+                        help='probability of a slow response')
+    parser.add_argument('--fault-paths', help='only inject faults on paths matching this regex')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reject-chunked', action='store_true',
+                        help='answer chunked request bodies with 411, like a server without a buffering proxy')
+
+
+def fault_plan_from_args(args):
+    return FaultPlan(
+        error_rate=args.error_rate, burst_every=args.burst_every,
+        burst_length=args.burst_length, error_status=args.error_status,
+        reset_rate=args.reset_rate, slow_loris=args.slow_loris,
+        slow_loris_rate=args.slow_loris_rate, path_pattern=args.fault_paths,
+        seed=args.seed, reject_chunked=args.reject_chunked)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to every response')
+    parser.add_argument('--bandwidth', type=float, default=0,
+                        help='upload bandwidth in bytes per second (0 = unlimited)')
+    parser.add_argument('--pcba-pk', type=int, default=1)
+    add_capability_arguments(parser)
+    add_fault_arguments(parser)
+    parser.add_argument('--store-dir', help='save accepted uploads to this folder')
+    args = parser.parse_args(argv)
+
+    simulator = DokulySimulator(args.host, args.port, args.latency, args.bandwidth,
+                                args.pcba_pk, faults=fault_plan_from_args(args),
+                                store_dir=args.store_dir, verbose=True,
+                                capabilities=capabilities_from_args(args))
+    print(f"Dokuly simulator listening on {simulator.base_url}")
+    try:
+        simulator.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
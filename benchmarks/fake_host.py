@@ -0,0 +1,180 @@
+"""
+Headless stand-in for the KiCad host
+
+The plugin imports `pcbnew` and `wx`, which only exist inside KiCad. For
+benchmarks on a plain Linux box this module provides just enough of both to
+construct `KiCadTool` without a display, and loads the plugin package from
+its folder (whose name, kicad-to-dokuly-plugin, is not importable directly).
+"""
+
+import os
+import sys
+import types
+import struct
+import zlib
+import importlib.util
+
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_MODULE_NAME = 'kicad_to_dokuly'
+
+
+class Widget:
+    """Accepts any constructor arguments and ignores any method call"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class TextCtrl(Widget):
+    """Collects appended text so benchmarks can inspect the output"""
+
+    def __init__(self, *args, **kwargs):
+        self.chunks = []
+        self.echo = os.environ.get('FAKE_HOST_ECHO') == '1'
+
+    def AppendText(self, text):
+        self.chunks.append(text)
+        if self.echo:
+            sys.stdout.write(text)
+
+    def GetValue(self):
+        return ''.join(self.chunks)
+
+    def Clear(self):
+        self.chunks = []
+
+
+class Timer(Widget):
+    """wx.Timer that never fires; the log sink is flushed explicitly when headless"""
+
+    def IsRunning(self):
+        return False
+
+
+class Image:
+    """wx.Image reduced to what the thumbnail code needs: PNG size in, plain PNG of that size out"""
+
+    def __init__(self, *args, **kwargs):
+        self.width = self.height = 0
+        if args and isinstance(args[0], str):
+            with open(args[0], 'rb') as f:
+                header = f.read(24)
+            if header[:8] == b'\x89PNG\r\n\x1a\n':
+                self.width, self.height = struct.unpack('>II', header[16:24])
+        elif len(args) >= 2:
+            self.width, self.height = args[0], args[1]
+
+    def IsOk(self):
+        return self.width > 0 and self.height > 0
+
+    def GetWidth(self):
+        return self.width
+
+    def GetHeight(self):
+        return self.height
+
+    def Scale(self, width, height, quality=0):
+        return Image(width, height)
+
+    def SetRGB(self, *args):
+        pass
+
+    def Paste(self, image, x, y):
+        pass
+
+    def SaveFile(self, path, kind=0):
+        def chunk(tag, data):
+            return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+        rows = (b'\x00' + b'\xff' * (3 * self.width)) * self.height
+        with open(path, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n'
+                    + chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8, 2, 0, 0, 0))
+                    + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+        return True
+
+
+class Board:
+    def __init__(self, file_name, text_vars):
+        self.file_name = file_name
+        self.text_vars = dict(text_vars)
+
+    def GetFileName(self):
+        return self.file_name
+
+    def GetTextVars(self):
+        return self.text_vars
+
+
+class ActionPlugin:
+    def register(self):
+        pass
+
+
+def make_wx():
+    wx = types.ModuleType('wx')
+    for name in ('Frame', 'Panel', 'BoxSizer', 'StaticText', 'Button', 'Dialog',
+                 'Choice', 'CheckBox', 'Colour', 'Font', 'FileDialog', 'Gauge',
+                 'Bitmap', 'Rect', 'App', 'TimerEvent', 'CommandEvent'):
+        setattr(wx, name, type(name, (Widget,), {}))
+    wx.TextCtrl = TextCtrl
+    wx.Image = Image
+    wx.Timer = Timer
+    wx.Yield = lambda *args, **kwargs: True
+    wx.YES = 2
+    wx.NO = 8
+    wx.ID_OK = 5100
+    wx.ID_CANCEL = 5101
+    wx.MessageBox = lambda *args, **kwargs: wx.NO
+    wx.CallAfter = lambda func, *args, **kwargs: func(*args, **kwargs)
+    wx.IsMainThread = lambda: True
+    wx.GetTopLevelWindows = lambda: []
+    wx.GetApp = lambda: None
+
+    # Style flags and event binders only need to be distinct values
+    def module_getattr(name):
+        if name.isupper() or name.startswith('EVT_'):
+            return 0
+        raise AttributeError(name)
+
+    wx.__getattr__ = module_getattr
+    return wx
+
+
+def make_pcbnew():
+    pcbnew = types.ModuleType('pcbnew')
+    pcbnew.ActionPlugin = ActionPlugin
+    pcbnew.current_board = None
+    pcbnew.GetBoard = lambda: pcbnew.current_board
+    pcbnew.GetBuildVersion = lambda: '8.0.0'
+    return pcbnew
+
+
+def install(board_file=None, text_vars=None):
+    """Register the fake `wx` and `pcbnew` modules; returns the pcbnew module"""
+    if 'wx' not in sys.modules:
+        sys.modules['wx'] = make_wx()
+    if 'pcbnew' not in sys.modules:
+        sys.modules['pcbnew'] = make_pcbnew()
+    pcbnew = sys.modules['pcbnew']
+    if board_file is not None:
+        pcbnew.current_board = Board(board_file, text_vars or {})
+    return pcbnew
+
+
+def load_plugin(plugin_dir=PLUGIN_DIR):
+    """Import the plugin package from its folder and return the module"""
+    if PLUGIN_MODULE_NAME in sys.modules:
+        return sys.modules[PLUGIN_MODULE_NAME]
+
+    spec = importlib.util.spec_from_file_location(
+        PLUGIN_MODULE_NAME, os.path.join(plugin_dir, '__init__.py'),
+        submodule_search_locations=[plugin_dir])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PLUGIN_MODULE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Scripted kicad-cli stand-in for benchmarks
+
+Understands the subcommands the plugin uses and writes deterministic output
+files of configurable size after a configurable delay. Configuration is read
+as JSON from the FAKE_KICAD_CLI_CONFIG environment variable:
+
+    {
+        "version": "9.0.0",
+        "latency": {"default": 0.02, "step": 0.5},
+        "sizes": {"gerber": 50000, "step": 2000000}
+    }
+
+Latency and size keys are the export kind (gerbers, drill, pos, pdf, step,
+svg, bom, ...); "default" applies to anything not listed. "commands" lists
+the subcommands `--help` reports, so capability probes can be exercised.
+
+`jobset run` executes the jobs of a jobset file in one process: the
+"default" latency (start-up and loading the board) is paid once, plus
+whatever each job's kind costs on top of it.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import struct
+import zlib
+
+
+DEFAULT_CONFIG = {
+    'version': '9.0.0',
+    'latency': {'default': 0.02, 'step': 0.5},
+    'sizes': {
+        'default': 20000,
+        'gerber': 50000,
+        'drill': 10000,
+        'pos': 5000,
+        'pdf': 200000,
+        'step': 2000000,
+        'svg': 20000,
+        'bom': 2000,
+        'glb': 300000,
+    },
+    'commands': {
+        '': ['fp', 'jobset', 'pcb', 'sch', 'sym', 'version'],
+        'pcb': ['drc', 'export', 'render'],
+        'pcb export': ['drill', 'gerbers', 'glb', 'ipc2581', 'odb', 'pdf', 'pos', 'step', 'svg'],
+        'sch export': ['bom', 'pdf'],
+    },
+}
+
+# Options that take a value; everything else starting with '-' is a flag
+VALUE_OPTIONS = {
+    '-o', '--output', '-l', '--layers', '--format', '--side', '--units',
+    '--fields', '--labels', '--field-delimiter', '--string-delimiter',
+    '--group-by', '--sort-field', '--filter', '--drawing-sheet', '-t', '--theme',
+    '-D', '--define-var', '--min-distance', '--max-distance', '--page-size-mode',
+    '--common-layers', '--excellon-units', '--excellon-zeros-format',
+    '--excellon-oval-format', '--drill-origin', '--map-format', '--precision',
+    '--width', '--height', '--zoom', '--quality', '--preset', '--perspective',
+    '--rotate', '--pan', '--pivot', '--background', '--floor', '--variant',
+    '--scale', '--jobset', '--user-origin', '--compression', '--mode',
+    '--bom-col-int-id', '--bom-col-mfg-pn', '--bom-col-mfg', '--bom-col-dist-pn',
+    '--bom-col-dist', '--ref-delimiter', '--ref-range-delimiter', '--sheet-path',
+    '--file',
+}
+
+# Export kind of each jobset job type
+JOB_KINDS = {
+    'pcb_export_gerbers': 'gerbers',
+    'pcb_export_drill': 'drill',
+    'pcb_export_pos': 'pos',
+    'pcb_export_pdf': 'pdf',
+    'pcb_export_svg': 'svg',
+    'sch_export_pdf': 'pdf',
+    'sch_export_bom': 'bom',
+}
+
+
+def load_config():
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    override = os.environ.get('FAKE_KICAD_CLI_CONFIG')
+    if override:
+        override = json.loads(override)
+        for key, value in override.items():
+            if isinstance(value, dict):
+                config.setdefault(key, {}).update(value)
+            else:
+                config[key] = value
+    return config
+
+
+def parse_args(argv):
+    words, options, flags = [], {}, set()
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in VALUE_OPTIONS and i + 1 < len(argv):
+            options.setdefault(arg, []).append(argv[i + 1])
+            i += 2
+            continue
+        if arg.startswith('-'):
+            flags.add(arg)
+        else:
+            words.append(arg)
+        i += 1
+    return words, options, flags
+
+
+def option(options, *names):
+    for name in names:
+        if name in options:
+            return options[name][-1]
+    return None
+
+
+def text_payload(size, line):
+    """Deterministic text of roughly `size` bytes, shaped like the real output"""
+    chunks = []
+    total = 0
+    n = 0
+    while total < size:
+        row = line.format(n=n, x=(n * 37) % 100000, y=(n * 53) % 100000, side=('top', 'bottom')[n % 2])
+        chunks.append(row)
+        total += len(row)
+        n += 1
+    return ''.join(chunks)
+
+
+def pdf_payload(size):
+    """A PDF header followed by incompressible bytes, like KiCad's deflated page streams"""
+    return b"%PDF-1.5\n" + random.Random(size).randbytes(size)
+
+
+def write(path, content):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(content)
+
+
+def write_bytes(path, content):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def export_gerbers(output, layers, board_name, size):
+    layers = layers.split(',') if layers else [
+        'F.Cu', 'B.Cu', 'F.Paste', 'B.Paste', 'F.SilkS', 'B.SilkS',
+        'F.Mask', 'B.Mask', 'Edge.Cuts']
+    body = text_payload(size, "X{x}Y{y}D01*\n")
+    if output.endswith('.gbr') and len(layers) == 1:
+        write(output, f"%TF.FileFunction,{layers[0]}*%\n" + body)
+        return
+    for layer in layers:
+        write(os.path.join(output, f"{board_name}-{layer.replace('.', '_')}.gbr"),
+              f"%TF.FileFunction,{layer}*%\n" + body)
+
+
+def export_drill(output, board_name, separate, size):
+    body = text_payload(size, "X{x}Y{y}\n")
+    if separate:
+        write(os.path.join(output, f"{board_name}-PTH.drl"), "M48\n" + body)
+        write(os.path.join(output, f"{board_name}-NPTH.drl"), "M48\n" + body)
+    else:
+        write(os.path.join(output, f"{board_name}.drl"), "M48\n" + body)
+
+
+def export_pos(output, fmt, side, size):
+    # --side both lists the parts of both sides, alternating here
+    side = '{side}' if side in (None, 'both') else side
+    if fmt == 'csv':
+        header = "Ref,Val,Package,PosX,PosY,Rot,Side\n"
+        line = "R{n},10k,R_0402,{x}.0,{y}.0,90," + side + "\n"
+    else:
+        header = "### Footprint positions\n# Ref Val Package PosX PosY Rot Side\n"
+        line = "R{n} 10k R_0402 {x}.0 {y}.0 90 " + side + "\n"
+    write(output, header + text_payload(size, line) + ("## End\n" if fmt != 'csv' else ''))
+
+
+def export_step(output, size):
+    header = (
+        "ISO-10303-21;\nHEADER;\n"
+        "FILE_DESCRIPTION(('KiCad electronic assembly'),'2;1');\n"
+        "FILE_NAME('board.step','2025-01-01T00:00:00',(''),(''),'fake','fake','');\n"
+        "FILE_SCHEMA(('AUTOMOTIVE_DESIGN'));\nENDSEC;\nDATA;\n")
+    body = text_payload(size, "#{n}=CARTESIAN_POINT('',({x}.,{y}.,0.));\n")
+    write(output, header + body + "ENDSEC;\nEND-ISO-10303-21;\n")
+
+
+def export_glb(output, size):
+    write_bytes(output, b"glTF" + random.Random(size).randbytes(size))
+
+
+def export_bom(output, fields, labels, size):
+    columns = labels or fields or 'Reference,Value,Footprint,Qty,DNP'
+    columns = [c.replace('${', '').replace('}', '') for c in columns.split(',')]
+    header = ','.join(f'"{c}"' for c in columns) + "\n"
+    row_values = ['"R{n}"', '"MPN-{x}"', '"R_0402"', '"1"', '""', '""', '""', '""']
+    line = ','.join(row_values[:len(columns)]) + "\n"
+    write(output, header + text_payload(size, line))
+
+
+def png_payload(width, height):
+    """A valid RGB PNG with a horizontal gradient, standing in for a rendered board view"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    row = b'\x00' + b''.join(bytes((x * 255 // max(width - 1, 1), 128, 96)) for x in range(width))
+    rows = row * height
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows, 6)) + chunk(b'IEND', b''))
+
+
+def size_for(config, kind):
+    return config['sizes'].get(kind.rstrip('s'), config['sizes'].get(kind, config['sizes']['default']))
+
+
+def run_jobset(config, jobset_file, project_file):
+    with open(jobset_file, 'r', encoding='utf-8') as f:
+        jobset = json.load(f)
+    output_path = jobset['outputs'][0]['settings']['output_path']
+    board_name = os.path.splitext(os.path.basename(project_file))[0] or 'board'
+    latency = config['latency']
+    default_latency = latency.get('default', 0)
+
+    total_latency = default_latency
+    for job in jobset['jobs']:
+        settings = job['settings']
+        kind = settings.get('format') if job['type'] == 'pcb_export_3d' else JOB_KINDS.get(job['type'])
+        if kind is None:
+            sys.stderr.write(f"fake kicad-cli: unsupported job type {job['type']}\n")
+            continue
+        total_latency += max(0, latency.get(kind, default_latency) - default_latency)
+        size = size_for(config, kind)
+        target = os.path.join(output_path, settings['output_filename'])
+        if kind == 'gerbers':
+            export_gerbers(target, ','.join(settings.get('layers') or []), board_name, size)
+        elif kind == 'drill':
+            export_drill(target, board_name, settings.get('excellon_separate_th'), size)
+        elif kind == 'pos':
+            export_pos(target, settings.get('format'), settings.get('side'), size)
+        elif kind in ('step', 'stpz'):
+            export_step(target, size)
+        elif kind == 'glb':
+            export_glb(target, size)
+        elif kind == 'pdf':
+            write_bytes(target, pdf_payload(size))
+        elif kind == 'bom':
+            export_bom(target, ','.join(settings.get('fields_ordered') or []),
+                       ','.join(settings.get('fields_labels') or []), size)
+        else:
+            write(target, text_payload(size, "{n}\n"))
+    time.sleep(total_latency)
+    return 0
+
+
+def main(argv):
+    config = load_config()
+    words, options, flags = parse_args(argv)
+
+    if '--version' in flags or argv[:1] == ['version']:
+        print(config['version'])
+        return 0
+
+    if '--help' in flags or '-h' in flags:
+        print(f"Usage: kicad-cli {' '.join(words)} [--help] <command>\n\nSubcommands:")
+        for command in config['commands'].get(' '.join(words), []):
+            print(f"  {command}")
+        return 0
+
+    if len(words) < 3:
+        sys.stderr.write(f"fake kicad-cli: unsupported command: {' '.join(argv)}\n")
+        return 1
+
+    if words[:2] == ['jobset', 'run']:
+        return run_jobset(config, option(options, '--file'), words[2])
+
+    if words[:2] == ['pcb', 'render']:
+        time.sleep(config['latency'].get('render', config['latency'].get('default', 0)))
+        if not os.path.exists(words[-1]):
+            sys.stderr.write(f"Failed to load board {words[-1]}\n")
+            return 2
+        write_bytes(option(options, '--output', '-o'),
+                    png_payload(int(option(options, '--width') or 1600), int(option(options, '--height') or 900)))
+        return 0
+
+    domain, action, kind = words[0], words[1], words[2]
+    rest = words[3:]
+    output = option(options, '--output', '-o')
+    if output is None and kind == 'step' and len(rest) >= 2:
+        output = rest[0]  # legacy "export step <output> <board>" syntax
+    input_file = rest[-1] if rest else ''
+    board_name = os.path.splitext(os.path.basename(input_file))[0] or 'board'
+
+    latency = config['latency'].get(kind, config['latency'].get('default', 0))
+    size = size_for(config, kind)
+    time.sleep(latency)
+
+    if action != 'export' or output is None:
+        sys.stderr.write(f"fake kicad-cli: unsupported command: {' '.join(argv)}\n")
+        return 1
+
+    if input_file and not os.path.exists(input_file):
+        sys.stderr.write(f"Failed to load board {input_file}\n")
+        return 2
+
+    if domain == 'pcb' and kind == 'gerbers':
+        export_gerbers(output, option(options, '--layers', '-l'), board_name, size)
+    elif domain == 'pcb' and kind == 'drill':
+        export_drill(output, board_name, '--excellon-separate-th' in flags, size)
+    elif domain == 'pcb' and kind == 'pos':
+        export_pos(output, option(options, '--format'), option(options, '--side'), size)
+    elif domain == 'pcb' and kind == 'step':
+        export_step(output, size)
+    elif domain == 'pcb' and kind == 'glb':
+        export_glb(output, size)
+    elif kind == 'pdf':
+        write_bytes(output, pdf_payload(size))
+    elif kind == 'svg':
+        write(output, "%fake svg\n" + text_payload(size, "{n} {x} {y} l\n"))
+    elif domain == 'sch' and kind == 'bom':
+        export_bom(output, option(options, '--fields'), option(options, '--labels'), size)
+    else:
+        write(output, text_payload(size, "{n}\n"))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Upload stress test against the Dokuly simulator
+
+Drives `KiCadTool.upload_file_to_pcba` and `upload_bom_csv` from several
+threads against the local Dokuly simulator with injected faults, then
+compares what the plugin attempted with what the server actually accepted:
+
+    python benchmarks/stress_uploads.py --uploads 200 --concurrency 8 \
+        --file-size 2000000 --burst-every 20 --burst-length 3 --reset-rate 0.02
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_host  # noqa: E402
+from bench_push import create_project, make_tool_class, percentile, FAKE_KICAD_CLI  # noqa: E402
+from dokuly_simulator import DokulySimulator, add_fault_arguments, fault_plan_from_args  # noqa: E402
+
+
+def write_payload(path, size):
+    line = b"X012345Y067890D01*\n"
+    with open(path, 'wb') as f:
+        f.write(line * (size // len(line) + 1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--uploads', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--file-size', type=int, default=500000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--bandwidth', type=float, default=0)
+    add_fault_arguments(parser)
+    parser.add_argument('--store-dir', help='save accepted uploads to this folder')
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='dokuly-stress-')
+    try:
+        project_dir = os.path.join(work_dir, 'project')
+        pcb_file = create_project(project_dir)
+        fake_host.install(pcb_file, {'PCBA_NUMBER': 'PCBA1', 'PCBA_REVISION': 'A'})
+        plugin = fake_host.load_plugin()
+
+        with DokulySimulator(latency=args.latency, bandwidth=args.bandwidth,
+                             store_dir=args.store_dir) as simulator:
+            env_file = os.path.join(work_dir, 'stress.env')
+            with open(env_file, 'w', encoding='utf-8') as f:
+                f.write(f"DOKULY_API_KEY=stress\nDOKULY_URL={simulator.address}\n"
+                        f"URL_PROTOCOL=http\nREPLACE_FILES=true\n")
+            settings = {
+                'kicad_cli': FAKE_KICAD_CLI,
+                'env_file': env_file,
+                'temp_dir': os.path.join(work_dir, 'plugin_temp'),
+            }
+            tool = make_tool_class(plugin, settings)(None, 'stress')
+            if tool.pcba_pk in (None, -1):
+                print("Could not fetch the PCBA from the simulator")
+                return 1
+
+            # Faults only apply once the tool is set up
+            simulator.faults = fault_plan_from_args(args)
+            simulator.reset()
+
+            payload_dir = os.path.join(work_dir, 'payloads')
+            os.makedirs(payload_dir)
+            durations = []
+
+            def upload(index):
+                path = os.path.join(payload_dir, f"payload_{index}.gbr")
+                write_payload(path, args.file_size)
+                started = time.perf_counter()
+                if index % 10 == 0:
+                    tool.upload_bom_csv(path)
+                else:
+                    tool.upload_file_to_pcba(path, f"stress_{index}", 'gerber', True)
+                durations.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                list(pool.map(upload, range(args.uploads)))
+            elapsed = time.perf_counter() - started
+
+            accepted = simulator.accepted_uploads()
+            print(f"Uploads attempted: {args.uploads}")
+            print(f"Uploads accepted:  {len(accepted)}")
+            print(f"Server requests:   {len(simulator.received)}")
+            print(f"Injected faults:   {simulator.fault_counts() or 'none'}")
+            print(f"Elapsed:           {elapsed:.2f} s "
+                  f"({sum(r['bytes'] for r in accepted) / elapsed / (1024 * 1024):.2f} MB/s accepted)")
+            print("Upload latency (s): " + '  '.join(
+                f"{name}={percentile(durations, fraction):.3f}"
+                for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99))))
+            return 0 if len(accepted) == args.uploads else 1
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
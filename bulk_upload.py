@@ -0,0 +1,118 @@
+"""
+Bulk artifact uploads
+
+While a batch is open, the artifacts of a push are queued instead of being
+posted one at a time, then sent to Dokuly in a single multipart request with
+a metadata array describing each file. Whether the server accepts such
+requests is negotiated through its capabilities endpoint; anything the
+server does not accept is uploaded file by file as before.
+"""
+
+import os
+import json
+from contextlib import contextmanager, ExitStack
+
+
+FILE_FIELD_PREFIX = 'file_'
+
+
+def parse_capabilities(payload):
+    """Normalize a capabilities response; unknown or malformed servers get no features"""
+    if not isinstance(payload, dict):
+        return {}
+    capabilities = {
+        'bulk_upload': bool(payload.get('bulk_upload')),
+        'max_bulk_files': 0,
+        'request_encodings': [],
+    }
+    try:
+        capabilities['max_bulk_files'] = max(0, int(payload.get('max_bulk_files') or 0))
+    except (TypeError, ValueError):
+        pass
+    encodings = payload.get('request_encodings') or []
+    if isinstance(encodings, list):
+        capabilities['request_encodings'] = [str(e).lower() for e in encodings]
+    return capabilities
+
+
+def request_file_objects(files):
+    """The file objects of a requests `files` argument, given as a dict or a list of pairs"""
+    if not files:
+        return []
+    values = files.values() if isinstance(files, dict) else [value for name, value in files]
+    return [value[1] if isinstance(value, tuple) else value for value in values]
+
+
+def rewind_files(files):
+    """Seek the file objects of a requests `files` argument back to the start, for a resend"""
+    for file_obj in request_file_objects(files):
+        if hasattr(file_obj, 'seek'):
+            file_obj.seek(0)
+
+
+class QueuedUpload:
+    """One artifact waiting for the bulk request"""
+
+    def __init__(self, path, metadata, fallback, content_type=None, remove_after=False):
+        self.path = path
+        self.metadata = metadata  # display_name, file_type, gerber, replace_files
+        self.fallback = fallback  # uploads this file on its own if the bulk request fails
+        self.content_type = content_type
+        self.remove_after = remove_after
+
+    @property
+    def display_name(self):
+        return self.metadata.get('display_name') or os.path.basename(self.path)
+
+
+class UploadBatch:
+    """Artifacts collected for one bulk upload request"""
+
+    def __init__(self):
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, path, metadata, fallback, content_type=None, remove_after=False):
+        entry = QueuedUpload(path, metadata, fallback, content_type, remove_after)
+        self.entries.append(entry)
+        return entry
+
+    def chunks(self, max_files=0):
+        """Split the batch into requests of at most max_files files (0 = no limit)"""
+        if not max_files:
+            return [self.entries] if self.entries else []
+        return [self.entries[i:i + max_files] for i in range(0, len(self.entries), max_files)]
+
+    @staticmethod
+    @contextmanager
+    def open_request(entries, item_id):
+        """Yield (files, data) for one multipart request carrying `entries`"""
+        with ExitStack() as stack:
+            files = []
+            metadata = []
+            for index, entry in enumerate(entries):
+                field = f"{FILE_FIELD_PREFIX}{index}"
+                file_obj = stack.enter_context(open(entry.path, 'rb'))
+                name = os.path.basename(entry.path)
+                files.append((field, (name, file_obj, entry.content_type) if entry.content_type
+                              else (name, file_obj)))
+                metadata.append(dict(entry.metadata, field=field))
+            data = {'app': 'pcbas', 'item_id': item_id, 'metadata': json.dumps(metadata)}
+            yield files, data
+
+    @staticmethod
+    def failed_entries(entries, payload):
+        """Entries the server reported as not stored; no per-file results means all were stored"""
+        results = payload.get('results') if isinstance(payload, dict) else None
+        if not isinstance(results, list):
+            return []
+        status_by_field = {result.get('field'): result.get('status')
+                           for result in results if isinstance(result, dict)}
+        failed = []
+        for index, entry in enumerate(entries):
+            status = status_by_field.get(f"{FILE_FIELD_PREFIX}{index}")
+            if status not in (200, 201):
+                failed.append(entry)
+        return failed
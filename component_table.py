@@ -0,0 +1,157 @@
+"""
+Component table
+
+Every BOM is derived from one kicad-cli export of the schematic: a row per
+symbol carrying all the fields any BOM needs. The Dokuly BOM (grouped by MPN)
+and the production BOM (a row per reference) are built from it in-process,
+so the schematic is loaded once however many BOMs are made.
+"""
+
+import re
+import csv
+
+
+# Fields of the export, in kicad-cli --fields syntax, and their column labels
+TABLE_FIELDS = ['Reference', 'Value', 'Footprint', 'MPN', '${DNP}']
+TABLE_LABELS = ['Reference', 'Value', 'Footprint', 'MPN', 'DNP']
+
+# Column names of other BOM layouts (kicad-cli's default fields among them), by table field
+COLUMN_ALIASES = {
+    'reference': ('ref', 'refs', 'reference', 'references', 'designator', 'parts'),
+    'value': ('value', 'val'),
+    'footprint': ('footprint', 'package'),
+    'mpn': ('mpn', 'part number', 'p/n', 'pn'),
+    'dnp': ('dnp', 'dnm', 'do not mount', '${dnp}'),
+}
+
+REFERENCE_RE = re.compile(r'^(.*?)(\d+)$')
+RANGE_RE = re.compile(r'^([^\d]*)(\d+)-\1?(\d+)$')
+
+# (label, field) columns of the BOMs made from the table
+DOKULY_COLUMNS = [('Reference', 'reference'), ('MPN', 'mpn'), ('QUANTITY', 'quantity'), ('DNP', 'dnp')]
+PRODUCTION_COLUMNS = [('Reference', 'reference'), ('MPN', 'value'), ('Footprint', 'footprint'),
+                      ('QUANTITY', 'quantity'), ('DNP', 'dnp')]
+
+
+def reference_key(reference):
+    """Sort key putting R2 before R10"""
+    match = REFERENCE_RE.match(reference)
+    if not match:
+        return (reference, -1)
+    return (match.group(1), int(match.group(2)))
+
+
+def expand_references(text):
+    """Individual references of a BOM cell such as 'R1-R3,R5'"""
+    references = []
+    for part in re.split(r'[,\s]+', text.strip()):
+        if not part:
+            continue
+        match = RANGE_RE.match(part)
+        if match and int(match.group(2)) <= int(match.group(3)):
+            prefix = match.group(1)
+            references += [f"{prefix}{n}" for n in range(int(match.group(2)), int(match.group(3)) + 1)]
+        else:
+            references.append(part)
+    return references
+
+
+def shorthand(references):
+    """References joined the way kicad-cli groups them: runs of three or more become R1-R3"""
+    parts = []
+    run = []
+    for reference in sorted(references, key=reference_key):
+        prefix, number = reference_key(reference)
+        if run and (number < 0 or prefix != run[-1][0] or number != run[-1][1] + 1):
+            parts.append(run)
+            run = []
+        run.append((prefix, number, reference))
+    if run:
+        parts.append(run)
+
+    joined = []
+    for run in parts:
+        if len(run) >= 3:
+            joined.append(f"{run[0][2]}-{run[-1][2]}")
+        else:
+            joined += [reference for _, _, reference in run]
+    return ','.join(joined)
+
+
+class ComponentRow:
+    """One schematic symbol"""
+
+    def __init__(self, reference, value='', footprint='', mpn='', dnp=False):
+        self.reference = reference
+        self.value = value
+        self.footprint = footprint
+        self.mpn = mpn
+        self.dnp = dnp
+
+
+class ComponentTable:
+    """The symbols of a schematic, one row per reference"""
+
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda row: reference_key(row.reference))
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def load(cls, csv_path):
+        """Parse a kicad-cli BOM export; grouped rows are split into their references"""
+        with open(csv_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            columns = {}
+            for index, label in enumerate(header):
+                label = label.strip().lower()
+                for field, aliases in COLUMN_ALIASES.items():
+                    if label in aliases and field not in columns:
+                        columns[field] = index
+
+            if 'reference' not in columns:
+                raise ValueError(f"No reference column in BOM export header: {header}")
+
+            def cell(row, field):
+                index = columns.get(field)
+                return row[index].strip() if index is not None and index < len(row) else ''
+
+            rows = []
+            for row in reader:
+                if not any(row):
+                    continue
+                dnp = cell(row, 'dnp').lower() not in ('', '0', 'no', 'false')
+                for reference in expand_references(cell(row, 'reference')):
+                    rows.append(ComponentRow(reference, cell(row, 'value'), cell(row, 'footprint'),
+                                             cell(row, 'mpn'), dnp))
+        return cls(rows)
+
+    def groups(self, group_by=None, exclude_dnp=False):
+        """Lists of rows sharing the group_by fields (a row each without), in reference order"""
+        if not group_by:
+            return [[row] for row in self.rows if not (exclude_dnp and row.dnp)]
+        groups = {}
+        for row in self.rows:
+            if exclude_dnp and row.dnp:
+                continue
+            groups.setdefault(tuple(getattr(row, field) for field in group_by), []).append(row)
+        return list(groups.values())  # insertion order follows the sorted rows
+
+    def write_csv(self, path, columns, group_by=None, exclude_dnp=False):
+        """Write a BOM of (label, field) columns, every cell quoted like kicad-cli does"""
+        def value(group, field):
+            if field == 'reference':
+                return shorthand([row.reference for row in group])
+            if field == 'quantity':
+                return str(len(group))
+            if field == 'dnp':
+                return 'DNP' if group[0].dnp else ''
+            return getattr(group[0], field)
+
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n')
+            writer.writerow([label for label, _ in columns])
+            for group in self.groups(group_by, exclude_dnp):
+                writer.writerow([value(group, field) for _, field in columns])
@@ -0,0 +1,178 @@
+"""
+Request compression for uploads
+
+BOM CSVs, position files, Gerbers and STEP files are plain text and shrink a
+lot, so when Dokuly advertises request encodings the multipart body is
+compressed on the fly as it is streamed, with a Content-Encoding header:
+files are read, framed and compressed chunk by chunk, so neither the body
+nor its compressed copy is ever held in memory whole. Payloads
+that are already compressed (ZIP, PDF, images, ...) are recognized by their
+leading bytes and sent as they are.
+"""
+
+import os
+import zlib
+import mimetypes
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip is always available
+    zstandard = None
+
+from .multipart import stream_form
+
+
+CHUNK_SIZE = 64 * 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Don't bother below this many compressible bytes
+MIN_COMPRESSIBLE_BYTES = 4 * 1024
+
+# Leading bytes of formats that don't compress any further
+COMPRESSED_SIGNATURES = (
+    b'PK\x03\x04',  # ZIP (also production and position archives)
+    b'PK\x05\x06',  # empty ZIP
+    b'%PDF',  # PDF streams are deflated already
+    b'\x1f\x8b',  # gzip
+    b'\x28\xb5\x2f\xfd',  # zstd
+    b'BZh',  # bzip2
+    b'\xfd7zXZ\x00',  # xz
+    b"7z\xbc\xaf\x27\x1c",  # 7-Zip
+    b'\x89PNG',
+    b'\xff\xd8\xff',  # JPEG
+    b'glTF',  # binary glTF
+)
+
+
+def supported_encodings():
+    """Encodings this plugin can produce, most preferred first"""
+    return ['zstd', 'gzip'] if zstandard is not None else ['gzip']
+
+
+def choose_encoding(server_encodings):
+    """The best encoding both sides support, or None"""
+    for encoding in supported_encodings():
+        if encoding in (server_encodings or []):
+            return encoding
+    return None
+
+
+def is_precompressed(data):
+    """True if `data` (the first bytes of a payload) starts like an already compressed format"""
+    return any(data.startswith(signature) for signature in COMPRESSED_SIGNATURES)
+
+
+def read_file_field(value):
+    """(filename, content, content_type) of one requests `files` value, rewinding file objects
+
+    File objects are left open for streaming, not read.
+    """
+    if isinstance(value, tuple):
+        filename, content = value[0], value[1]
+        content_type = value[2] if len(value) > 2 else None
+    else:
+        filename, content, content_type = getattr(value, 'name', None), value, None
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    if filename:
+        filename = filename.replace('\\', '/').rsplit('/', 1)[-1]
+    return filename, content, content_type
+
+
+def multipart_fields(data, files):
+    """The form fields requests would send for data/files, in the same order"""
+    fields = []
+    for name, value in (data or {}).items():
+        fields.append((name, str(value)))
+
+    items = files.items() if isinstance(files, dict) else (files or [])
+    for name, value in items:
+        filename, content, content_type = read_file_field(value)
+        if filename is None and not isinstance(value, tuple):
+            filename = name  # requests names anonymous file objects after their field
+        if filename is None:
+            fields.append((name, content))  # a plain field sent through `files`
+        else:
+            # The type urllib3 would pick for a file part without one
+            content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            fields.append((name, (filename, content, content_type)))
+    return fields
+
+
+class CompressionStats:
+    """Bytes in and out of one compressed request"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    @property
+    def ratio(self):
+        return self.compressed_bytes / self.raw_bytes if self.raw_bytes else 1.0
+
+
+def compressor_for(encoding):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip framing
+
+
+def compress_chunks(chunks, encoding, stats):
+    """Compress a stream of body chunks as they arrive, counting bytes in `stats`"""
+    compressor = compressor_for(encoding)
+    for chunk in chunks:
+        stats.raw_bytes += len(chunk)
+        out = compressor.compress(chunk)
+        if out:
+            stats.compressed_bytes += len(out)
+            yield out
+    out = compressor.flush()
+    stats.compressed_bytes += len(out)
+    yield out
+
+
+def content_head_and_size(content):
+    """(first bytes, size) of a part's content without reading a file object through"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    if not hasattr(content, 'read'):
+        return content[:16], len(content)
+    position = content.tell()
+    head = content.read(16)
+    try:
+        size = os.fstat(content.fileno()).st_size - position
+    except (AttributeError, OSError, ValueError):
+        content.seek(0, os.SEEK_END)
+        size = content.tell() - position
+    content.seek(position)
+    return head, size
+
+
+def compressible_bytes(fields):
+    """(bytes that would shrink, total payload bytes) of the given multipart fields"""
+    compressible, total = 0, 0
+    for name, value in fields:
+        head, size = content_head_and_size(value[1] if isinstance(value, tuple) else value)
+        total += size
+        if not is_precompressed(head):
+            compressible += size
+    return compressible, total
+
+
+def compress_multipart(data, files, encoding):
+    """Build a compressed multipart body for a requests call
+
+    Returns (body chunk generator, headers to add, stats), or None when the
+    payload is mostly already compressed and is better sent as it is.
+    """
+    fields = multipart_fields(data, files)
+    compressible, total = compressible_bytes(fields)
+    if compressible < MIN_COMPRESSIBLE_BYTES or compressible * 2 < total:
+        return None
+
+    body, content_type = stream_form(fields)
+    stats = CompressionStats(encoding)
+    headers = {'Content-Type': content_type, 'Content-Encoding': encoding}
+    return compress_chunks(body, encoding, stats), headers, stats
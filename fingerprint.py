@@ -0,0 +1,321 @@
+"""
+Project input scanning and fingerprinting
+
+Collects every file a KiCad project's outputs depend on (board, schematic
+hierarchy, project file, drawing sheet, theme and referenced 3D models) and
+fingerprints them so artifact freshness can be decided without re-exporting.
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+import uuid
+from contextlib import nullcontext
+
+
+# Input roles, used to fingerprint only the inputs an artifact depends on
+ROLE_BOARD = 'board'
+ROLE_SCHEMATIC = 'schematic'
+ROLE_PROJECT = 'project'
+ROLE_DRAWING_SHEET = 'drawing_sheet'
+ROLE_THEME = 'theme'
+ROLE_MODELS = 'models'
+
+ALL_ROLES = (ROLE_BOARD, ROLE_SCHEMATIC, ROLE_PROJECT,
+             ROLE_DRAWING_SHEET, ROLE_THEME, ROLE_MODELS)
+
+# KiCad 6+ stores the sub-sheet file as a property, older files as "Sheet file"
+SHEETFILE_RE = re.compile(r'\(property\s+"Sheet\s?file"\s+"((?:[^"\\]|\\.)*)"')
+MODEL_RE = re.compile(r'\(model\s+(?:"((?:[^"\\]|\\.)*)"|([^\s()]+))')
+VAR_RE = re.compile(r'\$\{([^}]+)\}|\$\(([^)]+)\)')
+
+# kicad-cli --subst-models swaps VRML models for a STEP model with the same stem
+SUBSTITUTE_MODEL_EXTENSIONS = ('.step', '.stp', '.STEP', '.STP')
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _unescape(value):
+    return value.replace('\\"', '"').replace('\\\\', '\\')
+
+
+def expand_kicad_vars(path, variables):
+    """Expand ${VAR} and $(VAR) references, leaving unknown variables untouched"""
+    def replace(match):
+        name = match.group(1) or match.group(2)
+        if name in variables:
+            return variables[name]
+        return match.group(0)
+
+    return VAR_RE.sub(replace, path)
+
+
+def board_key(pcb_file):
+    """Short name for a board file that differs for every absolute path"""
+    path = os.path.normcase(os.path.abspath(pcb_file))
+    digest = hashlib.sha256(path.encode('utf-8')).hexdigest()[:12]
+    return f"{os.path.splitext(os.path.basename(pcb_file))[0]}_{digest}"
+
+
+class ProjectInputs:
+    """The set of input files of a project, grouped by role"""
+
+    def __init__(self):
+        self.files = {}  # role -> sorted list of absolute paths
+        self.missing = {}  # role -> sorted list of referenced but missing paths
+
+    def add(self, role, path):
+        path = os.path.normpath(os.path.abspath(path))
+        target = self.files if os.path.isfile(path) else self.missing
+        paths = target.setdefault(role, [])
+        if path not in paths:
+            paths.append(path)
+            paths.sort()
+
+    def paths(self, roles=ALL_ROLES):
+        result = []
+        for role in roles:
+            result.extend(self.files.get(role, []))
+        return result
+
+    def count(self, roles=ALL_ROLES):
+        return len(self.paths(roles))
+
+    def missing_paths(self, roles=ALL_ROLES):
+        result = []
+        for role in roles:
+            result.extend(self.missing.get(role, []))
+        return result
+
+
+class ProjectInputScanner:
+    """Find every file the outputs of a KiCad project are built from"""
+
+    def __init__(self, pcb_file, schematic_file='', drawing_sheet_path=None,
+                 theme_path=None, variables=None):
+        self.pcb_file = pcb_file
+        self.schematic_file = schematic_file
+        self.drawing_sheet_path = drawing_sheet_path
+        self.theme_path = theme_path
+        self.project_dir = os.path.dirname(os.path.abspath(pcb_file)) if pcb_file else ''
+
+        # Path variables used in model and sheet references
+        self.variables = dict(os.environ)
+        if self.project_dir:
+            self.variables['KIPRJMOD'] = self.project_dir
+        if variables:
+            self.variables.update(variables)
+
+    def scan(self):
+        inputs = ProjectInputs()
+
+        if self.pcb_file:
+            inputs.add(ROLE_BOARD, self.pcb_file)
+            project_file = os.path.splitext(self.pcb_file)[0] + '.kicad_pro'
+            if os.path.exists(project_file):
+                inputs.add(ROLE_PROJECT, project_file)
+
+        if self.schematic_file:
+            for sheet in self.scan_schematic_hierarchy(self.schematic_file):
+                inputs.add(ROLE_SCHEMATIC, sheet)
+
+        if self.drawing_sheet_path:
+            inputs.add(ROLE_DRAWING_SHEET, self.drawing_sheet_path)
+        if self.theme_path:
+            inputs.add(ROLE_THEME, self.theme_path)
+
+        if self.pcb_file and os.path.isfile(self.pcb_file):
+            for model in self.scan_board_models(self.pcb_file):
+                inputs.add(ROLE_MODELS, model)
+
+        return inputs
+
+    def resolve_path(self, path, base_dir):
+        path = expand_kicad_vars(path, self.variables)
+        if not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        return os.path.normpath(path)
+
+    def scan_schematic_hierarchy(self, root_schematic):
+        """Return the root schematic and all sub-sheets it references, recursively"""
+        found = []
+        pending = [os.path.normpath(os.path.abspath(root_schematic))]
+
+        while pending:
+            sheet = pending.pop()
+            if sheet in found:
+                continue
+            found.append(sheet)
+
+            try:
+                with open(sheet, 'r', encoding='utf-8', errors='replace') as f:
+                    content = f.read()
+            except OSError:
+                continue
+
+            sheet_dir = os.path.dirname(sheet)
+            for match in SHEETFILE_RE.finditer(content):
+                pending.append(self.resolve_path(_unescape(match.group(1)), sheet_dir))
+
+        return found
+
+    def scan_board_models(self, pcb_file):
+        """Return the 3D model files referenced by the footprints of a board"""
+        models = []
+        with open(pcb_file, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+
+        for match in MODEL_RE.finditer(content):
+            raw = _unescape(match.group(1) if match.group(1) is not None else match.group(2))
+            path = self.resolve_path(raw, self.project_dir)
+            if path not in models:
+                models.append(path)
+
+            # Track the STEP model kicad-cli substitutes for a VRML reference
+            stem, ext = os.path.splitext(path)
+            if ext.lower() == '.wrl':
+                for substitute_ext in SUBSTITUTE_MODEL_EXTENSIONS:
+                    substitute = stem + substitute_ext
+                    if os.path.isfile(substitute) and substitute not in models:
+                        models.append(substitute)
+                        break
+
+        return models
+
+
+class FileFingerprinter:
+    """Stat-first, hash-second file fingerprints with a persistent hash cache"""
+
+    def __init__(self, cache_file=None, tracer=None):
+        self.cache_file = cache_file
+        self.tracer = tracer
+        self.entries = {}  # path -> [size, mtime_ns, sha256]
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        if not self.cache_file or not self.dirty:
+            return
+        with self.lock:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = f"{self.cache_file}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_file, self.cache_file)
+            self.dirty = False
+
+    def file_hash(self, path):
+        """Return the content hash of a file, or None if it does not exist"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+
+        span = self.tracer.span(f"hash {os.path.basename(path)}", 'hash',
+                                path=path, bytes=stat.st_size) if self.tracer else nullcontext()
+        with span:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            file_hash = digest.hexdigest()
+
+        with self.lock:
+            self.entries[path] = [stat.st_size, stat.st_mtime_ns, file_hash]
+            self.dirty = True
+        return file_hash
+
+    def fingerprint(self, inputs, roles=ALL_ROLES, extra=None):
+        """Combine the hashes of the inputs with the given roles into one digest
+
+        `extra` holds anything else the artifact depends on, such as export options.
+        """
+        digest = hashlib.sha256()
+        for role in roles:
+            for path in inputs.files.get(role, []):
+                digest.update(f"{role}\0{path}\0{self.file_hash(path)}\n".encode('utf-8'))
+            for path in inputs.missing.get(role, []):
+                digest.update(f"{role}\0{path}\0missing\n".encode('utf-8'))
+        if extra is not None:
+            digest.update(json.dumps(extra, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+
+class ArtifactStamps:
+    """Records which input fingerprint produced each artifact"""
+
+    def __init__(self, stamp_file=None):
+        self.stamp_file = stamp_file
+        self.stamps = {}
+        self.lock = threading.Lock()
+        if stamp_file and os.path.exists(stamp_file):
+            try:
+                with open(stamp_file, 'r', encoding='utf-8') as f:
+                    self.stamps = json.load(f)
+            except (OSError, ValueError):
+                self.stamps = {}
+
+    def record(self, name, fingerprint, outputs):
+        """Remember that `outputs` were built from inputs with `fingerprint`"""
+        files = {}
+        for path in outputs:
+            stat = os.stat(path)
+            files[path] = [stat.st_size, stat.st_mtime_ns]
+        with self.lock:
+            self.stamps[name] = {'fingerprint': fingerprint, 'outputs': files}
+        self.save()
+
+    def invalidate(self, name=None):
+        with self.lock:
+            if name is None:
+                self.stamps = {}
+            else:
+                self.stamps.pop(name, None)
+        self.save()
+
+    def is_fresh(self, name, fingerprint):
+        """True if the artifact was built from `fingerprint` and its outputs are untouched"""
+        with self.lock:
+            stamp = self.stamps.get(name)
+        if not stamp or stamp.get('fingerprint') != fingerprint:
+            return False
+        for path, (size, mtime_ns) in stamp.get('outputs', {}).items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return False
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                return False
+        return True
+
+    def outputs(self, name):
+        with self.lock:
+            stamp = self.stamps.get(name)
+        return list(stamp['outputs']) if stamp else []
+
+    def save(self):
+        if not self.stamp_file:
+            return
+        with self.lock:
+            os.makedirs(os.path.dirname(self.stamp_file), exist_ok=True)
+            tmp_file = f"{self.stamp_file}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.stamps, f)
+            os.replace(tmp_file, self.stamp_file)
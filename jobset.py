@@ -0,0 +1,241 @@
+"""
+kicad-cli jobsets
+
+KiCad 9 can run a jobset, a JSON file listing many exports, from a single
+kicad-cli process that loads the board and schematic once. The exports of a
+push are described as the kicad-cli commands the plugin would otherwise run
+one by one. Each command that has a job equivalent is translated into a job
+writing to its own folder; after the run, a command whose output the jobset
+produced is answered from there instead of starting kicad-cli again.
+Commands without an equivalent, and any job that produced nothing, still run
+on their own.
+"""
+
+import os
+import json
+import uuid
+import shutil
+
+
+# Options that take a value (shared with the fake kicad-cli used by the benchmarks)
+VALUE_OPTIONS = {
+    '-o', '--output', '-l', '--layers', '--format', '--side', '--units',
+    '--fields', '--labels', '--field-delimiter', '--string-delimiter',
+    '--group-by', '--sort-field', '--drawing-sheet', '-t', '--theme',
+    '-D', '--define-var', '--min-distance', '--max-distance',
+}
+
+# --define-var values that change between runs without changing the output
+VOLATILE_VARIABLES = ('STEP_VERSION',)
+
+JOB_FOLDER_OUTPUT = 'folder'
+
+
+def parse_command(command):
+    """(words, {option: [values]}, flags) of a kicad-cli command, without the executable"""
+    words, options, flags = [], {}, set()
+    args = command[1:]
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in VALUE_OPTIONS and i + 1 < len(args):
+            options.setdefault(arg, []).append(args[i + 1])
+            i += 2
+            continue
+        if arg.startswith('-'):
+            flags.add(arg)
+        else:
+            words.append(arg)
+        i += 1
+    return words, options, flags
+
+
+def command_key(command):
+    """What a command produces, independent of where it writes it; None if it has no --output"""
+    if '--output' not in command:
+        return None
+    key = []
+    args = command[1:]
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('--output', '-o'):
+            i += 2
+            continue
+        if arg in ('--define-var', '-D') and i + 1 < len(args):
+            name, _, value = args[i + 1].partition('=')
+            key += [arg, name if name in VOLATILE_VARIABLES else args[i + 1]]
+            i += 2
+            continue
+        key.append(arg)
+        i += 1
+    return json.dumps(key)
+
+
+def split_list(value):
+    return [item for item in value.split(',') if item] if value else []
+
+
+def job_settings(words, options, flags):
+    """(job type, settings) for a parsed export command, or None if it has no job equivalent"""
+    def value(name, default=None):
+        return options[name][-1] if name in options else default
+
+    domain, action, kind = (words + ['', '', ''])[:3]
+    if action != 'export':
+        return None
+    known_flags = set()
+    settings = {}
+
+    if domain == 'pcb' and kind in ('gerbers', 'gerber'):
+        job_type = 'pcb_export_gerbers'
+        layers = split_list(value('--layers'))
+        settings.update(layers=layers, use_board_plot_params=not layers,
+                        use_x2_format='--no-x2' not in flags,
+                        use_protel_file_extension='--no-protel-ext' not in flags)
+        known_flags = {'--no-x2', '--no-protel-ext'}
+        known_options = {'--layers'}
+    elif domain == 'pcb' and kind == 'drill':
+        job_type = 'pcb_export_drill'
+        settings.update(format=value('--format', 'excellon'),
+                        excellon_separate_th='--excellon-separate-th' in flags)
+        known_flags = {'--excellon-separate-th'}
+        known_options = {'--format'}
+    elif domain == 'pcb' and kind == 'pos':
+        job_type = 'pcb_export_pos'
+        settings.update(format=value('--format', 'ascii'), side=value('--side', 'both'),
+                        units=value('--units', 'in'),
+                        use_drill_file_origin='--use-drill-file-origin' in flags,
+                        smd_only='--smd-only' in flags, exclude_dnp='--exclude-dnp' in flags)
+        known_flags = {'--use-drill-file-origin', '--smd-only', '--exclude-dnp'}
+        known_options = {'--format', '--side', '--units'}
+    elif domain == 'pcb' and kind == 'pdf':
+        job_type = 'pcb_export_pdf'
+        settings.update(layers=split_list(value('--layers')),
+                        drawing_sheet=value('--drawing-sheet', ''),
+                        color_theme=value('--theme', ''), mirror='--mirror' in flags,
+                        plot_drawing_sheet='--include-border-title' in flags)
+        known_flags = {'--mirror', '--include-border-title'}
+        known_options = {'--layers', '--drawing-sheet', '--theme'}
+    elif domain == 'pcb' and kind in ('step', 'stpz', 'glb'):
+        job_type = 'pcb_export_3d'
+        settings.update(format=kind, subst_models='--subst-models' in flags,
+                        board_only='--board-only' in flags, no_dnp='--no-dnp' in flags,
+                        no_unspecified='--no-unspecified' in flags)
+        if '--min-distance' in options:
+            settings['min_distance'] = float(value('--min-distance'))
+        if '--max-distance' in options:
+            settings['max_distance'] = float(value('--max-distance'))
+        known_flags = {'--subst-models', '--board-only', '--no-dnp', '--no-unspecified'}
+        known_options = {'--min-distance', '--max-distance', '--define-var', '-D'}
+    elif domain == 'sch' and kind == 'pdf':
+        job_type = 'sch_export_pdf'
+        settings.update(drawing_sheet=value('--drawing-sheet', ''), color_theme=value('--theme', ''))
+        known_options = {'--drawing-sheet', '--theme'}
+    elif domain == 'sch' and kind == 'bom':
+        job_type = 'sch_export_bom'
+        settings.update(fields_ordered=split_list(value('--fields')),
+                        fields_labels=split_list(value('--labels')),
+                        group_by=split_list(value('--group-by')),
+                        field_delimiter=value('--field-delimiter', ','),
+                        string_delimiter=value('--string-delimiter', '"'),
+                        exclude_dnp='--exclude-dnp' in flags)
+        known_flags = {'--exclude-dnp'}
+        known_options = {'--fields', '--labels', '--group-by', '--field-delimiter', '--string-delimiter'}
+    else:
+        return None
+
+    # Anything the translation doesn't cover runs as a command, so the output can't differ
+    if flags - known_flags or set(options) - known_options - {'--output', '-o'}:
+        return None
+    return job_type, settings
+
+
+class Jobset:
+    """Exports collected into one jobset file"""
+
+    def __init__(self, work_dir, name='push'):
+        self.work_dir = work_dir
+        self.name = name
+        self.output_dir = os.path.join(work_dir, 'outputs')
+        self.jobs = []  # (key, job folder, output name, job)
+        self.variables = {}  # --define-var values, passed to kicad-cli's environment
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def add(self, command):
+        """Add the job equivalent of a command; returns False if there is none"""
+        key = command_key(command)
+        if key is None or any(existing == key for existing, _, _, _ in self.jobs):
+            return False
+        words, options, flags = parse_command(command)
+        translated = job_settings(words, options, flags)
+        if translated is None:
+            return False
+        job_type, settings = translated
+
+        output = options.get('--output', options.get('-o'))[-1]
+        folder = f"job_{len(self.jobs):02d}"
+        # File outputs keep their name, folder outputs (gerbers, drill) fill the job folder
+        name = os.path.basename(output.rstrip('/\\')) if os.path.splitext(output)[1] else ''
+        settings['output_filename'] = f"{folder}/{name}" if name else f"{folder}/"
+        for definition in options.get('--define-var', []) + options.get('-D', []):
+            variable, _, variable_value = definition.partition('=')
+            self.variables[variable] = variable_value
+
+        job = {'id': str(uuid.uuid4()), 'type': job_type, 'description': ' '.join(words),
+               'settings': settings}
+        self.jobs.append((key, folder, name, job))
+        return True
+
+    def write(self):
+        """Write the jobset file; returns (its path, the id of its folder output)"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        output_id = str(uuid.uuid4())
+        data = {
+            'meta': {'version': 1},
+            'jobs': [job for _, _, _, job in self.jobs],
+            'outputs': [{
+                'id': output_id,
+                'type': JOB_FOLDER_OUTPUT,
+                'description': f"Dokuly {self.name}",
+                'only': [],
+                'settings': {'output_path': self.output_dir},
+            }],
+        }
+        path = os.path.join(self.work_dir, f"{self.name}.kicad_jobset")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        return path, output_id
+
+    def collect(self):
+        """{command key: produced file or folder} for the jobs that produced something"""
+        results = {}
+        for key, folder, name, _ in self.jobs:
+            produced = os.path.join(self.output_dir, folder, name) if name else None
+            if produced and os.path.isfile(produced) and os.path.getsize(produced) > 0:
+                results[key] = produced
+                continue
+            folder_path = os.path.join(self.output_dir, folder)
+            if os.path.isdir(folder_path) and os.listdir(folder_path):
+                results[key] = folder_path
+        return results
+
+
+def place_output(produced, requested):
+    """Copy a jobset output to where the equivalent command would have written it"""
+    if os.path.isfile(produced):
+        os.makedirs(os.path.dirname(os.path.abspath(requested)), exist_ok=True)
+        shutil.copyfile(produced, requested)
+        return
+    files = sorted(name for name in os.listdir(produced)
+                   if os.path.isfile(os.path.join(produced, name)))
+    if os.path.splitext(requested)[1] and len(files) == 1:
+        # A single-layer export to a file name
+        os.makedirs(os.path.dirname(os.path.abspath(requested)), exist_ok=True)
+        shutil.copyfile(os.path.join(produced, files[0]), requested)
+        return
+    os.makedirs(requested, exist_ok=True)
+    for name in files:
+        shutil.copyfile(os.path.join(produced, name), os.path.join(requested, name))
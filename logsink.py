@@ -0,0 +1,129 @@
+"""
+Bounded, batched log sink
+
+Messages are collected in memory by any thread and handed to the UI in
+batches at a fixed frame rate, instead of appending to the output TextCtrl
+once per message. Only the most recent lines are kept, so the output control
+stays small during long batch runs, and everything can optionally be
+mirrored to a rotating log file.
+"""
+
+import os
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+
+MAX_LINES = 5000  # lines kept in the ring buffer and shown in the window
+FLUSH_INTERVAL_MS = 50  # UI flushes at most 20 times per second
+LOG_FILE_MAX_BYTES = 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 3
+
+# One logger for every sink, and one handler per log file however many sinks
+# write to it: two handlers rotating the same file lose or duplicate lines
+LOGGER = logging.getLogger('kicad_to_dokuly.output')
+LOGGER.propagate = False
+LOGGER.setLevel(logging.INFO)
+
+FILE_HANDLERS = {}  # log file path -> [handler, number of sinks writing to it]
+FILE_HANDLERS_LOCK = threading.Lock()
+
+
+def acquire_file_handler(path, max_bytes=LOG_FILE_MAX_BYTES, backup_count=LOG_FILE_BACKUP_COUNT):
+    """Register a sink writing to a log file, creating its handler on first use; returns the key"""
+    path = os.path.normcase(os.path.abspath(path))
+    with FILE_HANDLERS_LOCK:
+        entry = FILE_HANDLERS.get(path)
+        if entry is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            handler.addFilter(lambda record: getattr(record, 'log_path', None) == path)
+            LOGGER.addHandler(handler)
+            entry = FILE_HANDLERS[path] = [handler, 0]
+        entry[1] += 1
+    return path
+
+
+def release_file_handler(path):
+    """Unregister a sink from a log file, closing the handler after the last one"""
+    with FILE_HANDLERS_LOCK:
+        entry = FILE_HANDLERS.get(path)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del FILE_HANDLERS[path]
+    LOGGER.removeHandler(entry[0])
+    entry[0].close()
+
+
+class LogSink:
+    """Thread-safe message buffer with a bounded history and an optional log file"""
+
+    def __init__(self, max_lines=MAX_LINES):
+        self.max_lines = max_lines
+        self.lines = deque(maxlen=max_lines)  # complete lines, newest last
+        self.partial = ''  # text after the last newline
+        self.pending = []  # text not yet shown in the UI
+        self.pending_lines = 0
+        self.replace = False  # the UI fell behind: show the history instead of pending
+        self.lock = threading.Lock()
+        self.log_path = None  # key of the shared log file handler
+
+    def write(self, message):
+        with self.lock:
+            text = self.partial + message
+            parts = text.split('\n')
+            self.partial = parts.pop()
+            self.lines.extend(parts)
+
+            if not self.replace:
+                self.pending.append(message)
+                self.pending_lines += message.count('\n')
+                # Keep the pending text bounded too if the UI is not draining it; the
+                # next drain hands over the retained history instead
+                if self.pending_lines > self.max_lines:
+                    self.pending = []
+                    self.pending_lines = 0
+                    self.replace = True
+
+        log_path = self.log_path
+        if log_path is not None:
+            for line in message.splitlines():
+                if line.strip():
+                    LOGGER.info(line, extra={'log_path': log_path})
+
+    def drain(self):
+        """Return and clear (the text not shown yet, whether it replaces the shown text)"""
+        with self.lock:
+            if self.replace:
+                self.replace = False
+                return self.tail_text_locked(), True
+            if not self.pending:
+                return '', False
+            text = ''.join(self.pending)
+            self.pending = []
+            self.pending_lines = 0
+            return text, False
+
+    def tail_text_locked(self):
+        return '\n'.join(self.lines) + ('\n' if self.lines else '') + self.partial
+
+    def tail_text(self):
+        """The retained history, for rebuilding a trimmed output control"""
+        with self.lock:
+            return self.tail_text_locked()
+
+    def open_file(self, path, max_bytes=LOG_FILE_MAX_BYTES, backup_count=LOG_FILE_BACKUP_COUNT):
+        """Also write every message to a rotating log file"""
+        self.close_file()
+        self.log_path = acquire_file_handler(path, max_bytes, backup_count)
+
+    def close_file(self):
+        log_path, self.log_path = self.log_path, None
+        if log_path is not None:
+            release_file_handler(log_path)
@@ -0,0 +1,68 @@
+"""
+Persistent lookup cache
+
+A small JSON-backed key/value store with a time-to-live, used to remember
+server lookups that practically never change, such as the mapping from a
+PCBA part number and revision to its Dokuly ID.
+"""
+
+import os
+import json
+import time
+import threading
+import uuid
+
+
+class LookupCache:
+    """Key/value entries that expire after `ttl_seconds`, persisted to a JSON file"""
+
+    def __init__(self, path, ttl_seconds):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+        if not entry:
+            return None
+        if self.ttl_seconds and time.time() - entry['stored_at'] > self.ttl_seconds:
+            self.invalidate(key)
+            return None
+        return entry['value']
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = {'value': value, 'stored_at': time.time()}
+        self.save()
+
+    def invalidate(self, key=None):
+        """Forget one entry, or everything if no key is given"""
+        with self.lock:
+            if key is None:
+                self.entries = {}
+            else:
+                self.entries.pop(key, None)
+        self.save()
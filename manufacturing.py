@@ -0,0 +1,43 @@
+"""
+Manufacturing data packages
+
+IPC-2581 and ODB++ carry a board's fabrication and assembly data (copper,
+drill, placement and BOM) in a single file that one kicad-cli run produces
+(KiCad 9+). For partners that accept them, a package replaces the Gerbers,
+drill files and position files of the production ZIP.
+"""
+
+
+class PackageFormat:
+    """One manufacturing data format kicad-cli can export"""
+
+    def __init__(self, name, export, options, suffix, extension, label):
+        self.name = name
+        self.export = export  # kicad-cli 'pcb export' subcommand
+        self.options = options
+        self.suffix = suffix  # appended to the file name, distinguishes the uploads
+        self.extension = extension
+        self.label = label
+
+    def filename(self, base_name):
+        return f"{base_name}{self.suffix}{self.extension}"
+
+    def cache_key(self):
+        """Export settings that make a cached package stale when they change"""
+        return {'package': self.name, 'export': self.export, 'options': self.options}
+
+
+PACKAGE_FORMATS = {
+    'ipc2581': PackageFormat(
+        'ipc2581', 'ipc2581',
+        ['--compress', '--units', 'mm', '--bom-col-mfg-pn', 'MPN'],
+        '_IPC2581', '.zip', 'IPC-2581 package'),
+    'odb': PackageFormat(
+        'odb', 'odb', ['--compression', 'zip', '--units', 'mm'],
+        '_ODB', '.zip', 'ODB++ package'),
+}
+
+
+def format_key(name):
+    """PACKAGE_FORMATS key of a format name as users write it, e.g. 'ODB++' or 'IPC-2581'"""
+    return name.replace('++', '').replace('-', '')
@@ -0,0 +1,272 @@
+"""
+Local mirror of 3D models
+
+kicad-cli spends most of a STEP export loading the footprints' 3D models,
+which often live on a network share. The models a board references through
+path variables (${KICAD9_3DMODEL_DIR}/...) are mirrored into a local folder,
+each stored once under its content hash, and the export is pointed at the
+mirror by overriding those variables. A source file is only read again when
+its size or modification time changes. Objects no longer referenced are
+pruned after each sync, and the least recently used ones beyond a size cap.
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import uuid
+
+from .fingerprint import MODEL_RE, SUBSTITUTE_MODEL_EXTENSIONS, _unescape, expand_kicad_vars
+
+
+# Variables that already point at local project files
+LOCAL_VARIABLES = ('KIPRJMOD',)
+
+VARIABLE_PATH_RE = re.compile(r'^(?:\$\{([^}]+)\}|\$\(([^)]+)\))[/\\]+(.+)$')
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def model_references(pcb_file):
+    """(variable, relative path) of each 3D model a board references through a path variable"""
+    with open(pcb_file, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+
+    references = []
+    for match in MODEL_RE.finditer(content):
+        raw = _unescape(match.group(1) if match.group(1) is not None else match.group(2))
+        path_match = VARIABLE_PATH_RE.match(raw)
+        if not path_match:
+            continue  # absolute or project-relative, nothing to redirect
+        variable = path_match.group(1) or path_match.group(2)
+        if variable in LOCAL_VARIABLES:
+            continue
+        reference = (variable, path_match.group(3).replace('\\', '/'))
+        if reference not in references:
+            references.append(reference)
+    return references
+
+
+class MirrorStats:
+    """What one sync of the mirror did"""
+
+    def __init__(self):
+        self.files = 0
+        self.copied = 0
+        self.bytes_copied = 0
+        self.missing = 0
+        self.skipped_variables = []
+        self.used = set()  # hashes of the objects this sync placed
+        self.pruned = 0
+        self.bytes_pruned = 0
+
+
+class ModelMirror:
+    """Content-addressed local copies of 3D models, laid out per path variable"""
+
+    def __init__(self, root, variables=None, max_bytes=0):
+        self.root = root
+        self.max_bytes = max_bytes  # cap on the object store, 0 for none
+        self.objects_dir = os.path.join(root, 'objects')
+        self.views_dir = os.path.join(root, 'views')
+        self.index_path = os.path.join(root, 'index.json')
+        self.variables = dict(os.environ)
+        if variables:
+            self.variables.update(variables)
+        # 'sources': source path -> [size, mtime_ns, hash]; 'views': view path -> hash
+        self.index = {'sources': {}, 'views': {}}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self.index = {'sources': index.get('sources', {}), 'views': index.get('views', {})}
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def variable_dir(self, variable):
+        """The directory a path variable points at, or None if it is unset or missing"""
+        value = self.variables.get(variable)
+        if not value:
+            return None
+        path = os.path.normpath(expand_kicad_vars(value, self.variables))
+        return path if os.path.isdir(path) else None
+
+    def view_dir(self, variable):
+        return os.path.join(self.views_dir, variable)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def store(self, source):
+        """Copy source into the object store, hashing it on the way; returns (hash, copied)"""
+        stat = os.stat(source)
+        known = self.index['sources'].get(source)
+        if (known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns
+                and os.path.exists(self.object_path(known[2]))):
+            # The object's modification time records when it was last used
+            os.utime(self.object_path(known[2]))
+            return known[2], False
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        tmp_path = os.path.join(self.objects_dir, f".{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        try:
+            with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+                while True:
+                    chunk = src.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    dst.write(chunk)
+            object_path = self.object_path(digest.hexdigest())
+            if os.path.exists(object_path):
+                os.remove(tmp_path)  # same contents under another name
+                os.utime(object_path)
+            else:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.replace(tmp_path, object_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.index['sources'][source] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest(), True
+
+    def place(self, digest, view_path):
+        """Make view_path show the object with `digest`, linking where possible"""
+        if self.index['views'].get(view_path) == digest and os.path.exists(view_path):
+            return
+        os.makedirs(os.path.dirname(view_path), exist_ok=True)
+        tmp_path = f"{view_path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            try:
+                os.link(self.object_path(digest), tmp_path)
+            except OSError:
+                shutil.copyfile(self.object_path(digest), tmp_path)
+            os.replace(tmp_path, view_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.index['views'][view_path] = digest
+
+    def mirror_file(self, source, view_path, stats):
+        digest, copied = self.store(source)
+        self.place(digest, view_path)
+        stats.used.add(digest)
+        stats.files += 1
+        if copied:
+            stats.copied += 1
+            stats.bytes_copied += os.path.getsize(source)
+
+    def sync(self, references, only_remote=False):
+        """Mirror the referenced models; returns ({variable: mirror dir}, stats)
+
+        A variable is only redirected when every model referenced through it
+        is in the mirror. With only_remote, variables whose directory is on
+        the same filesystem as the mirror are left alone.
+        """
+        stats = MirrorStats()
+        by_variable = {}
+        for variable, relative in references:
+            by_variable.setdefault(variable, []).append(relative)
+
+        os.makedirs(self.root, exist_ok=True)
+        mirror_device = os.stat(self.root).st_dev
+        overrides = {}
+        for variable, relatives in sorted(by_variable.items()):
+            source_dir = self.variable_dir(variable)
+            if source_dir is None or (only_remote and os.stat(source_dir).st_dev == mirror_device):
+                stats.skipped_variables.append(variable)
+                continue
+            complete = True
+            for relative in relatives:
+                source = os.path.normpath(os.path.join(source_dir, relative))
+                view_path = os.path.normpath(os.path.join(self.view_dir(variable), relative))
+                try:
+                    if not os.path.isfile(source):
+                        stats.missing += 1  # missing in the original location as well
+                        continue
+                    self.mirror_file(source, view_path, stats)
+
+                    # The STEP model kicad-cli substitutes for a VRML reference
+                    stem, ext = os.path.splitext(relative)
+                    if ext.lower() == '.wrl':
+                        for substitute_ext in SUBSTITUTE_MODEL_EXTENSIONS:
+                            substitute = os.path.normpath(os.path.join(source_dir, stem + substitute_ext))
+                            if os.path.isfile(substitute):
+                                self.mirror_file(substitute, os.path.normpath(
+                                    os.path.join(self.view_dir(variable), stem + substitute_ext)), stats)
+                                break
+                except OSError:
+                    complete = False
+            if complete:
+                overrides[variable] = self.view_dir(variable)
+            else:
+                stats.skipped_variables.append(variable)
+
+        stats.pruned, stats.bytes_pruned = self.prune(stats.used)
+        self.save()
+        return overrides, stats
+
+    def prune(self, keep=()):
+        """Remove the objects nothing references, then the least recently used ones over the size cap
+
+        Objects in `keep` are never removed. Returns (objects removed, bytes freed).
+        """
+        referenced = set(self.index['views'].values())
+        referenced.update(known[2] for known in self.index['sources'].values())
+        objects = []
+        for root, dirs, files in os.walk(self.objects_dir):
+            for file in files:
+                if file.startswith('.'):
+                    continue  # a copy in progress
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                objects.append((stat.st_mtime, stat.st_size, file, path))
+
+        total = sum(size for mtime, size, digest, path in objects)
+        removed, freed = set(), 0
+        for mtime, size, digest, path in sorted(objects):
+            over_cap = self.max_bytes and total > self.max_bytes and digest not in keep
+            if digest in referenced and not over_cap:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed.add(digest)
+            freed += size
+            total -= size
+
+        if removed:
+            self.forget(removed)
+        return len(removed), freed
+
+    def forget(self, digests):
+        """Drop the index entries and views of removed objects"""
+        for view_path, digest in list(self.index['views'].items()):
+            if digest in digests:
+                # Views are usually hardlinks: the object's space is only freed with them
+                try:
+                    os.remove(view_path)
+                except OSError:
+                    pass
+                del self.index['views'][view_path]
+        for source, known in list(self.index['sources'].items()):
+            if known[2] in digests:
+                del self.index['sources'][source]
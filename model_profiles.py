@@ -0,0 +1,66 @@
+"""
+3D model export profiles
+
+The full STEP export substitutes every component model and can take minutes.
+For a quick mechanical check a lighter export is often enough, so each push
+exports a configurable list of profiles. Each profile has its own file name
+suffix (which is also its upload label) and its own artifact cache entry.
+"""
+
+from .step_metadata import content_type_for
+
+
+GLB_CONTENT_TYPE = 'model/gltf-binary'
+
+
+class ModelProfile:
+    """One way of exporting the board in 3D"""
+
+    def __init__(self, name, export, option_sets, suffix, label, timeout, extension=None):
+        self.name = name
+        self.export = export  # kicad-cli 'pcb export' subcommand
+        self.option_sets = option_sets  # tried in order, most specific first
+        self.suffix = suffix  # appended to the file name, distinguishes the uploads
+        self.label = label
+        self.timeout = timeout
+        self.extension = extension  # None: .step or .stpZ, following STEP_FORMAT
+
+    @property
+    def is_step(self):
+        return self.export == 'step'
+
+    def filename(self, base_name, step_extension):
+        return f"{base_name}{self.suffix}{self.extension or step_extension}"
+
+    def cache_key(self, step_extension):
+        """Export settings that make a cached file of this profile stale when they change"""
+        return {'profile': self.name, 'export': self.export,
+                'options': self.option_sets, 'extension': self.extension or step_extension}
+
+
+PROFILES = {
+    'full': ModelProfile(
+        'full', 'step',
+        [['--subst-models', '--min-distance', '0.1', '--max-distance', '2.0'],
+         ['--subst-models'],
+         []],
+        '', 'STEP file', 120),
+    'fast': ModelProfile(
+        'fast', 'step', [['--no-dnp', '--no-unspecified']],
+        '_fast', 'fast STEP preview without DNP parts', 60),
+    'board': ModelProfile(
+        'board', 'step', [['--board-only']],
+        '_board', 'bare board STEP', 30),
+    'glb': ModelProfile(
+        'glb', 'glb', [['--no-dnp', '--no-unspecified'], []],
+        '_preview', 'GLB mesh preview', 60, extension='.glb'),
+}
+
+DEFAULT_PROFILES = ('full',)
+
+
+def model_content_type(path):
+    """Upload content type of an exported 3D model"""
+    if path.lower().endswith('.glb'):
+        return GLB_CONTENT_TYPE
+    return content_type_for(path)
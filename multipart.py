@@ -0,0 +1,67 @@
+"""
+Streamed multipart/form-data bodies
+
+For uploads whose file content is produced on the fly (such as a ZIP package
+being built) or read from disk while being compressed, the multipart body is
+yielded piece by piece so requests can send it with chunked transfer
+encoding, without the content ever being held in memory or written to a
+temporary file first.
+"""
+
+import uuid
+
+
+READ_SIZE = 64 * 1024
+
+
+def part_header(boundary, name, filename=None, content_type=None):
+    disposition = f'form-data; name="{name}"'
+    if filename is not None:
+        disposition += f'; filename="{filename}"'
+    header = f"--{boundary}\r\nContent-Disposition: {disposition}\r\n"
+    if content_type:
+        header += f"Content-Type: {content_type}\r\n"
+    return (header + "\r\n").encode('utf-8')
+
+
+def content_chunks(content):
+    """Chunks of a part's content: bytes, text, an open binary file or an iterable of chunks"""
+    if isinstance(content, str):
+        yield content.encode('utf-8')
+    elif isinstance(content, (bytes, bytearray, memoryview)):
+        yield bytes(content)
+    elif hasattr(content, 'read'):
+        for block in iter(lambda: content.read(READ_SIZE), b''):
+            yield block
+    else:
+        for chunk in content:
+            if chunk:
+                yield chunk
+
+
+def stream_form(fields):
+    """Return (body chunk generator, Content-Type header) for (name, value) fields
+
+    A value is either plain content or a (filename, content, content_type) file
+    part; file contents are read only as the body is consumed.
+    """
+    boundary = uuid.uuid4().hex
+
+    def body():
+        for name, value in fields:
+            if isinstance(value, tuple):
+                filename, content, content_type = value
+                yield part_header(boundary, name, filename, content_type)
+            else:
+                content = value
+                yield part_header(boundary, name)
+            yield from content_chunks(content)
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode('utf-8')
+
+    return body(), f"multipart/form-data; boundary={boundary}"
+
+
+def stream_multipart(fields, file_field, filename, chunks, content_type='application/octet-stream'):
+    """Return (body chunk generator, Content-Type header) for plain fields plus one streamed file"""
+    return stream_form(list(fields) + [(file_field, (filename, chunks, content_type))])
@@ -0,0 +1,283 @@
+"""
+Component placement
+
+The board's placement is exported once, as a single CSV holding both sides in
+millimetres relative to the page origin with nothing filtered out. Every
+position file is transcoded from it in-process: the Dokuly .pos pair, the
+production CSVs and the pick-and-place layouts of assembly houses, so another
+layout never costs another kicad-cli run. What the CSV lacks, the footprint
+attributes (SMD, DNP) and the drill/place file origin, is read from the board
+file.
+"""
+
+import os
+import re
+import csv
+import fnmatch
+from datetime import datetime
+
+from .fingerprint import _unescape
+
+
+MM_PER_INCH = 25.4
+
+AUX_ORIGIN_RE = re.compile(r'\(aux_axis_origin\s+(-?[\d.]+)\s+(-?[\d.]+)\s*\)')
+FOOTPRINT_RE = re.compile(r'\((?:footprint|module)\s')
+TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[()]')
+# KiCad 8+ stores the reference as a property, older files as fp_text
+REFERENCE_RE = re.compile(
+    r'\(property\s+"Reference"\s+"((?:[^"\\]|\\.)*)"'
+    r'|\(fp_text\s+reference\s+(?:"((?:[^"\\]|\\.)*)"|([^\s()]+))')
+ATTR_RE = re.compile(r'\(attr((?:\s+[^\s()]+)*)\s*\)')
+DNP_RE = re.compile(r'\(dnp(?:\s+yes)?\s*\)')
+
+SIDES = ('top', 'bottom')
+
+
+def block_end(content, start):
+    """Offset just past the s-expression opening at `start`"""
+    depth = 0
+    for match in TOKEN_RE.finditer(content, start):
+        token = match.group(0)
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return len(content)
+
+
+def read_board_info(pcb_file):
+    """({reference: footprint attributes}, drill/place file origin in mm) of a board file"""
+    with open(pcb_file, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+
+    attributes = {}
+    position = 0
+    while True:
+        match = FOOTPRINT_RE.search(content, position)
+        if not match:
+            break
+        end = block_end(content, match.start())
+        block = content[match.start():end]
+        position = end
+
+        reference = REFERENCE_RE.search(block)
+        if not reference:
+            continue
+        name = _unescape(next(group for group in reference.groups() if group is not None))
+        attr = ATTR_RE.search(block)
+        words = set(attr.group(1).split()) if attr else set()
+        if DNP_RE.search(block):
+            words.add('dnp')
+        attributes[name] = frozenset(words)
+
+    origin = AUX_ORIGIN_RE.search(content)
+    return attributes, (float(origin.group(1)), float(origin.group(2))) if origin else (0.0, 0.0)
+
+
+class Component:
+    """One placed footprint, coordinates in mm with Y pointing up as kicad-cli writes them"""
+
+    def __init__(self, ref, value, package, x, y, rotation, side, attributes=None):
+        self.ref = ref
+        self.value = value
+        self.package = package
+        self.x = x
+        self.y = y
+        self.rotation = rotation
+        self.side = side  # 'top' or 'bottom'
+        self.attributes = attributes  # None when the board file doesn't list the footprint
+
+    @property
+    def smd(self):
+        return self.attributes is None or 'smd' in self.attributes
+
+    @property
+    def dnp(self):
+        return self.attributes is not None and 'dnp' in self.attributes
+
+    def moved(self, dx, dy):
+        return Component(self.ref, self.value, self.package, self.x + dx, self.y + dy,
+                         self.rotation, self.side, self.attributes)
+
+
+class Placement:
+    """Every component of a board, from one kicad-cli position export"""
+
+    def __init__(self, components, origin=(0.0, 0.0), created=None):
+        self.components = components
+        self.origin = origin  # drill/place file origin, board coordinates in mm
+        # When kicad-cli exported it; the .pos files carry this, not their own write time
+        self.created = created or datetime.now().astimezone()
+
+    @classmethod
+    def load(cls, csv_path, pcb_file):
+        """Parse a `pcb export pos --format csv --side both --units mm` export of pcb_file"""
+        attributes, origin = read_board_info(pcb_file)
+        components = []
+        with open(csv_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            for row in csv.DictReader(f):
+                ref = row['Ref']
+                components.append(Component(
+                    ref, row['Val'], row['Package'], float(row['PosX']), float(row['PosY']),
+                    float(row['Rot']), row['Side'].strip().lower(), attributes.get(ref)))
+        return cls(components, origin)
+
+    def select(self, side=None, smd_only=False, exclude_dnp=False, drill_origin=False):
+        """The components one position file lists, like the matching kicad-cli options"""
+        selected = []
+        for component in self.components:
+            if side and component.side != side:
+                continue
+            if (smd_only and not component.smd) or (exclude_dnp and component.dnp):
+                continue
+            if drill_origin:
+                # Board Y points down, the export's Y up
+                component = component.moved(-self.origin[0], self.origin[1])
+            selected.append(component)
+        return selected
+
+
+def convert(value, units):
+    return value / MM_PER_INCH if units == 'in' else value
+
+
+def ascii_field(text):
+    return text.replace(' ', '_')
+
+
+def write_kicad_ascii(path, components, side, units='mm', created=None, kicad_version=''):
+    """A KiCad ASCII position file (.pos) for one side, laid out like kicad-cli's
+
+    `side` is 'top', 'bottom' or None for both. Only the 'created on' stamp
+    differs from a kicad-cli export made at another time.
+    """
+    created = created or datetime.now().astimezone()
+    rows = [(ascii_field(c.ref), ascii_field(c.value), ascii_field(c.package), c) for c in components]
+    width_ref = max([8] + [len(row[0]) for row in rows])
+    width_value = max([8] + [len(row[1]) for row in rows])
+    width_package = max([16] + [len(row[2]) for row in rows])
+
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(f"### Footprint positions - created on {created.strftime('%Y-%m-%dT%H:%M:%S%z')} ###\n")
+        f.write(f"### Printed by KiCad version {kicad_version}\n")
+        f.write(f"## Unit = {'inches' if units == 'in' else 'mm'}, Angle = deg.\n")
+        f.write(f"## Side : {side or 'All'}\n")
+        f.write(f"{'# Ref':<{width_ref}}  {'Val':<{width_value}}  {'Package':<{width_package}}  "
+                f"{'PosX':>9}  {'PosY':>9}  {'Rot':>8}  Side\n")
+        for ref, value, package, c in rows:
+            f.write(f"{ref:<{width_ref}}  {value:<{width_value}}  {package:<{width_package}}  "
+                    f"{convert(c.x, units):9.4f}  {convert(c.y, units):9.4f}  {c.rotation:8.4f}  {c.side}\n")
+        f.write("## End\n")
+
+
+def write_kicad_csv(path, components, units='mm'):
+    """A KiCad CSV position file"""
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write("Ref,Val,Package,PosX,PosY,Rot,Side\n")
+        for c in components:
+            f.write('"{}","{}","{}",{:.4f},{:.4f},{:.4f},{}\n'.format(
+                c.ref.replace('"', '""'), c.value.replace('"', '""'), c.package.replace('"', '""'),
+                convert(c.x, units), convert(c.y, units), c.rotation, c.side))
+
+
+def rotation_offset(package, offsets):
+    """Degrees added to the rotation of a package: the first matching (glob, degrees) wins"""
+    for pattern, degrees in offsets:
+        if fnmatch.fnmatchcase(package, pattern):
+            return degrees
+    return 0.0
+
+
+class PnpFormat:
+    """An assembly house's pick-and-place file layout"""
+
+    def __init__(self, name, columns, side_names=SIDES, split_sides=False, units='mm',
+                 rotation_offsets=(), smd_only=False, exclude_dnp=True, drill_origin=True, delimiter=','):
+        self.name = name
+        self.columns = columns  # (header, component field) pairs
+        self.side_names = dict(zip(SIDES, side_names))
+        self.split_sides = split_sides  # one file per side instead of one for the board
+        self.units = units
+        self.rotation_offsets = list(rotation_offsets)  # (package glob, degrees)
+        self.smd_only = smd_only
+        self.exclude_dnp = exclude_dnp
+        self.drill_origin = drill_origin  # coordinates from the drill/place file origin
+        self.delimiter = delimiter
+
+    def field(self, component, field, offsets):
+        if field in ('x', 'y'):
+            return f"{convert(getattr(component, field), self.units):.4f}"
+        if field == 'rotation':
+            rotation = (component.rotation + rotation_offset(component.package, offsets)) % 360
+            return f"{rotation:.4f}"
+        if field == 'side':
+            return self.side_names[component.side]
+        return getattr(component, field)
+
+    def write(self, placement, output_dir, extra_offsets=()):
+        """Write this layout's file(s) into output_dir; returns their paths"""
+        # User offsets come first so they can override the built-in ones
+        offsets = list(extra_offsets) + self.rotation_offsets
+        if self.split_sides:
+            parts = [(f"pnp_{self.name}_{side}.csv", side) for side in SIDES]
+        else:
+            parts = [(f"pnp_{self.name}.csv", None)]
+
+        paths = []
+        for filename, side in parts:
+            components = placement.select(side, self.smd_only, self.exclude_dnp, self.drill_origin)
+            if side and not components:
+                continue  # no parts on this side
+            path = os.path.join(output_dir, filename)
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f, delimiter=self.delimiter, lineterminator='\n')
+                writer.writerow([header for header, _ in self.columns])
+                for component in components:
+                    writer.writerow([self.field(component, field, offsets) for _, field in self.columns])
+            paths.append(path)
+        return paths
+
+
+PNP_FORMATS = {
+    'jlcpcb': PnpFormat(
+        'jlcpcb',
+        [('Designator', 'ref'), ('Val', 'value'), ('Package', 'package'), ('Mid X', 'x'),
+         ('Mid Y', 'y'), ('Rotation', 'rotation'), ('Layer', 'side')],
+        side_names=('Top', 'Bottom')),
+    'pcbway': PnpFormat(
+        'pcbway',
+        [('Designator', 'ref'), ('Footprint', 'package'), ('Mid X', 'x'), ('Mid Y', 'y'),
+         ('Layer', 'side'), ('Rotation', 'rotation'), ('Comment', 'value')],
+        side_names=('T', 'B')),
+    'split': PnpFormat(
+        'split',
+        [('Ref', 'ref'), ('Value', 'value'), ('Footprint', 'package'), ('X', 'x'),
+         ('Y', 'y'), ('Rotation', 'rotation')],
+        split_sides=True),
+}
+
+
+def parse_rotation_offsets(value):
+    """([(package glob, degrees)], invalid entries) from a PNP_ROTATION_OFFSETS value
+
+    Entries are comma-separated `glob=degrees`, e.g. `SOT-23*=180,QFN-*=-90`.
+    """
+    offsets, invalid = [], []
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        pattern, _, degrees = entry.rpartition('=')
+        pattern = pattern.strip()
+        try:
+            degrees = float(degrees)
+        except ValueError:
+            pattern = ''
+        if pattern:
+            offsets.append((pattern, degrees))
+        else:
+            invalid.append(entry)
+    return offsets, invalid
@@ -0,0 +1,25 @@
+"""
+Parsing of .env list settings
+
+Several settings (MODEL_PROFILES, PNP_FORMATS, MANUFACTURING_FORMATS,
+THUMBNAIL_VIEWS) are comma-separated names picked from a fixed set.
+"""
+
+
+def parse_names(value, choices, normalize=None):
+    """(known names in order without duplicates, unknown names) from a comma-separated value
+
+    Names are compared in lower case, after `normalize` if given.
+    """
+    names, unknown = [], []
+    for name in value.split(','):
+        name = name.strip().lower()
+        if normalize:
+            name = normalize(name)
+        if not name:
+            continue
+        if name not in choices:
+            unknown.append(name)
+        elif name not in names:
+            names.append(name)
+    return names, unknown
@@ -0,0 +1,157 @@
+"""
+STEP header patching
+
+The version comment goes right after the HEADER section of the STEP file.
+Only the start of the file is scanned for the end of the header; the rest is
+copied to the new file unchanged (in the kernel where the platform supports
+it), so memory use stays constant however large the model is.
+
+Compressed STEP files (.stpZ) are the same text gzipped. They are patched
+and produced in a single streaming pass as well.
+"""
+
+import os
+import gzip
+import uuid
+import shutil
+
+
+STEP_MAGIC = b'ISO-10303-21'
+HEADER_END = b'ENDSEC;'
+HEADER_SCAN_LIMIT = 4 * 1024 * 1024  # STEP headers are a few KB
+READ_SIZE = 64 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024
+
+STEPZ_EXTENSION = '.stpZ'
+STEP_CONTENT_TYPE = 'application/step'
+STEPZ_CONTENT_TYPE = 'application/gzip'
+GZIP_LEVEL = 6
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def find_header_end(f, limit=HEADER_SCAN_LIMIT):
+    """Offset just past the first ENDSEC; of a STEP file, or None if it doesn't look like STEP"""
+    f.seek(0)
+    data = b''
+    while len(data) < limit:
+        chunk = f.read(READ_SIZE)
+        if not chunk:
+            break
+        data += chunk
+        index = data.find(HEADER_END)
+        if index != -1:
+            return index + len(HEADER_END) if STEP_MAGIC in data[:index] else None
+    return None
+
+
+def copy_rest(src, dst, offset):
+    """Copy src from offset to its end onto the end of dst"""
+    dst.flush()
+    size = os.fstat(src.fileno()).st_size
+    if hasattr(os, 'copy_file_range'):
+        # Explicit offsets: the buffered file objects' positions don't track the descriptors
+        src_offset, dst_offset = offset, dst.tell()
+        try:
+            while src_offset < size:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), size - src_offset,
+                                            src_offset, dst_offset)
+                if copied == 0:
+                    break
+                src_offset += copied
+                dst_offset += copied
+        except OSError:
+            pass  # not supported here; copy the rest in user space
+        offset = src_offset
+        dst.seek(dst_offset)
+    src.seek(offset)
+    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+
+def is_gzip(path):
+    with open(path, 'rb') as f:
+        return f.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+
+
+def content_type_for(path):
+    """Upload content type of a STEP or compressed STEP file"""
+    return STEPZ_CONTENT_TYPE if path.lower().endswith(STEPZ_EXTENSION.lower()) else STEP_CONTENT_TYPE
+
+
+def gzip_writer(raw, output_path, level=GZIP_LEVEL):
+    """Gzip stream onto `raw`, reproducible: no timestamp, the uncompressed .step name inside"""
+    inner_name = os.path.splitext(os.path.basename(output_path))[0] + '.step'
+    return gzip.GzipFile(filename=inner_name, mode='wb', compresslevel=level, fileobj=raw, mtime=0)
+
+
+def temp_path_for(target):
+    return os.path.join(os.path.dirname(os.path.abspath(target)),
+                        f".{os.path.basename(target)}.{uuid.uuid4().hex[:8]}.tmp")
+
+
+def compress_step(step_path, output_path, level=GZIP_LEVEL):
+    """Gzip step_path into output_path (.stpZ), streaming; returns the compressed size"""
+    tmp_path = temp_path_for(output_path)
+    try:
+        with open(step_path, 'rb') as src, open(tmp_path, 'wb') as raw:
+            with gzip_writer(raw, output_path, level) as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+        os.replace(tmp_path, output_path)
+        return os.path.getsize(output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def comment_length(src, offset, prefix):
+    """Length of a /* ... */ comment starting with `prefix` at offset, with the newlines around it; else 0"""
+    src.seek(offset)
+    head = src.read(READ_SIZE)
+    start = len(head) - len(head.lstrip(b'\r\n'))
+    if not prefix or not head[start:].startswith(prefix):
+        return 0
+    end = head.find(b'*/', start)
+    if end == -1:
+        return 0
+    end += 2
+    for newline in (b'\r\n', b'\n'):
+        if head[end:].startswith(newline):
+            return end + len(newline)
+    return end
+
+
+def insert_after_header(step_path, text, output_path=None, replace=None):
+    """Write step_path with `text` inserted after its HEADER section
+
+    Writes to output_path, or replaces step_path atomically when none is
+    given. A comment starting with `replace` already right after the header
+    (an earlier version comment) is dropped. Returns False, leaving
+    everything untouched, if the file is not recognized as STEP. Gzipped
+    input is decompressed and recompressed on the fly.
+    """
+    target = output_path or step_path
+    tmp_path = temp_path_for(target)
+    compressed = is_gzip(step_path)
+    try:
+        with (gzip.open(step_path, 'rb') if compressed else open(step_path, 'rb')) as src:
+            header_end = find_header_end(src)
+            if header_end is None:
+                return False
+            rest = header_end + comment_length(src, header_end, replace)
+            with open(tmp_path, 'wb') as raw:
+                src.seek(0)
+                if compressed:
+                    with gzip_writer(raw, target) as dst:
+                        dst.write(src.read(header_end))
+                        dst.write(text.encode('utf-8'))
+                        src.seek(rest)
+                        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+                else:
+                    raw.write(src.read(header_end))
+                    raw.write(text.encode('utf-8'))
+                    copy_rest(src, raw, rest)
+        shutil.copymode(step_path, tmp_path)
+        os.replace(tmp_path, target)
+        return True
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,134 @@
+"""
+Per-stage timing instrumentation
+
+Spans record the duration and details (bytes, status and exit codes) of each
+stage of a push and can be exported as a Chrome trace / Perfetto JSON file,
+which opens directly in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import os
+import json
+import time
+import threading
+
+
+class Span:
+    """A timed region of work; use as a context manager"""
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+        self.duration = None
+        self.thread_id = None
+
+    def set(self, **args):
+        """Attach details to the span, e.g. bytes or exit_code"""
+        self.args.update(args)
+
+    def __enter__(self):
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc is not None:
+            self.args['error'] = f"{exc_type.__name__}: {exc}"
+        self.tracer.finish(self)
+        return False
+
+
+class Tracer:
+    """Collects spans for one run and exports them in Chrome trace format"""
+
+    def __init__(self, process_name="KiCad to Dokuly"):
+        self.process_name = process_name
+        self.origin = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self.thread_names = {}
+        self.lock = threading.Lock()
+
+    def span(self, name, category='stage', **args):
+        return Span(self, name, category, args)
+
+    def finish(self, span):
+        with self.lock:
+            self.spans.append(span)
+            if span.thread_id not in self.thread_names:
+                self.thread_names[span.thread_id] = threading.current_thread().name
+
+    def elapsed(self):
+        return time.perf_counter() - self.origin
+
+    def summary(self, category=None):
+        """Total seconds and count per span name, slowest first"""
+        totals = {}
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            if category and span.category != category:
+                continue
+            total, count = totals.get(span.name, (0.0, 0))
+            totals[span.name] = (total + span.duration, count + 1)
+        return sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+
+    def to_chrome_trace(self):
+        pid = os.getpid()
+        events = [{
+            'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+            'args': {'name': self.process_name},
+        }]
+
+        with self.lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+            thread_names = dict(self.thread_names)
+
+        for thread_id, thread_name in thread_names.items():
+            events.append({
+                'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id,
+                'args': {'name': thread_name},
+            })
+
+        for span in spans:
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': round((span.start - self.origin) * 1e6, 3),
+                'dur': round(span.duration * 1e6, 3),
+                'pid': pid,
+                'tid': span.thread_id,
+                'args': span.args,
+            })
+
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'started_at': self.started_at},
+        }
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+        return path
+
+
+def path_size(path):
+    """Size in bytes of a file, or of all files below a directory"""
+    if not path or not os.path.exists(path):
+        return 0
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
@@ -0,0 +1,88 @@
+"""
+Board and schematic save watching
+
+Watch mode polls the project's input files for changed modification times
+and sizes on a daemon thread. Polling works the same on every platform and
+network share, and a stat per file per second costs nothing next to an
+export. A burst of saves is reported once, after the files have been quiet
+for the debounce period, so a pre-build starts on the saved state instead of
+on the first of several writes.
+"""
+
+import os
+import time
+import shutil
+import threading
+import subprocess
+
+
+POLL_INTERVAL = 1.0
+DEBOUNCE_SECONDS = 3.0
+NICE_INCREMENT = 10
+
+
+def low_priority(command, kwargs):
+    """(command, subprocess arguments) that run `command` below normal priority"""
+    if os.name == 'nt':
+        flags = kwargs.get('creationflags', 0) | subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        return command, dict(kwargs, creationflags=flags)
+    nice = shutil.which('nice')
+    if nice:
+        return [nice, '-n', str(NICE_INCREMENT)] + list(command), kwargs
+    return command, kwargs
+
+
+class SaveWatcher:
+    """Reports saved files once they settle; paths() is asked for the files on every poll"""
+
+    def __init__(self, paths, on_change, interval=POLL_INTERVAL, debounce=DEBOUNCE_SECONDS, on_error=None):
+        self.paths = paths
+        self.on_change = on_change
+        self.on_error = on_error  # called with a message when on_change raises
+        self.interval = interval
+        self.debounce = debounce
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def snapshot(self):
+        """{path: (mtime_ns, size)}, None for missing files"""
+        state = {}
+        for path in self.paths():
+            try:
+                stat = os.stat(path)
+                state[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                state[path] = None
+        return state
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name='save-watcher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread = None
+
+    def run(self):
+        known = self.snapshot()
+        changed = set()
+        last_change = 0.0
+        while not self.stop_event.wait(self.interval):
+            current = self.snapshot()
+            # Files that appeared in the list (a new sheet) only count once they change
+            modified = {path for path, state in current.items() if path in known and state != known[path]}
+            known = current
+            if modified:
+                changed |= modified
+                last_change = time.monotonic()
+            elif changed and time.monotonic() - last_change >= self.debounce:
+                paths, changed = sorted(changed), set()
+                try:
+                    self.on_change(paths)
+                except Exception as e:
+                    # Keep watching; the next save gets another chance
+                    if self.on_error:
+                        self.on_error(f"Save watcher: handling {', '.join(paths)} failed: {str(e)}")
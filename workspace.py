@@ -0,0 +1,333 @@
+"""
+Per-run workspaces in the plugin's temp folder
+
+Every run gets its own folder under temp/runs, so two plugin windows working
+on different boards never touch each other's files. Results are published to
+their final location atomically and, where the filesystem allows, without
+copying their bytes (rename, copy-on-write clone or hardlink), and a
+background janitor keeps the temp folder under a total size and age cap.
+"""
+
+import os
+import sys
+import time
+import uuid
+import errno
+import shutil
+import socket
+import threading
+from datetime import datetime
+
+
+RUNS_FOLDER = 'runs'
+CACHE_FOLDER = 'cache'
+OWNER_FILE = '.owner'
+
+# Folders below the temp root that the janitor never evicts
+PROTECTED_NAMES = ('logs',)
+
+# Cache files the janitor keeps: the indexes and stamps that describe the rest
+CACHE_INDEX_EXTENSION = '.json'
+
+# Folders whose entries are evicted one by one rather than as a whole
+CONTAINER_NAMES = (RUNS_FOLDER, 'traces')
+
+# A workspace or cache file touched within this many seconds belongs to a run in progress
+ACTIVE_GRACE_SECONDS = 2 * 60 * 60
+
+DEFAULT_MAX_TOTAL_BYTES = 500 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+
+FICLONE = 0x40049409  # Linux ioctl: share the source's extents (btrfs, XFS, bcachefs)
+
+
+def clone_file(source, destination):
+    """Create destination as a copy-on-write clone of source
+
+    Raises OSError if the platform or filesystem can't clone.
+    """
+    if sys.platform.startswith('linux'):
+        import fcntl
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError:
+                dst.close()
+                os.remove(destination)
+                raise
+        shutil.copystat(source, destination)
+        return
+    if sys.platform == 'darwin':
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        # APFS clonefile(2) also copies the metadata
+        if libc.clonefile(os.fsencode(source), os.fsencode(destination), 0) != 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code), destination)
+        return
+    raise OSError(errno.ENOTSUP, 'Cloning is not supported on this platform', destination)
+
+
+def publish_file(source, destination, move=False, link=True):
+    """Place source at destination so readers never see a partially written file
+
+    Tries, in order: renaming source (only if `move`), a copy-on-write clone,
+    a hardlink (only if `link`; the two names then share their contents, so
+    use it only for sources nobody modifies later), and finally a byte copy.
+    Returns the method used: 'rename', 'reflink', 'hardlink' or 'copy'.
+    """
+    if move:
+        try:
+            os.replace(source, destination)
+            return 'rename'
+        except OSError:
+            pass  # most likely a different filesystem
+
+    destination_dir = os.path.dirname(os.path.abspath(destination))
+    tmp_path = os.path.join(
+        destination_dir, f".{os.path.basename(destination)}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    methods = [('reflink', clone_file)]
+    if link:
+        methods.append(('hardlink', os.link))
+    methods.append(('copy', shutil.copy2))
+    try:
+        for method, place in methods:
+            try:
+                place(source, tmp_path)
+            except OSError:
+                if method == 'copy':
+                    raise
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                continue
+            os.replace(tmp_path, destination)
+            return method
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def publish_stream(chunks, destination):
+    """Pass chunks through while also writing them to destination
+
+    The file appears at destination only once every chunk has gone through;
+    if the consumer stops early, the partial file is removed.
+    """
+    destination_dir = os.path.dirname(os.path.abspath(destination))
+    tmp_path = os.path.join(
+        destination_dir, f".{os.path.basename(destination)}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp_path, destination)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def entry_size_and_mtime(path):
+    """Total size and newest modification time of a file or directory tree"""
+    try:
+        if not os.path.isdir(path):
+            stat = os.stat(path)
+            return stat.st_size, stat.st_mtime
+        size = 0
+        newest = os.stat(path).st_mtime
+        for root, dirs, files in os.walk(path):
+            for file in files:
+                try:
+                    stat = os.stat(os.path.join(root, file))
+                except OSError:
+                    continue
+                size += stat.st_size
+                newest = max(newest, stat.st_mtime)
+        return size, newest
+    except OSError:
+        return 0, 0
+
+
+def process_is_alive(pid):
+    """True if a process with this ID is running on this machine"""
+    if pid <= 0:
+        return False
+    if sys.platform == 'win32':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    except OSError:
+        return False
+    return True
+
+
+def owner_is_alive(workspace_path):
+    """True if the workspace's .owner names a process still running on this host"""
+    try:
+        with open(os.path.join(workspace_path, OWNER_FILE), 'r', encoding='utf-8') as f:
+            host, pid = f.read().split()[:2]
+        return host == socket.gethostname() and process_is_alive(int(pid))
+    except (OSError, ValueError):
+        return False
+
+
+def remove_entry(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class Workspace:
+    """A private folder for the files of one run"""
+
+    def __init__(self, path):
+        self.path = path
+        self.owner_file = os.path.join(path, OWNER_FILE)
+
+    def touch(self):
+        """Mark the workspace as in use so the janitor leaves it alone"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.owner_file, 'w', encoding='utf-8') as f:
+            f.write(f"{socket.gethostname()} {os.getpid()} {time.time()}\n")
+
+    def subdir(self, name):
+        path = os.path.join(self.path, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def publish(self, source, destination, move=False, link=True):
+        self.touch()
+        return publish_file(source, destination, move=move, link=link)
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class WorkspaceManager:
+    """Creates per-run workspaces below a temp root and evicts old ones"""
+
+    def __init__(self, root, max_total_bytes=DEFAULT_MAX_TOTAL_BYTES,
+                 max_age_seconds=DEFAULT_MAX_AGE_SECONDS):
+        self.root = root
+        self.runs_dir = os.path.join(root, RUNS_FOLDER)
+        self.max_total_bytes = max_total_bytes  # 0 for no size cap
+        self.max_age_seconds = max_age_seconds  # 0 for no age limit
+        self.janitor_lock = threading.Lock()
+        os.makedirs(self.runs_dir, exist_ok=True)
+
+    def create(self, label='run'):
+        """Create a new, uniquely named workspace"""
+        name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{label}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        path = os.path.join(self.runs_dir, name)
+        os.makedirs(path)
+        workspace = Workspace(path)
+        workspace.touch()
+        return workspace
+
+    def cache_candidates(self, cache_dir, now):
+        """Evictable cache files as (mtime, size, path), one entry per file"""
+        entries = []
+        for root, dirs, files in os.walk(cache_dir):
+            for file in files:
+                if file.endswith(CACHE_INDEX_EXTENSION):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime < ACTIVE_GRACE_SECONDS:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def candidates(self, now):
+        """Evictable entries as (mtime, size, path)
+
+        Workspaces of a plugin window still open on this host, and workspaces
+        or cache files touched recently (possibly by another host sharing the
+        folder), are left out. The cache's index and stamp files are never
+        evicted; they treat a missing cached file as out of date.
+        """
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name in PROTECTED_NAMES:
+                continue
+            if name == CACHE_FOLDER and os.path.isdir(path):
+                entries.extend(self.cache_candidates(path, now))
+                continue
+            if name in CONTAINER_NAMES and os.path.isdir(path):
+                for child in os.listdir(path):
+                    child_path = os.path.join(path, child)
+                    size, mtime = entry_size_and_mtime(child_path)
+                    if name == RUNS_FOLDER and (now - mtime < ACTIVE_GRACE_SECONDS
+                                                or owner_is_alive(child_path)):
+                        continue
+                    entries.append((mtime, size, child_path))
+                continue
+            size, mtime = entry_size_and_mtime(path)
+            entries.append((mtime, size, path))
+
+        return sorted(entries)
+
+    def clean(self, now=None):
+        """Evict entries older than the age cap, then the oldest until under the size cap
+
+        Returns (number of entries removed, bytes freed).
+        """
+        if not self.janitor_lock.acquire(blocking=False):
+            return 0, 0  # another janitor is already running
+        try:
+            now = now or time.time()
+            removed, freed = 0, 0
+            entries = self.candidates(now)
+
+            total = sum(size for mtime, size, path in entries)
+            for mtime, size, path in entries:
+                too_old = self.max_age_seconds and now - mtime > self.max_age_seconds
+                too_big = self.max_total_bytes and total > self.max_total_bytes
+                if not (too_old or too_big):
+                    continue
+                remove_entry(path)
+                removed += 1
+                freed += size
+                total -= size
+
+            return removed, freed
+        finally:
+            self.janitor_lock.release()
+
+    def clean_in_background(self, on_done=None):
+        """Run the janitor on a daemon thread, so the caller never waits for it"""
+        def run():
+            try:
+                result = self.clean()
+            except Exception as e:
+                result = e
+            if on_done:
+                on_done(result)
+
+        thread = threading.Thread(target=run, name='temp-janitor', daemon=True)
+        thread.start()
+        return thread